@@ -3,6 +3,11 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from .config import Config
 from .database import init_db
+from .indexes import init_indexes
+from .services.events import init_events
+from .maintenance import init_maintenance
+from .services.outbox import init_outbox
+from .services.llm import init_llm
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -42,6 +47,11 @@ def create_app(config_class=Config):
     
     # Initialize database
     init_db(app)
+    init_indexes(app)
+    init_events(app)
+    init_maintenance(app)
+    init_outbox(app)
+    init_llm(app)
 
     # Register Blueprints
     from .routes.auth import auth_bp
@@ -59,6 +69,7 @@ def create_app(config_class=Config):
     from .routes.notifications import notifications_bp
     from .routes.admin import admin_bp
     from .routes.video_calls import video_calls_bp
+    from .routes.events import events_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(doctors_bp, url_prefix='/api/doctors')
@@ -75,6 +86,7 @@ def create_app(config_class=Config):
     app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(video_calls_bp, url_prefix='/api/video-calls')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
 
     return app
 
@@ -9,9 +9,119 @@ class Config:
     # MongoDB Configuration
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://127.0.0.1:27017/'
     MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME') or 'medical_project'
+
+    # MongoDB connection pool (one client per worker process)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE') or 100)
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE') or 0)
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS') or 60000)
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS') or 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS') or 5000)
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS') or 20000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS') or 5000)
+
+    # Build missing indexes on a background thread when the app starts
+    # (otherwise run `flask --app app ensure-indexes`)
+    MONGO_ENSURE_INDEXES_ON_STARTUP = os.environ.get('MONGO_ENSURE_INDEXES_ON_STARTUP', 'false').lower() == 'true'
+    # Indexes that guard correctness (e.g. no double-booked slots) are always
+    # built at startup and the app refuses to start without them. Requires
+    # MongoDB 6.0+ ($in in a partial index filter).
+    MONGO_REQUIRE_INDEXES = os.environ.get('MONGO_REQUIRE_INDEXES', 'true').lower() == 'true'
+    
+    # Keyset pagination for list endpoints (used when a client sends ?limit= or ?after=)
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT') or 50)
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX') or 200)
+    
+    # Public doctor directory cache (also invalidated on doctor/schedule writes)
+    DOCTOR_DIRECTORY_TTL_SECONDS = int(os.environ.get('DOCTOR_DIRECTORY_TTL_SECONDS') or 300)
+    
+    # Real-time push: 'memory' for a single worker, 'mongo' to relay events
+    # between workers through a capped collection
+    EVENT_BROKER = os.environ.get('EVENT_BROKER') or 'memory'
+    EVENT_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('EVENT_STREAM_HEARTBEAT_SECONDS') or 15)
+    # Streams end after this long; clients reconnect with Last-Event-ID
+    EVENT_STREAM_MAX_SECONDS = int(os.environ.get('EVENT_STREAM_MAX_SECONDS') or 300)
+    EVENT_STREAM_RETRY_MS = int(os.environ.get('EVENT_STREAM_RETRY_MS') or 2000)
+    
+    # Outbox worker for notifications/activities recorded by requests.
+    # Runs on a thread in each web process unless disabled, e.g. when a
+    # dedicated `flask outbox-worker` process is deployed.
+    OUTBOX_WORKER_THREAD = os.environ.get('OUTBOX_WORKER_THREAD', 'true').lower() == 'true'
+    OUTBOX_POLL_INTERVAL_SECONDS = float(os.environ.get('OUTBOX_POLL_INTERVAL_SECONDS') or 2)
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 50)
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS') or 60)
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 8)
     
     # Google Gemini API Configuration
     GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY') or ''
+    
+    # LLM provider: 'gemini', or 'local' for deterministic offline replies
+    # (benchmarks, air-gapped demos). Per-purpose overrides: LLM_CHAT_PROVIDER,
+    # LLM_CHAT_MODEL, LLM_REPORT_PROVIDER, LLM_REPORT_MODEL, LLM_SUMMARY_PROVIDER,
+    # LLM_SUMMARY_MODEL.
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER') or 'gemini'
+    LLM_MODEL = os.environ.get('LLM_MODEL') or 'gemini-2.5-flash'
+    LLM_CHAT_PROVIDER = os.environ.get('LLM_CHAT_PROVIDER')
+    LLM_CHAT_MODEL = os.environ.get('LLM_CHAT_MODEL')
+    LLM_REPORT_PROVIDER = os.environ.get('LLM_REPORT_PROVIDER')
+    LLM_REPORT_MODEL = os.environ.get('LLM_REPORT_MODEL')
+    LLM_SUMMARY_PROVIDER = os.environ.get('LLM_SUMMARY_PROVIDER')
+    LLM_SUMMARY_MODEL = os.environ.get('LLM_SUMMARY_MODEL')
+    # Simulated latency of the local provider: before the first token, and per streamed word
+    LLM_LOCAL_LATENCY_MS = int(os.environ.get('LLM_LOCAL_LATENCY_MS') or 0)
+    LLM_LOCAL_TOKEN_DELAY_MS = int(os.environ.get('LLM_LOCAL_TOKEN_DELAY_MS') or 0)
+    
+    # Pooled LLM clients, one per provider/model/temperature in each worker process.
+    # LLM_CALL_DEADLINE_SECONDS bounds a whole non-streaming call including its
+    # retries: each attempt times out after the deadline split across attempts
+    # (capped at LLM_TIMEOUT_SECONDS); the retry backoff adds about a second per retry.
+    LLM_CALL_DEADLINE_SECONDS = float(os.environ.get('LLM_CALL_DEADLINE_SECONDS') or 30)
+    LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS') or 30)
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES') or 2)
+    LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS') or 10)
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_MAX_KEEPALIVE_CONNECTIONS') or 5)
+    LLM_WARM_UP = os.environ.get('LLM_WARM_UP', 'true').lower() == 'true'
+    
+    # Per-provider guard around LLM calls: concurrent calls per worker, how long
+    # a call may wait for a slot, and the circuit breaker that fast-fails once
+    # LLM_BREAKER_FAILURE_RATIO of the last LLM_BREAKER_WINDOW calls failed or
+    # ran longer than LLM_SLOW_CALL_SECONDS
+    LLM_MAX_CONCURRENT_CALLS = int(os.environ.get('LLM_MAX_CONCURRENT_CALLS') or 4)
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS') or 2)
+    LLM_SLOW_CALL_SECONDS = float(os.environ.get('LLM_SLOW_CALL_SECONDS') or 20)
+    LLM_STREAM_DEADLINE_SECONDS = float(os.environ.get('LLM_STREAM_DEADLINE_SECONDS') or 60)
+    LLM_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW') or 20)
+    LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS') or 5)
+    LLM_BREAKER_FAILURE_RATIO = float(os.environ.get('LLM_BREAKER_FAILURE_RATIO') or 0.5)
+    LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS') or 30)
+    
+    # Record size, latency and outcome of every LLM call in the llm_calls collection
+    LLM_USAGE_TRACKING_ENABLED = os.environ.get('LLM_USAGE_TRACKING_ENABLED', 'true').lower() == 'true'
+    
+    # Chatbot context: recent turns sent verbatim, older ones folded into a summary
+    CHAT_CONTEXT_TURNS = int(os.environ.get('CHAT_CONTEXT_TURNS') or 6)
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET') or 3000)
+    CHAT_SUMMARY_MAX_CHARS = int(os.environ.get('CHAT_SUMMARY_MAX_CHARS') or 2000)
+    
+    # Chatbot doctor retrieval: offline TF-IDF index over verified doctors
+    # (also invalidated on doctor writes); only the top matches go in the prompt
+    CHATBOT_DOCTOR_INDEX_TTL_SECONDS = int(os.environ.get('CHATBOT_DOCTOR_INDEX_TTL_SECONDS') or 300)
+    CHATBOT_DOCTOR_TOP_K = int(os.environ.get('CHATBOT_DOCTOR_TOP_K') or 5)
+    
+    # Rule-based triage answers short symptom statements without calling the LLM
+    CHATBOT_TRIAGE_ENABLED = os.environ.get('CHATBOT_TRIAGE_ENABLED', 'true').lower() == 'true'
+    CHATBOT_TRIAGE_MAX_WORDS = int(os.environ.get('CHATBOT_TRIAGE_MAX_WORDS') or 12)
+    
+    # Per-process cache of replies to first-turn questions, matched by similarity
+    CHATBOT_RESPONSE_CACHE_ENABLED = os.environ.get('CHATBOT_RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    CHATBOT_RESPONSE_CACHE_SIZE = int(os.environ.get('CHATBOT_RESPONSE_CACHE_SIZE') or 500)
+    CHATBOT_RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('CHATBOT_RESPONSE_CACHE_TTL_SECONDS') or 3600)
+    CHATBOT_RESPONSE_CACHE_SIMILARITY = float(os.environ.get('CHATBOT_RESPONSE_CACHE_SIMILARITY') or 0.85)
+    
+    # One chatbot turn per user at a time, across workers (a message sent while
+    # another turn runs gets a 409 at once): how long a turn holds the lock at
+    # most, and how long an identical resubmitted message gets the previous reply
+    CHATBOT_TURN_LOCK_SECONDS = int(os.environ.get('CHATBOT_TURN_LOCK_SECONDS') or 120)
+    CHATBOT_DUPLICATE_WINDOW_SECONDS = int(os.environ.get('CHATBOT_DUPLICATE_WINDOW_SECONDS') or 10)
 
     # GetStream Configuration
     GETSTREAM_API_KEY = os.environ.get('GETSTREAM_API_KEY') or ''
@@ -1,21 +1,168 @@
-from pymongo import MongoClient
+import os
+import threading
+import weakref
+from pymongo import MongoClient, monitoring
 from flask import current_app, g
 
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collect connection pool counters for the process-wide client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters."""
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.clears = 0
+
+    def _incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr('clears')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr('created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr('closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._incr('checked_out')
+
+    def connection_checked_in(self, event):
+        self._incr('checked_out', -1)
+
+    def to_dict(self):
+        """Convert counters to dictionary."""
+        with self._lock:
+            return {
+                'open': self.created - self.closed,
+                'inUse': self.checked_out,
+                'created': self.created,
+                'closed': self.closed,
+                'checkoutFailures': self.checkout_failures,
+                'poolCleared': self.clears
+            }
+
+
+class MongoConnectionManager:
+    """Owns a single pooled MongoClient per worker process.
+
+    The client is created lazily on first use and re-created in a forked
+    child (e.g. gunicorn with --preload), since pymongo clients are not
+    fork-safe.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._reset())
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        """Forget the client inherited from a parent process."""
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self.stats = PoolStatsListener()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['mongo'] = self
+
+    def _client_options(self):
+        config = self.app.config
+        options = {
+            'maxPoolSize': config.get('MONGO_MAX_POOL_SIZE', 100),
+            'minPoolSize': config.get('MONGO_MIN_POOL_SIZE', 0),
+            'maxIdleTimeMS': config.get('MONGO_MAX_IDLE_TIME_MS'),
+            'connectTimeoutMS': config.get('MONGO_CONNECT_TIMEOUT_MS'),
+            'serverSelectionTimeoutMS': config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+            'socketTimeoutMS': config.get('MONGO_SOCKET_TIMEOUT_MS'),
+            'waitQueueTimeoutMS': config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+            'event_listeners': [self.stats]
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    @property
+    def client(self):
+        """Get the pooled client for the current process, creating it if needed."""
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = MongoClient(self.app.config['MONGO_URI'], **self._client_options())
+                    self._pid = pid
+        return self._client
+
+    def get_database(self, name=None):
+        """Get a database handle from the pooled client."""
+        return self.client[name or self.app.config['MONGO_DB_NAME']]
+
+    def pool_stats(self):
+        """Get connection pool statistics for this process."""
+        stats = self.stats.to_dict()
+        stats['pid'] = self._pid
+        stats['connected'] = self._client is not None and self._pid == os.getpid()
+        stats['maxPoolSize'] = self.app.config.get('MONGO_MAX_POOL_SIZE', 100)
+        stats['minPoolSize'] = self.app.config.get('MONGO_MIN_POOL_SIZE', 0)
+        return stats
+
+    def close(self):
+        """Close the client (on worker shutdown)."""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+
+def get_mongo():
+    """Get the connection manager for the current app."""
+    return current_app.extensions['mongo']
+
+
 def get_db():
     """Get database connection from Flask application context."""
     if 'db' not in g:
-        client = MongoClient(current_app.config['MONGO_URI'])
-        g.db = client[current_app.config['MONGO_DB_NAME']]
+        g.db = get_mongo().get_database()
     return g.db
 
 def close_db(e=None):
-    """Close database connection."""
-    db = g.pop('db', None)
-    if db is not None:
-        db.client.close()
+    """Release the database handle. The pooled client stays open."""
+    g.pop('db', None)
 
 def init_db(app):
     """Initialize database connection with Flask app."""
+    MongoConnectionManager(app)
     app.teardown_appcontext(close_db)
 
 # Collection names
@@ -29,3 +176,6 @@ RATINGS_COLLECTION = 'ratings'
 PRESCRIPTIONS_COLLECTION = 'prescriptions'
 SCHEDULES_COLLECTION = 'schedules'
 NOTIFICATIONS_COLLECTION = 'notifications'
+ACTIVITIES_COLLECTION = 'activities'
+NOTIFICATION_COUNTERS_COLLECTION = 'notification_counters'
+OUTBOX_COLLECTION = 'outbox'
@@ -0,0 +1,241 @@
+"""Declarative index registry and idempotent index bootstrap."""
+import threading
+import click
+from pymongo.errors import OperationFailure
+from .database import (
+    get_db, USERS_COLLECTION, DOCTORS_COLLECTION, PATIENTS_COLLECTION,
+    MEDICAL_RECORDS_COLLECTION, APPOINTMENTS_COLLECTION, CHAT_HISTORY_COLLECTION,
+    RATINGS_COLLECTION, PRESCRIPTIONS_COLLECTION, SCHEDULES_COLLECTION,
+    NOTIFICATIONS_COLLECTION, ACTIVITIES_COLLECTION, OUTBOX_COLLECTION
+)
+
+# Indexes the app cannot run correctly without; built synchronously at startup
+# even when MONGO_ENSURE_INDEXES_ON_STARTUP is off. unique_active_slot is the
+# only guard against two bookings of the same doctor/date/time.
+REQUIRED_INDEXES = {
+    APPOINTMENTS_COLLECTION: ('unique_active_slot',),
+}
+
+# Index options that make two indexes on the same keys incompatible
+COMPARED_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression', 'collation')
+
+
+def get_index_registry():
+    """Get the declared indexes for every collection."""
+    from .models.user import User
+    from .models.doctor import Doctor
+    from .models.patient import Patient
+    from .models.medical_record import MedicalRecord
+    from .models.appointment import Appointment
+    from .models.chat_history import ChatHistory, CHAT_BUCKETS_COLLECTION
+    from .models.rating import Rating
+    from .models.prescription import Prescription
+    from .models.schedule import Schedule
+    from .models.notification import Notification
+    from .models.message import Message, MESSAGES_COLLECTION, MESSAGE_READS_COLLECTION
+    from .models.activity import Activity
+    from .models.outbox import Outbox
+    from .models.llm_call import LLMCall, LLM_CALLS_COLLECTION
+    from .models.chat_turn import ChatTurn, CHAT_TURNS_COLLECTION
+
+    return {
+        USERS_COLLECTION: User.INDEXES,
+        DOCTORS_COLLECTION: Doctor.INDEXES,
+        PATIENTS_COLLECTION: Patient.INDEXES,
+        MEDICAL_RECORDS_COLLECTION: MedicalRecord.INDEXES,
+        APPOINTMENTS_COLLECTION: Appointment.INDEXES,
+        CHAT_HISTORY_COLLECTION: ChatHistory.INDEXES,
+        CHAT_BUCKETS_COLLECTION: ChatHistory.BUCKET_INDEXES,
+        RATINGS_COLLECTION: Rating.INDEXES,
+        PRESCRIPTIONS_COLLECTION: Prescription.INDEXES,
+        SCHEDULES_COLLECTION: Schedule.INDEXES,
+        NOTIFICATIONS_COLLECTION: Notification.INDEXES,
+        MESSAGES_COLLECTION: Message.INDEXES,
+        MESSAGE_READS_COLLECTION: Message.READ_MARKER_INDEXES,
+        ACTIVITIES_COLLECTION: Activity.INDEXES,
+        OUTBOX_COLLECTION: Outbox.INDEXES,
+        LLM_CALLS_COLLECTION: LLMCall.INDEXES,
+        CHAT_TURNS_COLLECTION: ChatTurn.INDEXES,
+    }
+
+
+def _key_spec(key):
+    """Normalize an index key (dict, SON or list of pairs) to a tuple."""
+    items = key.items() if hasattr(key, 'items') else key
+    return tuple((field, direction) for field, direction in items)
+
+
+def _plain(value):
+    """Convert SON/nested documents to plain dicts so comparisons ignore the container type."""
+    if hasattr(value, 'items'):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _options(index_doc):
+    return {
+        option: _plain(index_doc.get(option))
+        for option in COMPARED_OPTIONS if index_doc.get(option) is not None
+    }
+
+
+def _options_match(declared, present):
+    """Check declared options against an existing index.
+
+    The server fills in every collation default, so only the collation fields
+    that were declared are compared.
+    """
+    declared_collation = declared.pop('collation', None)
+    present_collation = present.pop('collation', None)
+    if declared != present:
+        return False
+    if declared_collation is None or present_collation is None:
+        return declared_collation == present_collation
+    return all(present_collation.get(k) == v for k, v in declared_collation.items())
+
+
+def diff_indexes(collection, declared):
+    """Compare declared IndexModels with the indexes present on a collection.
+
+    Returns a dict with 'missing' (IndexModels to create), 'existing' (names
+    already matching), 'conflicts' (same keys, different options) and 'extra'
+    (present but not declared).
+    """
+    present = {
+        _key_spec(info['key']): (name, info)
+        for name, info in collection.index_information().items()
+        if name != '_id_'
+    }
+
+    result = {'missing': [], 'existing': [], 'conflicts': [], 'extra': []}
+    declared_specs = set()
+    for model in declared:
+        doc = model.document
+        spec = _key_spec(doc['key'])
+        declared_specs.add(spec)
+        if spec not in present:
+            result['missing'].append(model)
+            continue
+        name, info = present[spec]
+        if not _options_match(_options(doc), _options(info)):
+            result['conflicts'].append({
+                'name': name,
+                'declared': _options(doc),
+                'present': _options(info)
+            })
+        else:
+            result['existing'].append(name)
+
+    result['extra'] = [name for spec, (name, info) in present.items() if spec not in declared_specs]
+    return result
+
+
+def ensure_indexes(db=None, dry_run=False, drop_extra=False):
+    """Create every declared index that is missing. Safe to run repeatedly.
+
+    Returns a report keyed by collection name.
+    """
+    db = db if db is not None else get_db()
+    report = {}
+
+    for collection_name, declared in get_index_registry().items():
+        collection = db[collection_name]
+        diff = diff_indexes(collection, declared)
+        entry = {
+            'created': [],
+            'existing': diff['existing'],
+            'conflicts': diff['conflicts'],
+            'extra': diff['extra'],
+            'dropped': [],
+            'errors': []
+        }
+
+        if not dry_run:
+            for model in diff['missing']:
+                doc = dict(model.document)
+                keys = list(doc.pop('key').items())
+                try:
+                    entry['created'].append(collection.create_index(keys, **doc))
+                except OperationFailure as e:
+                    entry['errors'].append(f"{doc.get('name')}: {e}")
+            if drop_extra:
+                for name in diff['extra']:
+                    collection.drop_index(name)
+                    entry['dropped'].append(name)
+        else:
+            entry['created'] = [model.document['name'] for model in diff['missing']]
+
+        report[collection_name] = entry
+
+    return report
+
+
+def ensure_required_indexes(db=None):
+    """Create the REQUIRED_INDEXES that are missing.
+
+    Raises RuntimeError if one cannot be built or an incompatible index
+    already sits on the same keys, since the app must not serve requests
+    without them.
+    """
+    db = db if db is not None else get_db()
+    registry = get_index_registry()
+    created = []
+
+    for collection_name, names in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        declared = [model for model in registry[collection_name] if model.document['name'] in names]
+        diff = diff_indexes(collection, declared)
+        if diff['conflicts']:
+            raise RuntimeError(f"Required index on {collection_name} does not match its declaration: {diff['conflicts']}")
+        for model in diff['missing']:
+            doc = dict(model.document)
+            keys = list(doc.pop('key').items())
+            try:
+                created.append(collection.create_index(keys, **doc))
+            except OperationFailure as e:
+                raise RuntimeError(f"Could not build required index {doc['name']} on {collection_name}: {e}") from e
+
+    return created
+
+
+def ensure_indexes_in_background(app, **kwargs):
+    """Run ensure_indexes on a daemon thread so startup is not blocked."""
+    def run():
+        with app.app_context():
+            try:
+                ensure_indexes(**kwargs)
+            except Exception as e:
+                app.logger.error(f"Index bootstrap failed: {e}")
+
+    thread = threading.Thread(target=run, name='index-bootstrap', daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command('ensure-indexes')
+@click.option('--dry-run', is_flag=True, help='Only report what would change.')
+@click.option('--drop-extra', is_flag=True, help='Drop indexes that are not declared.')
+def ensure_indexes_command(dry_run, drop_extra):
+    """Create missing MongoDB indexes declared by the models."""
+    report = ensure_indexes(dry_run=dry_run, drop_extra=drop_extra)
+    for collection_name, entry in report.items():
+        click.echo(f"{collection_name}:")
+        for label in ('created', 'existing', 'extra', 'dropped'):
+            for name in entry[label]:
+                click.echo(f"  {label}: {name}")
+        for conflict in entry['conflicts']:
+            click.echo(f"  conflict: {conflict['name']} declared={conflict['declared']} present={conflict['present']}")
+        for error in entry['errors']:
+            click.echo(f"  error: {error}")
+
+
+def init_indexes(app):
+    """Register the index CLI, build required indexes and optionally bootstrap the rest at startup."""
+    app.cli.add_command(ensure_indexes_command)
+    if app.config.get('MONGO_REQUIRE_INDEXES', True):
+        with app.app_context():
+            ensure_required_indexes()
+    if app.config.get('MONGO_ENSURE_INDEXES_ON_STARTUP'):
+        ensure_indexes_in_background(app)
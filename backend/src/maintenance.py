@@ -0,0 +1,16 @@
+"""Maintenance jobs, exposed as Flask CLI commands for cron/one-off runs."""
+import click
+from .models.notification import Notification
+
+
+@click.command('repair-notification-counters')
+@click.option('--user-id', 'user_ids', multiple=True, help='Only repair these users (repeatable).')
+def repair_notification_counters_command(user_ids):
+    """Reconcile materialized unread-notification counters with the notifications."""
+    repaired = Notification.repair_unread_counters(list(user_ids) or None)
+    click.echo(f"Repaired {repaired} notification counter(s)")
+
+
+def init_maintenance(app):
+    """Register the maintenance CLI commands."""
+    app.cli.add_command(repair_notification_counters_command)
@@ -0,0 +1,39 @@
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+from ..database import get_db, ACTIVITIES_COLLECTION
+
+
+class Activity:
+    """Activity feed entry shown on a user's dashboard."""
+
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING)]),
+    ]
+
+    @staticmethod
+    def create(user_id, activity_type, title, description, icon='BellIcon', color='bg-primary', activity_id=None):
+        """Create an activity entry for a user.
+        
+        Passing a deterministic activity_id makes the call idempotent: a
+        repeated call with the same id leaves the existing entry in place.
+        """
+        db = get_db()
+        activity = {
+            'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
+            'type': activity_type,
+            'title': title,
+            'description': description,
+            'timestamp': datetime.utcnow(),
+            'icon': icon,
+            'color': color,
+        }
+        if activity_id is not None:
+            activity['_id'] = activity_id
+        try:
+            result = db[ACTIVITIES_COLLECTION].insert_one(activity)
+        except DuplicateKeyError:
+            return db[ACTIVITIES_COLLECTION].find_one({'_id': activity_id})
+        activity['_id'] = result.inserted_id
+        return activity
@@ -1,13 +1,74 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 from ..database import get_db, APPOINTMENTS_COLLECTION
+from .pagination import paginate
+
+
+class AppointmentStatus:
+    """Appointment lifecycle states."""
+    PENDING = 'pending'
+    CONFIRMED = 'confirmed'
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    REJECTED = 'rejected'
+    CANCELLED = 'cancelled'
+
+
+# Allowed transitions: current status -> statuses it may move to.
+# pending -> pending and confirmed -> pending are reschedules.
+TRANSITIONS = {
+    AppointmentStatus.PENDING: {AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED,
+                                AppointmentStatus.REJECTED, AppointmentStatus.CANCELLED},
+    AppointmentStatus.CONFIRMED: {AppointmentStatus.PENDING, AppointmentStatus.IN_PROGRESS,
+                                  AppointmentStatus.COMPLETED, AppointmentStatus.REJECTED,
+                                  AppointmentStatus.CANCELLED},
+    AppointmentStatus.IN_PROGRESS: {AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED},
+    AppointmentStatus.COMPLETED: set(),
+    AppointmentStatus.REJECTED: set(),
+    AppointmentStatus.CANCELLED: set(),
+}
+
+# Statuses that hold a doctor's time slot; cancelled/rejected appointments free it
+SLOT_HOLDING_STATUSES = [AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED,
+                         AppointmentStatus.IN_PROGRESS, AppointmentStatus.COMPLETED]
+
+
+class SlotTakenError(Exception):
+    """Raised when a doctor's date/time slot is already held by another appointment."""
+
+    def __init__(self, doctor_id, date, time):
+        super().__init__(f'Slot {date} {time} is already booked')
+        self.doctor_id = doctor_id
+        self.date = date
+        self.time = time
+
 
 class Appointment:
     """Appointment model."""
+
+    INDEXES = [
+        IndexModel([('patient_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('doctor_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('doctor_id', ASCENDING), ('date', ASCENDING), ('status', ASCENDING)]),
+        IndexModel([('status', ASCENDING)]),
+        # At most one slot-holding appointment per doctor/date/time (MongoDB 6.0+ for $in)
+        IndexModel(
+            [('doctor_id', ASCENDING), ('date', ASCENDING), ('time', ASCENDING)],
+            name='unique_active_slot',
+            unique=True,
+            partialFilterExpression={'status': {'$in': SLOT_HOLDING_STATUSES}}
+        ),
+    ]
     
     @staticmethod
     def create(patient_id, doctor_id, doctor_name, date, time, symptoms=''):
-        """Create a new appointment."""
+        """Create a new appointment, reserving the slot atomically.
+        
+        Raises SlotTakenError if the doctor already has an active appointment
+        at that date and time.
+        """
         db = get_db()
         appointment_data = {
             'patient_id': ObjectId(patient_id) if isinstance(patient_id, str) else patient_id,
@@ -19,7 +80,10 @@ class Appointment:
             'symptoms': symptoms,
             'created_at': datetime.utcnow()
         }
-        result = db[APPOINTMENTS_COLLECTION].insert_one(appointment_data)
+        try:
+            result = db[APPOINTMENTS_COLLECTION].insert_one(appointment_data)
+        except DuplicateKeyError:
+            raise SlotTakenError(appointment_data['doctor_id'], date, time)
         appointment_data['_id'] = result.inserted_id
         return appointment_data
     
@@ -39,6 +103,33 @@ class Appointment:
             doctor_id = ObjectId(doctor_id)
         return list(db[APPOINTMENTS_COLLECTION].find({'doctor_id': doctor_id}))
     
+    @staticmethod
+    def find_page_by_patient_id(patient_id, after=None, limit=None):
+        """Get a page of a patient's appointments, newest first. Returns (appointments, next_cursor)."""
+        db = get_db()
+        if isinstance(patient_id, str):
+            patient_id = ObjectId(patient_id)
+        return paginate(db[APPOINTMENTS_COLLECTION], {'patient_id': patient_id}, after=after, limit=limit)
+    
+    @staticmethod
+    def find_page_by_doctor_id(doctor_id, after=None, limit=None):
+        """Get a page of a doctor's appointments, newest first. Returns (appointments, next_cursor)."""
+        db = get_db()
+        if isinstance(doctor_id, str):
+            doctor_id = ObjectId(doctor_id)
+        return paginate(db[APPOINTMENTS_COLLECTION], {'doctor_id': doctor_id}, after=after, limit=limit)
+    
+    @staticmethod
+    def find_active_ids(patient_id=None, doctor_id=None):
+        """Get the ids of a patient's or doctor's pending and confirmed appointments."""
+        db = get_db()
+        query = {'status': {'$in': ['pending', 'confirmed']}}
+        if patient_id is not None:
+            query['patient_id'] = ObjectId(patient_id) if isinstance(patient_id, str) else patient_id
+        if doctor_id is not None:
+            query['doctor_id'] = ObjectId(doctor_id) if isinstance(doctor_id, str) else doctor_id
+        return [appt['_id'] for appt in db[APPOINTMENTS_COLLECTION].find(query, {'_id': 1})]
+    
     @staticmethod
     def find_by_id(appointment_id):
         """Find an appointment by ID."""
@@ -49,7 +140,7 @@ class Appointment:
     
     @staticmethod
     def update_status(appointment_id, status):
-        """Update appointment status."""
+        """Set the status without transition checks; routes go through services.lifecycle."""
         db = get_db()
         if isinstance(appointment_id, str):
             appointment_id = ObjectId(appointment_id)
@@ -71,6 +162,34 @@ class Appointment:
         )
         return Appointment.find_by_id(appointment_id)
     
+    @staticmethod
+    def transition(appointment_id, to_status, updates=None, match=None):
+        """Move an appointment to `to_status` in one find_one_and_update.
+        
+        Only applies if the current status allows the transition and the
+        document also matches `match` (e.g. an ownership check). Returns
+        (before, after) documents, or None if nothing matched. Raises
+        SlotTakenError if the move lands on a slot held by another appointment.
+        """
+        db = get_db()
+        if isinstance(appointment_id, str):
+            appointment_id = ObjectId(appointment_id)
+        allowed_from = [status for status, targets in TRANSITIONS.items() if to_status in targets]
+        changes = dict(updates or {}, status=to_status)
+        
+        try:
+            before = db[APPOINTMENTS_COLLECTION].find_one_and_update(
+                {'_id': appointment_id, 'status': {'$in': allowed_from}, **(match or {})},
+                {'$set': changes},
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            current = Appointment.find_by_id(appointment_id)
+            raise SlotTakenError(current['doctor_id'] if current else None, changes.get('date'), changes.get('time'))
+        if before is None:
+            return None
+        return before, dict(before, **changes)
+    
     @staticmethod
     def delete(appointment_id):
         """Delete an appointment."""
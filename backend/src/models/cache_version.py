@@ -0,0 +1,33 @@
+from datetime import datetime
+from ..database import get_db
+
+CACHE_VERSIONS_COLLECTION = 'cache_versions'
+
+# Cache names
+DOCTOR_DIRECTORY_CACHE = 'doctor_directory'
+
+
+class CacheVersion:
+    """Shared version counters used to invalidate per-process caches.
+
+    Each worker keeps its own in-memory cache and compares the version it was
+    built from with the stored counter, so a write handled by one worker
+    invalidates the caches of all workers.
+    """
+
+    @staticmethod
+    def get(name):
+        """Get the current version of a cache (0 if never bumped)."""
+        db = get_db()
+        doc = db[CACHE_VERSIONS_COLLECTION].find_one({'_id': name})
+        return doc['version'] if doc else 0
+
+    @staticmethod
+    def bump(name):
+        """Invalidate a cache everywhere by incrementing its version."""
+        db = get_db()
+        db[CACHE_VERSIONS_COLLECTION].update_one(
+            {'_id': name},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
@@ -1,87 +1,244 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 from ..database import get_db, CHAT_HISTORY_COLLECTION
+from .pagination import encode_position_cursor, decode_position_cursor
+
+CHAT_BUCKETS_COLLECTION = 'chat_message_buckets'
+
+# Messages per bucket document; positions 0..49 go to bucket 0, 50..99 to bucket 1, ...
+BUCKET_SIZE = 50
 
 
 class ChatHistory:
-    """Model for storing chatbot conversation history."""
-    
+    """Model for storing chatbot conversation history.
+
+    The chat_history document is a small per-user header (message count and
+    the rolling summary of older turns). The messages themselves live in
+    chat_message_buckets documents of at most BUCKET_SIZE messages, so no
+    document grows without bound.
+    """
+
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING)], unique=True),
+    ]
+
+    BUCKET_INDEXES = [
+        IndexModel([('user_id', ASCENDING), ('seq', ASCENDING)], unique=True),
+    ]
+
+    @staticmethod
+    def _user_oid(user_id):
+        return ObjectId(user_id) if isinstance(user_id, str) else user_id
+
     @staticmethod
     def find_by_user_id(user_id):
-        """Get chat history for a user."""
+        """Get the chat history header for a user."""
+        db = get_db()
+        user_id = ChatHistory._user_oid(user_id)
+        header = db[CHAT_HISTORY_COLLECTION].find_one({'user_id': user_id})
+        if header and 'messages' in header:
+            header = ChatHistory._migrate_legacy(header)
+        return header
+
+    @staticmethod
+    def _migrate_legacy(header):
+        """Move a pre-bucket embedded `messages` array into buckets."""
         db = get_db()
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
-        return db[CHAT_HISTORY_COLLECTION].find_one({'user_id': user_id})
-    
+        messages = header.get('messages') or []
+        for seq in range(0, (len(messages) + BUCKET_SIZE - 1) // BUCKET_SIZE):
+            chunk = messages[seq * BUCKET_SIZE:(seq + 1) * BUCKET_SIZE]
+            db[CHAT_BUCKETS_COLLECTION].update_one(
+                {'user_id': header['user_id'], 'seq': seq},
+                {'$setOnInsert': {
+                    'messages': [
+                        dict(msg, position=seq * BUCKET_SIZE + i) for i, msg in enumerate(chunk)
+                    ],
+                    'created_at': datetime.utcnow()
+                }},
+                upsert=True
+            )
+        return db[CHAT_HISTORY_COLLECTION].find_one_and_update(
+            {'_id': header['_id'], 'messages': {'$exists': True}},
+            {'$unset': {'messages': ''}, '$set': {'message_count': len(messages)}},
+            return_document=ReturnDocument.AFTER
+        ) or db[CHAT_HISTORY_COLLECTION].find_one({'_id': header['_id']})
+
     @staticmethod
     def create(user_id, messages=None):
         """Create a new chat history entry."""
         db = get_db()
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
-        
+        user_id = ChatHistory._user_oid(user_id)
+
         chat_data = {
             'user_id': user_id,
-            'messages': messages or [],
+            'message_count': 0,
+            'summary': '',
+            'summarized_through': 0,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
         result = db[CHAT_HISTORY_COLLECTION].insert_one(chat_data)
         chat_data['_id'] = result.inserted_id
+        ChatHistory.add_messages(user_id, [(message['role'], message['content']) for message in messages or []])
         return chat_data
-    
+
+    @staticmethod
+    def _reserve_positions(user_id, count):
+        """Atomically reserve `count` message positions. Returns the first one."""
+        db = get_db()
+        update = {
+            '$inc': {'message_count': count},
+            '$set': {'updated_at': datetime.utcnow()},
+            '$setOnInsert': {'summary': '', 'summarized_through': 0, 'created_at': datetime.utcnow()}
+        }
+        try:
+            header = db[CHAT_HISTORY_COLLECTION].find_one_and_update(
+                {'user_id': user_id}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another request created the header first
+            header = db[CHAT_HISTORY_COLLECTION].find_one_and_update(
+                {'user_id': user_id}, update, return_document=ReturnDocument.AFTER
+            )
+        if 'messages' in header:
+            # Legacy document: migrating resets message_count, so reserve again
+            ChatHistory._migrate_legacy(header)
+            header = db[CHAT_HISTORY_COLLECTION].find_one_and_update(
+                {'user_id': user_id}, update, return_document=ReturnDocument.AFTER
+            )
+        return header['message_count'] - count
+
     @staticmethod
     def add_message(user_id, role, content):
         """Add a message to chat history."""
+        return ChatHistory.add_messages(user_id, [(role, content)])[0]
+
+    @staticmethod
+    def add_messages(user_id, messages):
+        """Append (role, content) pairs in order.
+
+        Costs one header update to reserve positions and one `$push` with
+        `$each`, or two when the messages straddle a bucket boundary.
+        """
+        if not messages:
+            return []
         db = get_db()
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
-        
-        message = {
+        user_id = ChatHistory._user_oid(user_id)
+        position = ChatHistory._reserve_positions(user_id, len(messages))
+
+        timestamp = datetime.utcnow().isoformat()
+        added = [{
             'role': role,  # 'user' or 'assistant'
             'content': content,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        
-        # Try to update existing history
-        result = db[CHAT_HISTORY_COLLECTION].update_one(
-            {'user_id': user_id},
-            {
-                '$push': {'messages': message},
-                '$set': {'updated_at': datetime.utcnow()}
-            }
-        )
-        
-        # If no existing history, create new
-        if result.matched_count == 0:
-            ChatHistory.create(user_id, [message])
-        
-        return message
-    
+            'timestamp': timestamp
+        } for role, content in messages]
+        buckets = {}
+        for offset, message in enumerate(added):
+            buckets.setdefault((position + offset) // BUCKET_SIZE, []).append(dict(message, position=position + offset))
+        for seq, bucket_messages in buckets.items():
+            db[CHAT_BUCKETS_COLLECTION].update_one(
+                {'user_id': user_id, 'seq': seq},
+                {
+                    '$push': {'messages': {'$each': bucket_messages}},
+                    '$setOnInsert': {'created_at': datetime.utcnow()}
+                },
+                upsert=True
+            )
+        return added
+
+    @staticmethod
+    def get_messages_range(user_id, start, end=None):
+        """Get messages with positions in [start, end) in order."""
+        db = get_db()
+        query = {'user_id': ChatHistory._user_oid(user_id), 'seq': {'$gte': start // BUCKET_SIZE}}
+        if end is not None:
+            if end <= start:
+                return []
+            query['seq']['$lte'] = (end - 1) // BUCKET_SIZE
+
+        messages = []
+        for bucket in db[CHAT_BUCKETS_COLLECTION].find(query).sort('seq', ASCENDING):
+            for msg in sorted(bucket.get('messages', []), key=lambda m: m['position']):
+                if msg['position'] >= start and (end is None or msg['position'] < end):
+                    msg = dict(msg)
+                    del msg['position']
+                    messages.append(msg)
+        return messages
+
     @staticmethod
     def get_messages(user_id):
         """Get all messages for a user."""
-        history = ChatHistory.find_by_user_id(user_id)
-        if history:
-            return history.get('messages', [])
-        return []
-    
+        if not ChatHistory.find_by_user_id(user_id):
+            return []
+        return ChatHistory.get_messages_range(user_id, 0)
+
+    @staticmethod
+    def get_messages_page(user_id, after=None, limit=None):
+        """Get a page of messages, newest page first (each page in chronological order).
+
+        Returns (messages, next_cursor); the cursor points at older messages.
+        """
+        if limit is None:
+            return ChatHistory.get_messages(user_id), None
+
+        if after:
+            end = decode_position_cursor(after)
+        else:
+            header = ChatHistory.find_by_user_id(user_id)
+            end = header.get('message_count', 0) if header else 0
+
+        start = max(0, end - limit)
+        if end <= start:
+            return [], None
+
+        messages = ChatHistory.get_messages_range(user_id, start, end)
+        return messages, encode_position_cursor(start) if start > 0 else None
+
+    @staticmethod
+    def update_summary(history_id, summary, summarized_through):
+        """Store a rolling summary of the messages before `summarized_through`.
+
+        Keyed by the header _id so a summary of cleared history is dropped.
+        Ignored if a summary covering as many messages was stored meanwhile.
+        """
+        db = get_db()
+        result = db[CHAT_HISTORY_COLLECTION].update_one(
+            {'_id': history_id, 'summarized_through': {'$lt': summarized_through}},
+            {'$set': {'summary': summary, 'summarized_through': summarized_through}}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def request_summary(user_id, through):
+        """Claim the job of summarizing up to `through`; False if already requested."""
+        db = get_db()
+        result = db[CHAT_HISTORY_COLLECTION].update_one(
+            {
+                'user_id': ChatHistory._user_oid(user_id),
+                'summary_requested_through': {'$not': {'$gte': through}}
+            },
+            {'$set': {'summary_requested_through': through}}
+        )
+        return result.modified_count == 1
+
     @staticmethod
     def clear_history(user_id):
         """Clear chat history for a user."""
         db = get_db()
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
+        user_id = ChatHistory._user_oid(user_id)
+        db[CHAT_BUCKETS_COLLECTION].delete_many({'user_id': user_id})
         return db[CHAT_HISTORY_COLLECTION].delete_one({'user_id': user_id})
-    
+
     @staticmethod
     def to_dict(history):
         """Convert chat history to dictionary."""
         return {
             'id': str(history['_id']),
             'user_id': str(history['user_id']),
-            'messages': history.get('messages', []),
+            'messages': ChatHistory.get_messages(history['user_id']),
+            'summary': history.get('summary', ''),
             'created_at': history.get('created_at', '').isoformat() if history.get('created_at') else '',
             'updated_at': history.get('updated_at', '').isoformat() if history.get('updated_at') else ''
         }
@@ -0,0 +1,88 @@
+import uuid
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+from ..database import get_db
+
+CHAT_TURNS_COLLECTION = 'chat_turns'
+
+# Idle turn records are dropped after a day
+CHAT_TURN_TTL_SECONDS = 24 * 60 * 60
+
+RUNNING = 'running'
+DONE = 'done'
+
+
+class ChatTurn:
+    """Per-user chatbot turn lock, shared by all workers.
+
+    One document per user (_id is the user id) holding the turn in progress,
+    or the last completed turn and its reply. A running turn's lock expires
+    at locked_until, so a crashed worker cannot block the user for good.
+    """
+
+    INDEXES = [
+        IndexModel([('updated_at', ASCENDING)], expireAfterSeconds=CHAT_TURN_TTL_SECONDS),
+    ]
+
+    @staticmethod
+    def _user_oid(user_id):
+        # Any id works as a lock key; ObjectId strings match the users' _id
+        return ObjectId(user_id) if isinstance(user_id, str) and ObjectId.is_valid(user_id) else user_id
+
+    @staticmethod
+    def get(user_id):
+        db = get_db()
+        return db[CHAT_TURNS_COLLECTION].find_one({'_id': ChatTurn._user_oid(user_id)})
+
+    @staticmethod
+    def acquire(user_id, message_hash, lease_seconds=120):
+        """Start a turn unless another one is running. Returns its token, or None."""
+        db = get_db()
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        try:
+            db[CHAT_TURNS_COLLECTION].find_one_and_update(
+                {
+                    '_id': ChatTurn._user_oid(user_id),
+                    '$or': [{'status': DONE}, {'locked_until': {'$lt': now}}]
+                },
+                {
+                    '$set': {
+                        'status': RUNNING,
+                        'token': token,
+                        'message_hash': message_hash,
+                        'locked_until': now + timedelta(seconds=lease_seconds),
+                        'updated_at': now
+                    },
+                    '$unset': {'reply': '', 'completed_at': ''}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The user's document exists and its turn is still running
+            return None
+        return token
+
+    @staticmethod
+    def complete(user_id, token, reply):
+        """Finish a turn, keeping its reply for duplicate submissions."""
+        db = get_db()
+        now = datetime.utcnow()
+        result = db[CHAT_TURNS_COLLECTION].update_one(
+            {'_id': ChatTurn._user_oid(user_id), 'token': token},
+            {
+                '$set': {'status': DONE, 'reply': reply, 'completed_at': now, 'updated_at': now},
+                '$unset': {'locked_until': ''}
+            }
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def release(user_id, token):
+        """Drop a turn that failed, so the next message can start right away."""
+        db = get_db()
+        result = db[CHAT_TURNS_COLLECTION].delete_one({'_id': ChatTurn._user_oid(user_id), 'token': token})
+        return result.deleted_count == 1
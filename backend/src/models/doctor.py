@@ -1,8 +1,24 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING
 from ..database import get_db, DOCTORS_COLLECTION
+from .loader import get_loader, clear_loaders
+from .cache_version import CacheVersion, DOCTOR_DIRECTORY_CACHE
 
 class Doctor:
     """Doctor model."""
+
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING)]),
+        IndexModel([('verification_status', ASCENDING)]),
+        IndexModel([('verified', ASCENDING), ('specialty', ASCENDING)]),
+        IndexModel([('pending_profile_update_at', ASCENDING)], sparse=True),
+    ]
+    
+    @staticmethod
+    def _changed():
+        """Invalidate request-scoped and shared doctor caches after a write."""
+        clear_loaders(DOCTORS_COLLECTION)
+        CacheVersion.bump(DOCTOR_DIRECTORY_CACHE)
     
     @staticmethod
     def create(user_id, name, specialty, location, availability, rating, image, verified=False):
@@ -22,6 +38,7 @@ class Doctor:
         }
         result = db[DOCTORS_COLLECTION].insert_one(doctor_data)
         doctor_data['_id'] = result.inserted_id
+        Doctor._changed()
         return doctor_data
     
     @staticmethod
@@ -45,6 +62,11 @@ class Doctor:
             doctor_id = ObjectId(doctor_id)
         return db[DOCTORS_COLLECTION].find_one({'_id': doctor_id})
     
+    @staticmethod
+    def find_many_by_ids(doctor_ids):
+        """Find many doctors by ID with one query. Returns {ObjectId: doctor or None}."""
+        return get_loader(DOCTORS_COLLECTION).load_many(doctor_ids)
+    
     @staticmethod
     def find_by_user_id(user_id):
         """Find a doctor by user ID."""
@@ -63,6 +85,7 @@ class Doctor:
             {'_id': doctor_id},
             {'$set': update_data}
         )
+        Doctor._changed()
         return Doctor.find_by_id(doctor_id)
     
     @staticmethod
@@ -87,7 +110,9 @@ class Doctor:
         db = get_db()
         if isinstance(doctor_id, str):
             doctor_id = ObjectId(doctor_id)
-        return db[DOCTORS_COLLECTION].delete_one({'_id': doctor_id})
+        result = db[DOCTORS_COLLECTION].delete_one({'_id': doctor_id})
+        Doctor._changed()
+        return result
     
     @staticmethod
     def to_dict(doctor):
@@ -126,6 +151,7 @@ class Doctor:
                 'pending_profile_update_at': datetime.utcnow()
             }}
         )
+        Doctor._changed()
         return Doctor.find_by_id(doctor_id)
     
     @staticmethod
@@ -149,6 +175,7 @@ class Doctor:
                 }
             }
         )
+        Doctor._changed()
         return Doctor.find_by_id(doctor_id)
     
     @staticmethod
@@ -164,6 +191,7 @@ class Doctor:
                 'pending_profile_update_at': ''
             }}
         )
+        Doctor._changed()
         return Doctor.find_by_id(doctor_id)
     
     @staticmethod
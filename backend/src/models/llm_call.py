@@ -0,0 +1,78 @@
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from datetime import datetime
+from ..database import get_db
+
+LLM_CALLS_COLLECTION = 'llm_calls'
+
+# Call records are kept for 30 days
+LLM_CALL_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Outcomes counted as failed calls; 'cancelled' streams were abandoned by the client
+FAILED_OUTCOMES = ['error', 'refused', 'timeout']
+
+
+class LLMCall:
+    """Rolling log of LLM calls: sizes, latency and outcome of each call."""
+
+    INDEXES = [
+        IndexModel([('created_at', ASCENDING)], expireAfterSeconds=LLM_CALL_TTL_SECONDS),
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('route', ASCENDING), ('created_at', DESCENDING)]),
+    ]
+
+    @staticmethod
+    def record(call):
+        """Store one call record (see services.llm_usage.CallRecord)."""
+        db = get_db()
+        doc = dict(call)
+        if isinstance(doc.get('user_id'), str) and ObjectId.is_valid(doc['user_id']):
+            doc['user_id'] = ObjectId(doc['user_id'])
+        doc['created_at'] = datetime.utcnow()
+        db[LLM_CALLS_COLLECTION].insert_one(doc)
+        return doc
+
+    @staticmethod
+    def _totals(group_id):
+        return {
+            '_id': group_id,
+            'calls': {'$sum': 1},
+            'failed': {'$sum': {'$cond': [{'$in': ['$outcome', FAILED_OUTCOMES]}, 1, 0]}},
+            'prompt_tokens': {'$sum': '$prompt_tokens'},
+            'completion_tokens': {'$sum': '$completion_tokens'},
+            'prompt_chars': {'$sum': '$prompt_chars'},
+            'avg_latency_ms': {'$avg': '$latency_ms'},
+            'max_latency_ms': {'$max': '$latency_ms'},
+            'avg_first_token_ms': {'$avg': '$first_token_ms'},
+        }
+
+    @staticmethod
+    def usage_by(field, since, limit=None):
+        """Aggregate calls since `since` per value of `field`, most prompt tokens first."""
+        db = get_db()
+        pipeline = [
+            {'$match': {'created_at': {'$gte': since}}},
+            {'$group': LLMCall._totals(f'${field}')},
+            {'$sort': {'prompt_tokens': -1}},
+        ]
+        if limit:
+            pipeline.append({'$limit': limit})
+        return list(db[LLM_CALLS_COLLECTION].aggregate(pipeline))
+
+    @staticmethod
+    def to_dict(usage):
+        """Convert an aggregated usage row to a JSON-serializable dict."""
+        def rounded(value):
+            return round(value, 1) if value is not None else None
+
+        return {
+            'key': str(usage['_id']) if usage['_id'] is not None else None,
+            'calls': usage['calls'],
+            'failed': usage['failed'],
+            'promptTokens': usage['prompt_tokens'],
+            'completionTokens': usage['completion_tokens'],
+            'promptChars': usage['prompt_chars'],
+            'avgLatencyMs': rounded(usage['avg_latency_ms']),
+            'maxLatencyMs': rounded(usage['max_latency_ms']),
+            'avgFirstTokenMs': rounded(usage['avg_first_token_ms']),
+        }
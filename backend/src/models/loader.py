@@ -0,0 +1,71 @@
+from bson import ObjectId
+from flask import g
+from ..database import get_db
+
+
+class BatchLoader:
+    """Request-scoped loader that resolves many ids with a single $in query.
+
+    Results are memoized for the rest of the request, so repeated lookups of
+    the same id (e.g. one patient with many appointments) hit the database
+    only once.
+    """
+
+    def __init__(self, collection_name, key='_id'):
+        self.collection_name = collection_name
+        self.key = key
+        self._cache = {}
+
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, str):
+            return ObjectId(value) if ObjectId.is_valid(value) else None
+        return value
+
+    def load_many(self, ids):
+        """Get a dict mapping each requested id to its document (or None)."""
+        keys = [self._normalize(i) for i in ids]
+        keys = [k for k in keys if k is not None]
+        missing = [k for k in dict.fromkeys(keys) if k not in self._cache]
+
+        if missing:
+            db = get_db()
+            for doc in db[self.collection_name].find({self.key: {'$in': missing}}):
+                # Keep the first match, like find_one
+                self._cache.setdefault(doc[self.key], doc)
+            for k in missing:
+                self._cache.setdefault(k, None)
+
+        return {k: self._cache[k] for k in keys}
+
+    def load(self, id_value):
+        """Get a single document through the loader."""
+        key = self._normalize(id_value)
+        if key is None:
+            return None
+        return self.load_many([key])[key]
+
+    def clear(self, id_value=None):
+        """Forget one memoized id, or everything."""
+        if id_value is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(self._normalize(id_value), None)
+
+
+def get_loader(collection_name, key='_id'):
+    """Get the loader for a collection/key pair for the current request."""
+    if '_loaders' not in g:
+        g._loaders = {}
+    loader = g._loaders.get((collection_name, key))
+    if loader is None:
+        loader = BatchLoader(collection_name, key)
+        g._loaders[(collection_name, key)] = loader
+    return loader
+
+
+def clear_loaders(collection_name):
+    """Drop memoized documents for a collection after it was modified."""
+    for (name, key), loader in g.get('_loaders', {}).items():
+        if name == collection_name:
+            loader.clear()
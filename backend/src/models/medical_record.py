@@ -1,8 +1,13 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING
 from ..database import get_db, MEDICAL_RECORDS_COLLECTION
 
 class MedicalRecord:
     """Medical Record model."""
+
+    INDEXES = [
+        IndexModel([('patient_id', ASCENDING)]),
+    ]
     
     @staticmethod
     def create(patient_id, date, record_type, doctor, description, result, notes):
@@ -1,11 +1,27 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
-from ..database import get_db
+from ..database import get_db, APPOINTMENTS_COLLECTION, DOCTORS_COLLECTION
+from ..services.events import publish, user_channel
+from .loader import get_loader
+from .pagination import paginate
 
 MESSAGES_COLLECTION = 'messages'
+# One read pointer per appointment participant (patient/doctor role)
+MESSAGE_READS_COLLECTION = 'message_reads'
 
 class Message:
     """Chat Message model for doctor-patient communication."""
+
+    INDEXES = [
+        IndexModel([('appointment_id', ASCENDING), ('created_at', ASCENDING)]),
+        IndexModel([('appointment_id', ASCENDING), ('sender_role', ASCENDING), ('created_at', ASCENDING)]),
+    ]
+
+    READ_MARKER_INDEXES = [
+        IndexModel([('appointment_id', ASCENDING), ('role', ASCENDING)], unique=True),
+    ]
     
     @staticmethod
     def create(appointment_id, sender_id, sender_role, content):
@@ -16,13 +32,27 @@ class Message:
             'sender_id': ObjectId(sender_id) if isinstance(sender_id, str) else sender_id,
             'sender_role': sender_role,  # 'doctor' or 'patient'
             'content': content,
-            'created_at': datetime.utcnow(),
-            'read': False
+            'created_at': datetime.utcnow()
         }
         result = db[MESSAGES_COLLECTION].insert_one(message_data)
         message_data['_id'] = result.inserted_id
+        
+        for user_id in Message.participant_user_ids(message_data['appointment_id']):
+            publish(user_channel(user_id), 'message', Message.to_dict(message_data))
         return message_data
     
+    @staticmethod
+    def participant_user_ids(appointment_id):
+        """Get the user ids of the patient and doctor of an appointment."""
+        appointment = get_loader(APPOINTMENTS_COLLECTION).load(appointment_id)
+        if not appointment:
+            return []
+        user_ids = [str(appointment['patient_id'])]
+        doctor = get_loader(DOCTORS_COLLECTION).load(appointment['doctor_id'])
+        if doctor and doctor.get('user_id'):
+            user_ids.append(str(doctor['user_id']))
+        return user_ids
+    
     @staticmethod
     def find_by_appointment(appointment_id):
         """Get all messages for an appointment."""
@@ -34,34 +64,181 @@ class Message:
         ).sort('created_at', 1))
     
     @staticmethod
-    def mark_as_read(appointment_id, reader_role):
-        """Mark all messages as read for a reader."""
+    def find_by_id(message_id):
+        """Find a message by ID."""
+        db = get_db()
+        if isinstance(message_id, str):
+            message_id = ObjectId(message_id)
+        return db[MESSAGES_COLLECTION].find_one({'_id': message_id})
+    
+    @staticmethod
+    def find_page_by_appointment(appointment_id, after=None, limit=None):
+        """Get a page of an appointment's messages, oldest first. Returns (messages, next_cursor)."""
         db = get_db()
         if isinstance(appointment_id, str):
             appointment_id = ObjectId(appointment_id)
-        # Mark messages from the other role as read
-        other_role = 'patient' if reader_role == 'doctor' else 'doctor'
-        db[MESSAGES_COLLECTION].update_many(
-            {'appointment_id': appointment_id, 'sender_role': other_role},
-            {'$set': {'read': True}}
+        return paginate(
+            db[MESSAGES_COLLECTION], {'appointment_id': appointment_id},
+            direction=ASCENDING, after=after, limit=limit
         )
     
+    @staticmethod
+    def get_read_markers(appointment_id):
+        """Get each participant's read pointer as {role: (created_at, message _id)}."""
+        db = get_db()
+        if isinstance(appointment_id, str):
+            appointment_id = ObjectId(appointment_id)
+        return {
+            marker['role']: (marker['last_read_at'], marker['last_read_id'])
+            for marker in db[MESSAGE_READS_COLLECTION].find({'appointment_id': appointment_id})
+        }
+    
+    @staticmethod
+    def _after_pointer(pointer):
+        """Filter for messages ordered after a (created_at, _id) read pointer."""
+        last_read_at, last_read_id = pointer
+        return {'$or': [
+            {'created_at': {'$gt': last_read_at}},
+            {'created_at': last_read_at, '_id': {'$gt': last_read_id}}
+        ]}
+    
+    @staticmethod
+    def mark_as_read(appointment_id, reader_role, up_to=None):
+        """Move a reader's read pointer forward to the message `up_to` (default: the latest).
+        
+        Messages from the other participant ordered at or before the pointer
+        count as read. The pointer never moves backwards. Returns the pointer.
+        """
+        db = get_db()
+        if isinstance(appointment_id, str):
+            appointment_id = ObjectId(appointment_id)
+        if up_to is None:
+            up_to = db[MESSAGES_COLLECTION].find_one(
+                {'appointment_id': appointment_id}, sort=[('created_at', -1), ('_id', -1)]
+            )
+            if not up_to:
+                return None
+        pointer = (up_to['created_at'], up_to['_id'])
+        
+        key = {'appointment_id': appointment_id, 'role': reader_role}
+        update = {'$set': {
+            'last_read_at': pointer[0],
+            'last_read_id': pointer[1],
+            'updated_at': datetime.utcnow()
+        }}
+        # Only an older pointer matches, so concurrent readers cannot move it back
+        older = {'$or': [
+            {'last_read_at': {'$lt': pointer[0]}},
+            {'last_read_at': pointer[0], 'last_read_id': {'$lt': pointer[1]}}
+        ]}
+        result = db[MESSAGE_READS_COLLECTION].update_one({**key, **older}, update)
+        if result.matched_count == 0:
+            # Either no pointer yet (insert it) or it is already at/after this message
+            try:
+                result = db[MESSAGE_READS_COLLECTION].update_one(
+                    key, {'$setOnInsert': update['$set']}, upsert=True
+                )
+            except DuplicateKeyError:
+                result = None
+            if result is None or result.upserted_id is None:
+                return Message.get_read_markers(appointment_id).get(reader_role)
+        
+        for user_id in Message.participant_user_ids(appointment_id):
+            publish(user_channel(user_id), 'message_read', {
+                'appointmentId': str(appointment_id),
+                'role': reader_role,
+                'lastReadId': str(pointer[1]),
+                'lastReadAt': pointer[0].isoformat()
+            })
+        return pointer
+    
+    @staticmethod
+    def mark_delivered_as_read(appointment_id, reader_role, messages, markers):
+        """Advance the reader's pointer past newly delivered messages from the other side.
+        
+        Writes only when the delivered batch contains something newer than the
+        stored pointer, so repeated polls of an unchanged thread cost no write.
+        Updates `markers` in place and returns it.
+        """
+        other_role = 'patient' if reader_role == 'doctor' else 'doctor'
+        incoming = [msg for msg in messages if msg['sender_role'] == other_role]
+        if not incoming:
+            return markers
+        
+        newest = max(incoming, key=lambda msg: (msg['created_at'], msg['_id']))
+        current = markers.get(reader_role)
+        if current is None or (newest['created_at'], newest['_id']) > current:
+            markers[reader_role] = Message.mark_as_read(appointment_id, reader_role, newest)
+        return markers
+    
     @staticmethod
     def get_unread_count(appointment_id, reader_role):
-        """Get count of unread messages."""
+        """Get count of messages from the other participant after the reader's pointer."""
         db = get_db()
         if isinstance(appointment_id, str):
             appointment_id = ObjectId(appointment_id)
         other_role = 'patient' if reader_role == 'doctor' else 'doctor'
-        return db[MESSAGES_COLLECTION].count_documents({
-            'appointment_id': appointment_id,
-            'sender_role': other_role,
-            'read': False
-        })
+        query = {'appointment_id': appointment_id, 'sender_role': other_role}
+        pointer = Message.get_read_markers(appointment_id).get(reader_role)
+        if pointer:
+            query.update(Message._after_pointer(pointer))
+        else:
+            # Threads read before pointers existed still carry per-message flags
+            query['read'] = {'$ne': True}
+        return db[MESSAGES_COLLECTION].count_documents(query)
+    
+    @staticmethod
+    def get_unread_counts(appointment_ids, reader_role):
+        """Get unread counts for many appointments as {appointment_id str: count}.
+        
+        Costs two queries regardless of the number of appointments: one for
+        the reader's pointers and one aggregation grouped by appointment.
+        """
+        db = get_db()
+        ids = [ObjectId(a) if isinstance(a, str) else a for a in appointment_ids]
+        counts = {str(a): 0 for a in ids}
+        if not ids:
+            return counts
+        
+        other_role = 'patient' if reader_role == 'doctor' else 'doctor'
+        pointers = {
+            marker['appointment_id']: (marker['last_read_at'], marker['last_read_id'])
+            for marker in db[MESSAGE_READS_COLLECTION].find(
+                {'appointment_id': {'$in': ids}, 'role': reader_role}
+            )
+        }
+        
+        branches = [
+            {'appointment_id': a, **Message._after_pointer(pointers[a])}
+            for a in ids if a in pointers
+        ]
+        unpointed = [a for a in ids if a not in pointers]
+        if unpointed:
+            # Threads read before pointers existed still carry per-message flags
+            branches.append({'appointment_id': {'$in': unpointed}, 'read': {'$ne': True}})
+        
+        pipeline = [
+            {'$match': {'appointment_id': {'$in': ids}, 'sender_role': other_role, '$or': branches}},
+            {'$group': {'_id': '$appointment_id', 'count': {'$sum': 1}}}
+        ]
+        for row in db[MESSAGES_COLLECTION].aggregate(pipeline):
+            counts[str(row['_id'])] = row['count']
+        return counts
     
     @staticmethod
-    def to_dict(message):
-        """Convert message to dictionary."""
+    def to_dict(message, read_markers=None):
+        """Convert message to dictionary.
+        
+        `read_markers` (see get_read_markers) decides whether the recipient
+        has read the message.
+        """
+        recipient_role = 'patient' if message['sender_role'] == 'doctor' else 'doctor'
+        pointer = (read_markers or {}).get(recipient_role)
+        if pointer:
+            read = bool(message.get('created_at') and (message['created_at'], message['_id']) <= pointer)
+        else:
+            # Threads read before pointers existed still carry per-message flags
+            read = bool(message.get('read'))
         return {
             'id': str(message['_id']),
             'appointmentId': str(message['appointment_id']),
@@ -69,5 +246,5 @@ class Message:
             'senderRole': message['sender_role'],
             'content': message['content'],
             'createdAt': message['created_at'].isoformat() if message.get('created_at') else None,
-            'read': message.get('read', False)
+            'read': read
         }
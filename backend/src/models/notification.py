@@ -1,14 +1,28 @@
 from datetime import datetime
 from bson import ObjectId
-from ..database import get_db, NOTIFICATIONS_COLLECTION
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ..database import get_db, NOTIFICATIONS_COLLECTION, NOTIFICATION_COUNTERS_COLLECTION
+from ..services.events import publish, user_channel
 
 
 class Notification:
     """Notification model for user notifications."""
+
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('user_id', ASCENDING), ('read', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('user_id', ASCENDING), ('reference_id', ASCENDING)]),
+    ]
     
     @staticmethod
-    def create(user_id, title, message, notification_type='info', link=None, reference_id=None):
-        """Create a new notification."""
+    def create(user_id, title, message, notification_type='info', link=None, reference_id=None, notification_id=None):
+        """Create a new notification.
+        
+        Passing a deterministic notification_id makes the call idempotent: a
+        repeated call with the same id returns the existing notification
+        without counting or publishing it again.
+        """
         db = get_db()
         notification_data = {
             'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
@@ -21,10 +35,49 @@ class Notification:
             'created_at': datetime.utcnow()
         }
         
-        result = db[NOTIFICATIONS_COLLECTION].insert_one(notification_data)
+        if notification_id is not None:
+            notification_data['_id'] = notification_id
+        try:
+            result = db[NOTIFICATIONS_COLLECTION].insert_one(notification_data)
+        except DuplicateKeyError:
+            return db[NOTIFICATIONS_COLLECTION].find_one({'_id': notification_id})
         notification_data['_id'] = result.inserted_id
+        unread_count = Notification._adjust_unread(notification_data['user_id'], 1)
+        
+        event = Notification.to_dict(notification_data)
+        event['unreadCount'] = unread_count
+        publish(user_channel(notification_data['user_id']), 'notification', event)
         return notification_data
     
+    @staticmethod
+    def _adjust_unread(user_id, delta):
+        """Apply a change to a user's unread counter and return the new value.
+        
+        Called after the notification write. A user without a counter yet is
+        seeded from a full count, which already includes that write.
+        """
+        db = get_db()
+        counter = db[NOTIFICATION_COUNTERS_COLLECTION].find_one_and_update(
+            {'_id': user_id},
+            {'$inc': {'unread': delta}},
+            return_document=ReturnDocument.AFTER
+        )
+        if counter:
+            return counter['unread']
+        return Notification._seed_unread(user_id)
+    
+    @staticmethod
+    def _seed_unread(user_id):
+        db = get_db()
+        unread = db[NOTIFICATIONS_COLLECTION].count_documents({'user_id': user_id, 'read': False})
+        counter = db[NOTIFICATION_COUNTERS_COLLECTION].find_one_and_update(
+            {'_id': user_id},
+            {'$setOnInsert': {'unread': unread}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['unread']
+    
     @staticmethod
     def find_by_user(user_id, limit=20, unread_only=False):
         """Find notifications for a user."""
@@ -39,59 +92,111 @@ class Notification:
     
     @staticmethod
     def get_unread_count(user_id):
-        """Get count of unread notifications."""
+        """Get count of unread notifications from the user's counter (one primary-key read)."""
         db = get_db()
-        return db[NOTIFICATIONS_COLLECTION].count_documents({
-            'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
-            'read': False
-        })
+        user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        counter = db[NOTIFICATION_COUNTERS_COLLECTION].find_one({'_id': user_id})
+        if counter:
+            return max(counter['unread'], 0)
+        return Notification._seed_unread(user_id)
     
     @staticmethod
     def mark_as_read(notification_id):
         """Mark a single notification as read."""
         db = get_db()
-        db[NOTIFICATIONS_COLLECTION].update_one(
-            {'_id': ObjectId(notification_id) if isinstance(notification_id, str) else notification_id},
+        # Only the call that flips the flag decrements the counter
+        notification = db[NOTIFICATIONS_COLLECTION].find_one_and_update(
+            {'_id': ObjectId(notification_id) if isinstance(notification_id, str) else notification_id,
+             'read': False},
             {'$set': {'read': True}}
         )
+        if notification:
+            Notification._adjust_unread(notification['user_id'], -1)
     
     @staticmethod
     def mark_all_as_read(user_id):
         """Mark all notifications as read for a user."""
         db = get_db()
-        db[NOTIFICATIONS_COLLECTION].update_many(
-            {'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id},
+        user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        result = db[NOTIFICATIONS_COLLECTION].update_many(
+            {'user_id': user_id, 'read': False},
             {'$set': {'read': True}}
         )
+        if result.modified_count:
+            Notification._adjust_unread(user_id, -result.modified_count)
     
     @staticmethod
     def delete(notification_id):
         """Delete a notification."""
         db = get_db()
-        db[NOTIFICATIONS_COLLECTION].delete_one({
+        notification = db[NOTIFICATIONS_COLLECTION].find_one_and_delete({
             '_id': ObjectId(notification_id) if isinstance(notification_id, str) else notification_id
         })
+        if notification and not notification.get('read'):
+            Notification._adjust_unread(notification['user_id'], -1)
     
     @staticmethod
     def delete_by_reference(user_id, reference_id):
         """Delete notifications by reference_id for a specific user."""
         db = get_db()
-        db[NOTIFICATIONS_COLLECTION].delete_many({
-            'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
-            'reference_id': reference_id
-        })
+        user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        query = {'user_id': user_id, 'reference_id': reference_id}
+        # Flip unread ones first so the counter learns how many unread were removed
+        flipped = db[NOTIFICATIONS_COLLECTION].update_many(
+            {**query, 'read': False}, {'$set': {'read': True}}
+        ).modified_count
+        db[NOTIFICATIONS_COLLECTION].delete_many(query)
+        if flipped:
+            Notification._adjust_unread(user_id, -flipped)
     
     @staticmethod
     def mark_read_by_reference(user_id, reference_id):
         """Mark notifications as read by reference_id."""
         db = get_db()
-        db[NOTIFICATIONS_COLLECTION].update_many(
-            {
-                'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
-                'reference_id': reference_id
-            },
+        user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        result = db[NOTIFICATIONS_COLLECTION].update_many(
+            {'user_id': user_id, 'reference_id': reference_id, 'read': False},
             {'$set': {'read': True}}
         )
+        if result.modified_count:
+            Notification._adjust_unread(user_id, -result.modified_count)
+    
+    @staticmethod
+    def repair_unread_counters(user_ids=None):
+        """Recompute unread counters from the notifications themselves.
+        
+        Fixes drift left by interrupted writes. Returns the number of
+        counters that were changed.
+        """
+        db = get_db()
+        match = {'read': False}
+        counter_query = {}
+        if user_ids is not None:
+            ids = [ObjectId(u) if isinstance(u, str) else u for u in user_ids]
+            match['user_id'] = {'$in': ids}
+            counter_query['_id'] = {'$in': ids}
+        
+        actual = {
+            row['_id']: row['unread']
+            for row in db[NOTIFICATIONS_COLLECTION].aggregate([
+                {'$match': match},
+                {'$group': {'_id': '$user_id', 'unread': {'$sum': 1}}}
+            ])
+        }
+        stored = {
+            counter['_id']: counter['unread']
+            for counter in db[NOTIFICATION_COUNTERS_COLLECTION].find(counter_query)
+        }
+        
+        repaired = 0
+        for user_id in set(actual) | set(stored):
+            unread = actual.get(user_id, 0)
+            if stored.get(user_id) != unread:
+                db[NOTIFICATION_COUNTERS_COLLECTION].update_one(
+                    {'_id': user_id}, {'$set': {'unread': unread}}, upsert=True
+                )
+                repaired += 1
+        return repaired
     
     @staticmethod
     def to_dict(notification):
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from datetime import datetime, timedelta
+from ..database import get_db, OUTBOX_COLLECTION
+
+# Processed events are kept for a week for debugging, then expire
+PROCESSED_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Set whenever an event is recorded so an in-process worker can wake up early
+new_event = threading.Event()
+
+
+class Outbox:
+    """Outbox of side-effect events recorded by requests and applied by a worker.
+
+    Status flow: pending -> processing -> done, or back to pending with a
+    backoff on failure, and dead after too many attempts.
+    """
+
+    INDEXES = [
+        IndexModel([('status', ASCENDING), ('available_at', ASCENDING)]),
+        IndexModel([('status', ASCENDING), ('locked_until', ASCENDING)]),
+        IndexModel([('processed_at', ASCENDING)], expireAfterSeconds=PROCESSED_TTL_SECONDS),
+    ]
+
+    @staticmethod
+    def record(event_type, payload):
+        """Record an event for the worker. This is the request's only side-effect write."""
+        return Outbox.record_many([(event_type, payload)])[0]
+
+    @staticmethod
+    def record_many(events):
+        """Record several (event_type, payload) pairs with one insert."""
+        db = get_db()
+        now = datetime.utcnow()
+        docs = [{
+            'type': event_type,
+            'payload': payload,
+            'status': 'pending',
+            'attempts': 0,
+            'available_at': now,
+            'created_at': now
+        } for event_type, payload in events]
+        if docs:
+            db[OUTBOX_COLLECTION].insert_many(docs)
+            new_event.set()
+        return docs
+
+    @staticmethod
+    def claim(lease_seconds=60):
+        """Atomically take the next due event, or one whose worker's lease expired."""
+        db = get_db()
+        now = datetime.utcnow()
+        return db[OUTBOX_COLLECTION].find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'available_at': {'$lte': now}},
+                {'status': 'processing', 'locked_until': {'$lt': now}}
+            ]},
+            {
+                '$set': {'status': 'processing', 'locked_until': now + timedelta(seconds=lease_seconds)},
+                '$inc': {'attempts': 1}
+            },
+            sort=[('available_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def complete(event_id):
+        db = get_db()
+        db[OUTBOX_COLLECTION].update_one(
+            {'_id': event_id},
+            {'$set': {'status': 'done', 'processed_at': datetime.utcnow()}, '$unset': {'locked_until': ''}}
+        )
+
+    @staticmethod
+    def fail(event, error, max_attempts=8):
+        """Schedule a retry with exponential backoff, or give up after max_attempts."""
+        db = get_db()
+        updates = {'last_error': str(error)}
+        if event['attempts'] >= max_attempts:
+            updates['status'] = 'dead'
+        else:
+            updates['status'] = 'pending'
+            updates['available_at'] = datetime.utcnow() + timedelta(seconds=min(2 ** event['attempts'], 300))
+        db[OUTBOX_COLLECTION].update_one(
+            {'_id': event['_id']},
+            {'$set': updates, '$unset': {'locked_until': ''}}
+        )
+
+    @staticmethod
+    def count_by_status():
+        db = get_db()
+        return {
+            row['_id']: row['count']
+            for row in db[OUTBOX_COLLECTION].aggregate([
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+            ])
+        }
+
+    @staticmethod
+    def effect_id(event, step):
+        """Deterministic ObjectId for one side effect of an event.
+
+        Handlers insert their documents with this _id, so a redelivered
+        event hits the _id index instead of creating a duplicate.
+        """
+        digest = hashlib.sha1(f"{event['_id']}:{step}".encode()).digest()
+        return ObjectId(event['_id'].binary[:4] + digest[:8])
@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import current_app, request
+from pymongo import DESCENDING
+
+
+def encode_cursor(doc, sort_field='created_at'):
+    """Build an opaque cursor from the last document of a page."""
+    value = doc.get(sort_field) if sort_field != '_id' else None
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'v': value, 'id': str(doc['_id'])}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_field='created_at'):
+    """Decode a cursor into (sort value, ObjectId). Raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        last_id = ObjectId(payload['id'])
+        value = payload.get('v')
+        if value is not None and sort_field != '_id':
+            value = datetime.fromisoformat(value)
+        return value, last_id
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError('Invalid cursor')
+
+
+def encode_position_cursor(position):
+    """Build an opaque cursor for paging through an embedded array."""
+    payload = json.dumps({'pos': position}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_position_cursor(cursor):
+    """Decode an array position cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())['pos']
+        if not isinstance(position, int) or position < 0:
+            raise ValueError
+        return position
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def _keyset_filter(sort_field, direction, value, last_id):
+    """Filter selecting documents strictly after (value, last_id) in sort order."""
+    id_op = '$lt' if direction == DESCENDING else '$gt'
+    if sort_field == '_id':
+        return {'_id': {id_op: last_id}}
+
+    # Missing/null sort values order before every other value in MongoDB
+    if direction == DESCENDING:
+        if value is None:
+            return {sort_field: None, '_id': {'$lt': last_id}}
+        return {'$or': [
+            {sort_field: {'$lt': value}},
+            {sort_field: value, '_id': {'$lt': last_id}},
+            {sort_field: None}
+        ]}
+
+    if value is None:
+        return {'$or': [
+            {sort_field: None, '_id': {'$gt': last_id}},
+            {sort_field: {'$ne': None}}
+        ]}
+    return {'$or': [
+        {sort_field: {'$gt': value}},
+        {sort_field: value, '_id': {'$gt': last_id}}
+    ]}
+
+
+def paginate(collection, query, sort_field='created_at', direction=DESCENDING, after=None, limit=None):
+    """Keyset-paginate a query on (sort_field, _id).
+
+    Returns (documents, next_cursor). With limit=None every matching document
+    is returned and next_cursor is None.
+    """
+    if after:
+        value, last_id = decode_cursor(after, sort_field)
+        query = {'$and': [query, _keyset_filter(sort_field, direction, value, last_id)]}
+
+    if sort_field == '_id':
+        sort = [('_id', direction)]
+    else:
+        sort = [(sort_field, direction), ('_id', direction)]
+
+    cursor = collection.find(query).sort(sort)
+    if limit is None:
+        return list(cursor), None
+
+    docs = list(cursor.limit(limit + 1))
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1], sort_field)
+    return docs, None
+
+
+def get_page_args():
+    """Read the `after` cursor and `limit` query parameters.
+
+    Returns (after, limit). Both are None when the client did not ask for
+    pagination, so existing clients keep receiving complete lists.
+    Raises ValueError for a malformed limit.
+    """
+    after = request.args.get('after') or None
+    limit = request.args.get('limit')
+    if limit is None and after is None:
+        return None, None
+
+    default_size = current_app.config.get('PAGE_SIZE_DEFAULT', 50)
+    max_size = current_app.config.get('PAGE_SIZE_MAX', 200)
+    try:
+        limit = int(limit) if limit is not None else default_size
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return after, min(limit, max_size)
+
+
+def page_response(items, next_cursor, paginated):
+    """Wrap a list endpoint's items in a page envelope when paginating."""
+    if not paginated:
+        return items
+    return {'items': items, 'nextCursor': next_cursor}
@@ -1,8 +1,15 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING
 from ..database import get_db, PATIENTS_COLLECTION
+from .loader import get_loader, clear_loaders
+from .pagination import paginate
 
 class Patient:
     """Patient model."""
+
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING)]),
+    ]
     
     @staticmethod
     def create(user_id, email, first_name, last_name, phone='', address='', **kwargs):
@@ -32,6 +39,7 @@ class Patient:
         }
         result = db[PATIENTS_COLLECTION].insert_one(patient_data)
         patient_data['_id'] = result.inserted_id
+        clear_loaders(PATIENTS_COLLECTION)
         return patient_data
     
     @staticmethod
@@ -50,6 +58,17 @@ class Patient:
             user_id = ObjectId(user_id)
         return db[PATIENTS_COLLECTION].find_one({'user_id': user_id})
     
+    @staticmethod
+    def find_page(after=None, limit=None):
+        """Get a page of all patients in creation order. Returns (patients, next_cursor)."""
+        db = get_db()
+        return paginate(db[PATIENTS_COLLECTION], {}, sort_field='_id', direction=ASCENDING, after=after, limit=limit)
+    
+    @staticmethod
+    def find_many_by_user_ids(user_ids):
+        """Find many patients by user ID with one query. Returns {ObjectId: patient or None}."""
+        return get_loader(PATIENTS_COLLECTION, 'user_id').load_many(user_ids)
+    
     @staticmethod
     def update(patient_id, update_data):
         """Update a patient profile."""
@@ -60,6 +79,7 @@ class Patient:
             {'_id': patient_id},
             {'$set': update_data}
         )
+        clear_loaders(PATIENTS_COLLECTION)
         return Patient.find_by_id(patient_id)
     
     @staticmethod
@@ -72,6 +92,7 @@ class Patient:
             {'user_id': user_id},
             {'$set': update_data}
         )
+        clear_loaders(PATIENTS_COLLECTION)
         return Patient.find_by_user_id(user_id)
     
     @staticmethod
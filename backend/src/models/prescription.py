@@ -1,10 +1,18 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from ..database import get_db, PRESCRIPTIONS_COLLECTION
+from .pagination import paginate
 
 
 class Prescription:
     """Model for doctor prescriptions."""
+
+    INDEXES = [
+        IndexModel([('patient_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('doctor_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('appointment_id', ASCENDING)]),
+    ]
     
     @staticmethod
     def create(doctor_id, patient_id, appointment_id, medications, diagnosis='', notes=''):
@@ -41,6 +49,22 @@ class Prescription:
             doctor_id = ObjectId(doctor_id)
         return list(db[PRESCRIPTIONS_COLLECTION].find({'doctor_id': doctor_id}).sort('created_at', -1))
     
+    @staticmethod
+    def find_page_by_patient_id(patient_id, after=None, limit=None):
+        """Get a page of a patient's prescriptions, newest first. Returns (prescriptions, next_cursor)."""
+        db = get_db()
+        if isinstance(patient_id, str):
+            patient_id = ObjectId(patient_id)
+        return paginate(db[PRESCRIPTIONS_COLLECTION], {'patient_id': patient_id}, after=after, limit=limit)
+    
+    @staticmethod
+    def find_page_by_doctor_id(doctor_id, after=None, limit=None):
+        """Get a page of a doctor's prescriptions, newest first. Returns (prescriptions, next_cursor)."""
+        db = get_db()
+        if isinstance(doctor_id, str):
+            doctor_id = ObjectId(doctor_id)
+        return paginate(db[PRESCRIPTIONS_COLLECTION], {'doctor_id': doctor_id}, after=after, limit=limit)
+    
     @staticmethod
     def find_by_appointment_id(appointment_id):
         """Get prescription for an appointment."""
@@ -1,10 +1,18 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from ..database import get_db, RATINGS_COLLECTION
+from .pagination import paginate
 
 
 class Rating:
     """Model for patient ratings of doctors."""
+
+    INDEXES = [
+        IndexModel([('doctor_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('appointment_id', ASCENDING)]),
+        IndexModel([('patient_id', ASCENDING), ('appointment_id', ASCENDING)]),
+    ]
     
     @staticmethod
     def create(patient_id, doctor_id, appointment_id, score, comment=''):
@@ -36,6 +44,14 @@ class Rating:
             doctor_id = ObjectId(doctor_id)
         return list(db[RATINGS_COLLECTION].find({'doctor_id': doctor_id}).sort('created_at', -1))
     
+    @staticmethod
+    def find_page_by_doctor_id(doctor_id, after=None, limit=None):
+        """Get a page of a doctor's ratings, newest first. Returns (ratings, next_cursor)."""
+        db = get_db()
+        if isinstance(doctor_id, str):
+            doctor_id = ObjectId(doctor_id)
+        return paginate(db[RATINGS_COLLECTION], {'doctor_id': doctor_id}, after=after, limit=limit)
+    
     @staticmethod
     def find_by_appointment_id(appointment_id):
         """Find rating by appointment ID."""
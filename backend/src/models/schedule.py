@@ -1,10 +1,34 @@
 from bson import ObjectId
-from datetime import datetime
-from ..database import get_db, SCHEDULES_COLLECTION
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime, timedelta
+from functools import lru_cache
+from ..database import get_db, SCHEDULES_COLLECTION, APPOINTMENTS_COLLECTION
+from .cache_version import CacheVersion, DOCTOR_DIRECTORY_CACHE
+
+# Slots offered when a doctor has not configured a schedule
+DEFAULT_SLOTS = ("9:00 AM", "9:30 AM", "10:00 AM", "10:30 AM", "11:00 AM",
+                 "2:00 PM", "2:30 PM", "3:00 PM", "3:30 PM", "4:00 PM")
+
+# How far ahead to look for alternatives when a slot is taken
+ALTERNATIVE_SEARCH_DAYS = 14
+
+
+@lru_cache(maxsize=512)
+def slot_minutes(slot):
+    """Minutes since midnight for a slot label like "9:30 AM" (unparseable labels sort last)."""
+    try:
+        parsed = datetime.strptime(slot, '%I:%M %p')
+    except ValueError:
+        return 24 * 60
+    return parsed.hour * 60 + parsed.minute
 
 
 class Schedule:
     """Model for doctor schedules/availability."""
+
+    INDEXES = [
+        IndexModel([('doctor_id', ASCENDING)], unique=True),
+    ]
     
     @staticmethod
     def create_or_update(doctor_id, weekly_schedule, blocked_dates=None, slot_duration=30):
@@ -27,6 +51,7 @@ class Schedule:
             {'$set': schedule_data},
             upsert=True
         )
+        CacheVersion.bump(DOCTOR_DIRECTORY_CACHE)
         
         return Schedule.find_by_doctor_id(doctor_id)
     
@@ -41,59 +66,139 @@ class Schedule:
     @staticmethod
     def get_available_slots(doctor_id, date_str):
         """Get available time slots for a specific date."""
-        from ..models.appointment import Appointment
-        from datetime import datetime as dt, timedelta
+        return Schedule.get_available_slots_range(doctor_id, date_str, date_str)[date_str]
+    
+    @staticmethod
+    def get_available_slots_range(doctor_id, start_date, end_date):
+        """Get available time slots for every date from start_date to end_date (inclusive).
+        
+        The schedule is read once and booked appointments for the whole range
+        come from a single query. Returns {date_str: [slots]}.
+        """
+        if isinstance(doctor_id, str):
+            doctor_id = ObjectId(doctor_id)
+        
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
         
         schedule = Schedule.find_by_doctor_id(doctor_id)
         if not schedule:
             # Return default slots if no schedule set
-            default_slots = ["9:00 AM", "9:30 AM", "10:00 AM", "10:30 AM", "11:00 AM", 
-                    "2:00 PM", "2:30 PM", "3:00 PM", "3:30 PM", "4:00 PM"]
             # Filter out past slots for default schedule too
-            return Schedule._filter_past_slots(default_slots, date_str)
+            return {date_str: Schedule._filter_past_slots(list(DEFAULT_SLOTS), date_str) for date_str in dates}
         
-        # Check if date is blocked
-        if date_str in schedule.get('blocked_dates', []):
-            return []
+        booked = Schedule.find_booked_times(doctor_id, start_date, end_date)
+        blocked_dates = Schedule.blocked_date_set(schedule)
+        return {
+            date_str: Schedule.open_slots_for_date(schedule, date_str, booked.get(date_str, ()), blocked_dates)
+            for date_str in dates
+        }
+    
+    @staticmethod
+    def next_free_slots(doctor_id, date_str, time_str, count=3):
+        """Get up to `count` free slots after date_str/time_str as [{date, time}].
         
-        # Get day of week
-        date_obj = dt.strptime(date_str, '%Y-%m-%d')
-        day_name = date_obj.strftime('%A').lower()
+        Used to offer alternatives when a requested slot is already taken.
+        """
+        start = datetime.strptime(date_str, '%Y-%m-%d').date()
+        end_date = (start + timedelta(days=ALTERNATIVE_SEARCH_DAYS - 1)).strftime('%Y-%m-%d')
+        after = slot_minutes(time_str)
+        
+        alternatives = []
+        for day, slots in Schedule.get_available_slots_range(doctor_id, date_str, end_date).items():
+            for slot in slots:
+                if day == date_str and slot_minutes(slot) <= after:
+                    continue
+                alternatives.append({'date': day, 'time': slot})
+                if len(alternatives) >= count:
+                    return alternatives
+        return alternatives
+    
+    @staticmethod
+    def blocked_date_set(schedule):
+        """Get a schedule's blocked dates as a set for per-day lookups."""
+        return set(schedule.get('blocked_dates', []))
+    
+    @staticmethod
+    def open_slots_for_date(schedule, date_str, booked_times=(), blocked_dates=None):
+        """Get the free slots of an already-loaded schedule on one date.
         
-        weekly = schedule.get('weekly_schedule', {})
-        day_schedule = weekly.get(day_name, {})
+        Callers looping over a date range should pass blocked_dates from
+        blocked_date_set() so it is built once per schedule.
+        """
+        if blocked_dates is None:
+            blocked_dates = Schedule.blocked_date_set(schedule)
+        # Check if date is blocked
+        if date_str in blocked_dates:
+            return []
         
+        day_name = datetime.strptime(date_str, '%Y-%m-%d').strftime('%A').lower()
+        day_schedule = schedule.get('weekly_schedule', {}).get(day_name, {})
         if not day_schedule.get('enabled', False):
             return []
         
         # Generate time slots based on schedule
-        start_time = day_schedule.get('start', '09:00')
-        end_time = day_schedule.get('end', '17:00')
-        slot_duration = schedule.get('slot_duration', 30)
-        
-        slots = Schedule._generate_time_slots(start_time, end_time, slot_duration)
+        slots = Schedule._slot_template(
+            day_schedule.get('start', '09:00'),
+            day_schedule.get('end', '17:00'),
+            schedule.get('slot_duration', 30)
+        )
         
         # Filter out past time slots if the date is today
         slots = Schedule._filter_past_slots(slots, date_str)
         
-        # Get booked appointments for this doctor on this date
-        if isinstance(doctor_id, str):
-            doctor_id = ObjectId(doctor_id)
+        # Filter out booked slots
+        return [slot for slot in slots if slot not in booked_times]
+    
+    @staticmethod
+    def find_booked_times(doctor_id, start_date, end_date):
+        """Get booked appointment times in a date range with one query.
         
+        Returns {date_str: set of times}.
+        """
         db = get_db()
-        from ..database import APPOINTMENTS_COLLECTION
-        booked = db[APPOINTMENTS_COLLECTION].find({
+        if isinstance(doctor_id, str):
+            doctor_id = ObjectId(doctor_id)
+        booked_appointments = db[APPOINTMENTS_COLLECTION].find({
             'doctor_id': doctor_id,
-            'date': date_str,
+            'date': {'$gte': start_date, '$lte': end_date},
             'status': {'$nin': ['cancelled', 'rejected']}
-        })
+        }, {'date': 1, 'time': 1})
         
-        booked_times = [appt['time'] for appt in booked]
+        booked = {}
+        for appt in booked_appointments:
+            booked.setdefault(appt['date'], set()).add(appt['time'])
+        return booked
+    
+    @staticmethod
+    def find_many_by_doctor_ids(doctor_ids):
+        """Get schedules for many doctors with one query, keyed by doctor ObjectId."""
+        db = get_db()
+        ids = [ObjectId(d) if isinstance(d, str) else d for d in doctor_ids]
+        return {
+            schedule['doctor_id']: schedule
+            for schedule in db[SCHEDULES_COLLECTION].find({'doctor_id': {'$in': ids}})
+        }
+    
+    @staticmethod
+    def find_booked_times_many(doctor_ids, start_date, end_date):
+        """Get booked times for many doctors in a date range with one query.
         
-        # Filter out booked slots
-        available_slots = [slot for slot in slots if slot not in booked_times]
+        Returns {doctor ObjectId: {date_str: set of times}}.
+        """
+        db = get_db()
+        ids = [ObjectId(d) if isinstance(d, str) else d for d in doctor_ids]
+        booked_appointments = db[APPOINTMENTS_COLLECTION].find({
+            'doctor_id': {'$in': ids},
+            'date': {'$gte': start_date, '$lte': end_date},
+            'status': {'$nin': ['cancelled', 'rejected']}
+        }, {'doctor_id': 1, 'date': 1, 'time': 1})
         
-        return available_slots
+        booked = {}
+        for appt in booked_appointments:
+            booked.setdefault(appt['doctor_id'], {}).setdefault(appt['date'], set()).add(appt['time'])
+        return booked
     
     @staticmethod
     def _filter_past_slots(slots, date_str):
@@ -130,13 +235,12 @@ class Schedule:
         return filtered_slots
     
     @staticmethod
-    def _generate_time_slots(start_time, end_time, duration_minutes):
-        """Generate time slots between start and end times."""
-        from datetime import datetime as dt, timedelta
-        
+    @lru_cache(maxsize=256)
+    def _slot_template(start_time, end_time, duration_minutes):
+        """Cached tuple of slot labels for a (start, end, duration) combination."""
         slots = []
-        start = dt.strptime(start_time, '%H:%M')
-        end = dt.strptime(end_time, '%H:%M')
+        start = datetime.strptime(start_time, '%H:%M')
+        end = datetime.strptime(end_time, '%H:%M')
         
         current = start
         while current < end:
@@ -144,7 +248,7 @@ class Schedule:
             slots.append(current.strftime('%-I:%M %p').replace(' 0', ' '))
             current += timedelta(minutes=duration_minutes)
         
-        return slots
+        return tuple(slots)
     
     @staticmethod
     def to_dict(schedule):
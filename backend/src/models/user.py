@@ -1,10 +1,17 @@
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from ..database import get_db, USERS_COLLECTION
+from .loader import get_loader, clear_loaders
 
 class User:
     """User model for authentication."""
+
+    INDEXES = [
+        IndexModel([('email', ASCENDING)], unique=True),
+        IndexModel([('role', ASCENDING)]),
+    ]
     
     @staticmethod
     def create(email, password, role):
@@ -18,6 +25,7 @@ class User:
         }
         result = db[USERS_COLLECTION].insert_one(user_data)
         user_data['_id'] = result.inserted_id
+        clear_loaders(USERS_COLLECTION)
         return user_data
     
     @staticmethod
@@ -34,6 +42,11 @@ class User:
             user_id = ObjectId(user_id)
         return db[USERS_COLLECTION].find_one({'_id': user_id})
     
+    @staticmethod
+    def find_many_by_ids(user_ids):
+        """Find many users by ID with one query. Returns {ObjectId: user or None}."""
+        return get_loader(USERS_COLLECTION).load_many(user_ids)
+    
     @staticmethod
     def check_password(user, password):
         """Check if password matches."""
@@ -45,6 +58,7 @@ class User:
         db = get_db()
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
+        clear_loaders(USERS_COLLECTION)
         return db[USERS_COLLECTION].delete_one({'_id': user_id})
     
     @staticmethod
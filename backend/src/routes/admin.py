@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
+from datetime import datetime, timedelta
 from ..models.doctor import Doctor
 from ..models.patient import Patient
 from ..models.user import User
-from ..database import get_db
+from ..models.pagination import get_page_args
+from ..database import get_db, get_mongo
+from ..services.chatbot_service import get_response_cache
+from ..models.llm_call import LLMCall
+from ..services.llm import get_llm_pool
 import json
 
 admin_bp = Blueprint('admin', __name__)
@@ -74,6 +79,55 @@ def get_stats():
     })
 
 
+@admin_bp.route('/db/pool', methods=['GET'])
+@jwt_required()
+@require_admin
+def get_pool_stats():
+    """Get MongoDB connection pool statistics for this worker."""
+    return jsonify(get_mongo().pool_stats())
+
+
+@admin_bp.route('/chatbot/cache', methods=['GET'])
+@jwt_required()
+@require_admin
+def get_chatbot_cache_stats():
+    """Get chatbot response cache hit/miss statistics for this worker."""
+    return jsonify(get_response_cache().stats())
+
+
+@admin_bp.route('/llm/guards', methods=['GET'])
+@jwt_required()
+@require_admin
+def get_llm_guard_stats():
+    """Get LLM concurrency, queue depth and circuit breaker state for this worker."""
+    return jsonify({'guards': get_llm_pool().guard_stats()})
+
+
+@admin_bp.route('/llm/usage', methods=['GET'])
+@jwt_required()
+@require_admin
+def get_llm_usage():
+    """Get LLM call counts, token usage and latency per route and top users.
+    
+    Query params: hours (window, default 24, at most 720), top (users listed, default 10).
+    """
+    try:
+        hours = min(int(request.args.get('hours', 24)), 720)
+        top = min(int(request.args.get('top', 10)), 100)
+    except ValueError:
+        return jsonify({'error': 'hours and top must be integers'}), 400
+    if hours < 1 or top < 1:
+        return jsonify({'error': 'hours and top must be positive'}), 400
+    
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return jsonify({
+        'hours': hours,
+        'byRoute': [LLMCall.to_dict(row) for row in LLMCall.usage_by('route', since)],
+        'byPurpose': [LLMCall.to_dict(row) for row in LLMCall.usage_by('purpose', since)],
+        'topUsers': [LLMCall.to_dict(row) for row in LLMCall.usage_by('user_id', since, top)],
+    })
+
+
 @admin_bp.route('/doctors', methods=['GET'])
 @jwt_required()
 @require_admin
@@ -86,11 +140,12 @@ def get_doctors():
     else:
         doctors = Doctor.find_all(verified_only=False)
     
-    # Get user email for each doctor
+    # Get user email for each doctor (one batched lookup)
+    users = User.find_many_by_ids([doctor.get('user_id') for doctor in doctors])
     result = []
     for doctor in doctors:
         doctor_dict = Doctor.to_dict(doctor)
-        user = User.find_by_id(doctor.get('user_id'))
+        user = users.get(doctor.get('user_id'))
         if user:
             doctor_dict['email'] = user.get('email', '')
         result.append(doctor_dict)
@@ -103,15 +158,18 @@ def get_doctors():
 @require_admin
 def get_patients():
     """Get all patients."""
-    db = get_db()
-    patients = list(db.patients.find())
+    try:
+        after, limit = get_page_args()
+        patients, next_cursor = Patient.find_page(after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     result = []
     for patient in patients:
         patient_dict = Patient.to_dict(patient)
         result.append(patient_dict)
     
-    return jsonify({'patients': result})
+    return jsonify({'patients': result, 'nextCursor': next_cursor})
 
 
 @admin_bp.route('/doctors/<doctor_id>/verify', methods=['POST'])
@@ -187,10 +245,11 @@ def get_profile_update_requests():
     """Get all doctors with pending profile updates."""
     doctors = Doctor.find_with_pending_updates()
     
+    users = User.find_many_by_ids([doctor.get('user_id') for doctor in doctors])
     result = []
     for doctor in doctors:
         doctor_dict = Doctor.to_dict(doctor)
-        user = User.find_by_id(doctor.get('user_id'))
+        user = users.get(doctor.get('user_id'))
         if user:
             doctor_dict['email'] = user.get('email', '')
         result.append(doctor_dict)
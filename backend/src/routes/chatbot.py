@@ -1,10 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
 
+from ..models.pagination import get_page_args
+from ..services.events import format_sse
+from ..services.llm_guard import LLMUnavailable
 from ..services.chatbot_service import (
     process_message,
-    get_chat_history,
+    stream_message,
+    TurnInProgress,
+    get_chat_history_page,
     clear_chat_history
 )
 
@@ -42,12 +47,64 @@ def send_message():
             'success': True
         })
     
+    except TurnInProgress as e:
+        return jsonify({'error': str(e)}), 409
+    except LLMUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': f'Failed to process message: {str(e)}'}), 500
 
 
+@chatbot_bp.route('/message/stream', methods=['POST'])
+@jwt_required()
+def stream_reply():
+    """Send a message to the chatbot and stream the response as Server-Sent Events.
+    
+    Emits `token` events ({text}) as the model generates, then one `done`
+    event ({response}) after the conversation is saved, or an `error` event.
+    """
+    current_user = get_current_user()
+    user_id = current_user['id']
+    
+    data = request.get_json()
+    message = data.get('message', '').strip()
+    
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    try:
+        chunks = stream_message(user_id, message)
+    except TurnInProgress as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        parts = []
+        try:
+            for text in chunks:
+                parts.append(text)
+                yield format_sse({'type': 'token', 'data': {'text': text}})
+        except LLMUnavailable as e:
+            yield format_sse({'type': 'error', 'data': {'error': str(e)}})
+            return
+        except Exception as e:
+            current_app.logger.warning(f"Chatbot stream failed: {e}")
+            yield format_sse({'type': 'error', 'data': {'error': 'Failed to process message'}})
+            return
+        finally:
+            # Runs on client disconnect too, closing the upstream model call
+            chunks.close()
+        yield format_sse({'type': 'done', 'data': {'message': message, 'response': ''.join(parts)}})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @chatbot_bp.route('/history', methods=['GET'])
 @jwt_required()
 def get_history():
@@ -56,13 +113,17 @@ def get_history():
         current_user = get_current_user()
         user_id = current_user['id']
         
-        history = get_chat_history(user_id)
+        after, limit = get_page_args()
+        history, next_cursor = get_chat_history_page(user_id, after, limit)
         
         return jsonify({
             'history': history,
+            'nextCursor': next_cursor,
             'success': True
         })
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get history: {str(e)}'}), 500
 
@@ -1,8 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
 from ..models.doctor import Doctor
-from ..models.schedule import Schedule
+from ..services.doctor_directory import get_doctor_directory
 import json
 
 doctors_bp = Blueprint('doctors', __name__)
@@ -14,95 +13,10 @@ def get_current_user():
         return json.loads(identity)
     return identity
 
-def check_doctor_availability(doctor_id):
-    """Check if doctor is available now based on their schedule."""
-    schedule = Schedule.find_by_doctor_id(doctor_id)
-    now = datetime.now()
-    today_str = now.strftime('%Y-%m-%d')
-    day_name = now.strftime('%A').lower()
-    
-    if not schedule:
-        # No schedule set - assume available during business hours (9 AM - 5 PM)
-        current_hour = now.hour
-        if 9 <= current_hour < 17:
-            return True, "Available"
-        return False, "Outside business hours"
-    
-    # Check if today is blocked
-    if today_str in schedule.get('blocked_dates', []):
-        return False, "Not available today"
-    
-    weekly = schedule.get('weekly_schedule', {})
-    day_schedule = weekly.get(day_name, {})
-    
-    if not day_schedule.get('enabled', False):
-        return False, "Not available today"
-    
-    # Check if current time is within working hours
-    start_time = day_schedule.get('start', '09:00')
-    end_time = day_schedule.get('end', '17:00')
-    
-    try:
-        start = datetime.strptime(start_time, '%H:%M').time()
-        end = datetime.strptime(end_time, '%H:%M').time()
-        current_time = now.time()
-        
-        if start <= current_time <= end:
-            return True, "Available now"
-        elif current_time < start:
-            return False, f"Available from {datetime.strptime(start_time, '%H:%M').strftime('%I:%M %p')}"
-        else:
-            return False, "Closed for today"
-    except ValueError:
-        return True, "Available"
-
-def get_formatted_availability(doctor_id):
-    """Generate formatted availability strings from Schedule data."""
-    schedule = Schedule.find_by_doctor_id(doctor_id)
-    
-    if not schedule:
-        # Return default if no schedule set
-        return ["Mon 9:00 AM - 5:00 PM", "Tue 9:00 AM - 5:00 PM", 
-                "Wed 9:00 AM - 5:00 PM", "Thu 9:00 AM - 5:00 PM", 
-                "Fri 9:00 AM - 5:00 PM"]
-    
-    weekly = schedule.get('weekly_schedule', {})
-    day_abbrev = {
-        'monday': 'Mon', 'tuesday': 'Tue', 'wednesday': 'Wed',
-        'thursday': 'Thu', 'friday': 'Fri', 'saturday': 'Sat', 'sunday': 'Sun'
-    }
-    
-    availability = []
-    for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']:
-        day_schedule = weekly.get(day, {})
-        if day_schedule.get('enabled', False):
-            start = day_schedule.get('start', '09:00')
-            end = day_schedule.get('end', '17:00')
-            
-            # Convert 24h to 12h format
-            try:
-                start_formatted = datetime.strptime(start, '%H:%M').strftime('%I:%M %p').lstrip('0')
-                end_formatted = datetime.strptime(end, '%H:%M').strftime('%I:%M %p').lstrip('0')
-                availability.append(f"{day_abbrev[day]} {start_formatted} - {end_formatted}")
-            except ValueError:
-                availability.append(f"{day_abbrev[day]} {start} - {end}")
-    
-    return availability if availability else ["No availability set"]
-
-
 @doctors_bp.route('', methods=['GET'])
 def get_doctors():
-    doctors = Doctor.find_all()
-    result = []
-    for doc in doctors:
-        doc_dict = Doctor.to_dict(doc)
-        is_available, status_message = check_doctor_availability(doc['_id'])
-        doc_dict['isAvailable'] = is_available
-        doc_dict['availabilityStatus'] = status_message
-        # Use schedule-based availability instead of old static field
-        doc_dict['availability'] = get_formatted_availability(doc['_id'])
-        result.append(doc_dict)
-    return jsonify(result)
+    # Schedule-based availability comes from the cached directory
+    return jsonify(get_doctor_directory().get_doctors())
 
 @doctors_bp.route('/profile', methods=['GET'])
 @jwt_required()
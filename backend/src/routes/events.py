@@ -0,0 +1,55 @@
+from flask import Blueprint, Response, current_app, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..services.events import get_broker, user_channel, format_sse
+import json
+import time
+
+events_bp = Blueprint('events', __name__)
+
+
+def get_current_user():
+    """Parse JWT identity and return user dict."""
+    identity = get_jwt_identity()
+    if isinstance(identity, str):
+        return json.loads(identity)
+    return identity
+
+
+@events_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream():
+    """Server-Sent Events stream of the current user's messages and notifications.
+    
+    EventSource cannot set headers, so the token may also be passed as ?jwt=.
+    Each stream closes after EVENT_STREAM_MAX_SECONDS so it does not hold a
+    worker thread forever; the browser reconnects on its own and sends the
+    Last-Event-ID header, and events missed in between are replayed.
+    """
+    current_user = get_current_user()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    subscription = get_broker().subscribe([user_channel(current_user['id'])], last_event_id=last_event_id)
+    heartbeat = current_app.config.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15)
+    max_seconds = current_app.config.get('EVENT_STREAM_MAX_SECONDS', 300)
+    retry_ms = current_app.config.get('EVENT_STREAM_RETRY_MS', 2000)
+    
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield f"retry: {retry_ms}\n: connected\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is None:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                else:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from bson import ObjectId
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from ..models.message import Message
 from ..models.appointment import Appointment
+from ..models.doctor import Doctor
+from ..models.pagination import get_page_args, page_response, encode_cursor
 import json
 
 messages_bp = Blueprint('messages', __name__)
@@ -52,10 +55,32 @@ def is_during_appointment_time(appointment):
 
     return True, ""
 
+@messages_bp.route('/unread', methods=['GET'])
+@jwt_required()
+def get_all_unread_counts():
+    """Get unread message counts for all of the current user's active appointments."""
+    current_user = get_current_user()
+    
+    if current_user['role'] == 'doctor':
+        doctor = Doctor.find_by_user_id(current_user['id'])
+        if not doctor:
+            return jsonify({'error': 'Doctor profile not found'}), 404
+        appointment_ids = Appointment.find_active_ids(doctor_id=doctor['_id'])
+    else:
+        appointment_ids = Appointment.find_active_ids(patient_id=current_user['id'])
+    
+    counts = Message.get_unread_counts(appointment_ids, current_user['role'])
+    return jsonify({'counts': counts, 'total': sum(counts.values())})
+
 @messages_bp.route('/<appointment_id>', methods=['GET'])
 @jwt_required()
 def get_messages(appointment_id):
-    """Get all messages for an appointment."""
+    """Get messages for an appointment.
+    
+    With ?since=<cursor> only messages after the cursor are returned, along
+    with the cursor to use on the next sync (an empty `since` starts from
+    the beginning of the thread).
+    """
     current_user = get_current_user()
     
     # Verify user has access to this appointment
@@ -71,11 +96,32 @@ def get_messages(appointment_id):
     if user_id != patient_id and current_user['role'] != 'doctor':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Mark messages as read
-    Message.mark_as_read(appointment_id, current_user['role'])
+    since = request.args.get('since')
+    try:
+        after, limit = get_page_args()
+        if since:
+            after = since
+        messages, next_cursor = Message.find_page_by_appointment(appointment_id, after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Only newly delivered messages move the read pointer
+    markers = Message.mark_delivered_as_read(
+        appointment_id, current_user['role'], messages, Message.get_read_markers(appointment_id)
+    )
     
-    messages = Message.find_by_appointment(appointment_id)
-    return jsonify([Message.to_dict(msg) for msg in messages])
+    result = [Message.to_dict(msg, markers) for msg in messages]
+    if since is not None:
+        return jsonify({
+            'items': result,
+            'cursor': encode_cursor(messages[-1]) if messages else (since or None),
+            'hasMore': next_cursor is not None,
+            'readMarkers': {
+                role: {'lastReadId': str(last_id), 'lastReadAt': last_at.isoformat()}
+                for role, (last_at, last_id) in markers.items()
+            }
+        })
+    return jsonify(page_response(result, next_cursor, limit is not None))
 
 @messages_bp.route('/<appointment_id>', methods=['POST'])
 @jwt_required()
@@ -118,6 +164,31 @@ def get_unread_count(appointment_id):
     count = Message.get_unread_count(appointment_id, current_user['role'])
     return jsonify({'unread': count})
 
+@messages_bp.route('/<appointment_id>/read', methods=['POST'])
+@jwt_required()
+def mark_read(appointment_id):
+    """Move the current user's read pointer up to a message (default: everything so far)."""
+    current_user = get_current_user()
+    data = request.get_json(silent=True) or {}
+    
+    appointment = Appointment.find_by_id(appointment_id)
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+    
+    if current_user['id'] != str(appointment.get('patient_id', '')) and current_user['role'] != 'doctor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    up_to = None
+    if data.get('messageId'):
+        if not ObjectId.is_valid(data['messageId']):
+            return jsonify({'error': 'Invalid messageId'}), 400
+        up_to = Message.find_by_id(data['messageId'])
+        if not up_to or str(up_to['appointment_id']) != appointment_id:
+            return jsonify({'error': 'Message not found'}), 404
+    
+    Message.mark_as_read(appointment_id, current_user['role'], up_to)
+    return jsonify({'success': True})
+
 @messages_bp.route('/<appointment_id>/status', methods=['GET'])
 @jwt_required()
 def get_chat_status(appointment_id):
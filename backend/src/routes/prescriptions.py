@@ -5,31 +5,12 @@ from ..models.prescription import Prescription
 from ..models.appointment import Appointment
 from ..models.doctor import Doctor
 from ..models.patient import Patient
-from ..models.notification import Notification
-from ..database import get_db
+from ..models.outbox import Outbox
+from ..models.pagination import get_page_args, page_response
 import json
-from datetime import datetime
 
 prescriptions_bp = Blueprint('prescriptions', __name__)
 
-ACTIVITIES_COLLECTION = 'activities'
-
-
-def create_activity(user_id: str, activity_type: str, title: str, description: str, icon: str = 'BellIcon', color: str = 'bg-primary'):
-    """Create an activity entry for a user."""
-    db = get_db()
-    activity = {
-        'user_id': ObjectId(user_id),
-        'type': activity_type,
-        'title': title,
-        'description': description,
-        'timestamp': datetime.utcnow(),
-        'icon': icon,
-        'color': color,
-    }
-    db[ACTIVITIES_COLLECTION].insert_one(activity)
-
-
 def get_current_user():
     """Parse JWT identity and return user dict."""
     identity = get_jwt_identity()
@@ -89,24 +70,12 @@ def create_prescription():
         notes=notes
     )
     
-    # Create notification for patient
-    Notification.create(
-        user_id=appointment['patient_id'],
-        title='New Prescription',
-        message=f"Dr. {doctor['name']} has created a new prescription for you.",
-        notification_type='prescription',
-        link='/patient-dashboard/prescriptions'
-    )
-    
-    # Create activity for patient
-    create_activity(
-        user_id=str(appointment['patient_id']),
-        activity_type='prescription',
-        title='New Prescription',
-        description=f"Dr. {doctor['name']} prescribed {len(medications)} medication(s).",
-        icon='ClipboardDocumentListIcon',
-        color='bg-accent'
-    )
+    Outbox.record('prescription.created', {
+        'prescription_id': prescription['_id'],
+        'patient_id': appointment['patient_id'],
+        'doctor_name': doctor['name'],
+        'medication_count': len(medications)
+    })
     
     result = Prescription.to_dict(prescription)
     result['doctorName'] = doctor['name']
@@ -126,17 +95,22 @@ def get_patient_prescriptions():
     # Prescriptions are stored with user_id as patient_id (from appointment)
     # So we query directly by user_id, not patient profile's _id
     user_id = current_user['id']
-    prescriptions = Prescription.find_by_patient_id(user_id)
-    
-    # Add doctor names
+    try:
+        after, limit = get_page_args()
+        prescriptions, next_cursor = Prescription.find_page_by_patient_id(user_id, after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Add doctor names (one batched lookup for all doctors)
+    doctors = Doctor.find_many_by_ids([p['doctor_id'] for p in prescriptions])
     result = []
     for p in prescriptions:
         data = Prescription.to_dict(p)
-        doctor = Doctor.find_by_id(p['doctor_id'])
+        doctor = doctors.get(p['doctor_id'])
         data['doctorName'] = doctor['name'] if doctor else 'Unknown'
         result.append(data)
     
-    return jsonify(result)
+    return jsonify(page_response(result, next_cursor, limit is not None))
 
 
 @prescriptions_bp.route('/appointment/<appointment_id>', methods=['GET'])
@@ -210,20 +184,25 @@ def get_doctor_prescriptions():
     if not doctor:
         return jsonify({'error': 'Doctor profile not found'}), 404
     
-    prescriptions = Prescription.find_by_doctor_id(doctor['_id'])
+    try:
+        after, limit = get_page_args()
+        prescriptions, next_cursor = Prescription.find_page_by_doctor_id(doctor['_id'], after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Add patient names
+    # Add patient names (one batched lookup for all patients)
+    patients = Patient.find_many_by_user_ids([p.get('patient_id') for p in prescriptions])
     result = []
     for p in prescriptions:
         data = Prescription.to_dict(p)
-        patient = Patient.find_by_user_id(str(p.get('patient_id', '')))
+        patient = patients.get(p.get('patient_id'))
         if patient:
             data['patientName'] = f"{patient.get('firstName', '')} {patient.get('lastName', '')}"
         else:
             data['patientName'] = 'Unknown'
         result.append(data)
     
-    return jsonify(result)
+    return jsonify(page_response(result, next_cursor, limit is not None))
 
 
 @prescriptions_bp.route('/patient/<patient_id>', methods=['POST'])
@@ -268,24 +247,12 @@ def create_prescription_for_patient(patient_id):
         notes=notes
     )
     
-    # Create notification for patient
-    Notification.create(
-        user_id=patient_id,
-        title='New Prescription',
-        message=f"Dr. {doctor['name']} has created a new prescription for you.",
-        notification_type='prescription',
-        link='/patient-dashboard/prescriptions'
-    )
-    
-    # Create activity for patient
-    create_activity(
-        user_id=patient_id,
-        activity_type='prescription',
-        title='New Prescription',
-        description=f"Dr. {doctor['name']} prescribed {len(medications)} medication(s).",
-        icon='ClipboardDocumentListIcon',
-        color='bg-accent'
-    )
+    Outbox.record('prescription.created', {
+        'prescription_id': prescription['_id'],
+        'patient_id': ObjectId(patient_id),
+        'doctor_name': doctor['name'],
+        'medication_count': len(medications)
+    })
     
     result = Prescription.to_dict(prescription)
     result['doctorName'] = doctor['name']
@@ -5,7 +5,8 @@ from ..models.rating import Rating
 from ..models.appointment import Appointment
 from ..models.doctor import Doctor
 from ..models.patient import Patient
-from ..models.notification import Notification
+from ..models.outbox import Outbox
+from ..models.pagination import get_page_args
 import json
 
 ratings_bp = Blueprint('ratings', __name__)
@@ -75,26 +76,14 @@ def create_rating():
         # Mark appointment as rated
         Appointment.update(appointment_id, {'rated': True})
         
-        # Update doctor's average rating
-        rating_stats = Rating.calculate_average(appointment['doctor_id'])
-        Doctor.update(appointment['doctor_id'], {
-            'rating': rating_stats['average'],
-            'rating_count': rating_stats['count']
+        # Doctor's average rating and notification are applied by the outbox worker
+        Outbox.record('rating.created', {
+            'rating_id': rating['_id'],
+            'doctor_id': appointment['doctor_id'],
+            'patient_id': ObjectId(current_user['id']),
+            'score': score
         })
         
-        # Create notification for doctor
-        doctor = Doctor.find_by_id(appointment['doctor_id'])
-        if doctor:
-            patient = Patient.find_by_user_id(current_user['id'])
-            patient_name = f"{patient.get('firstName', '')} {patient.get('lastName', '')}" if patient else 'A patient'
-            Notification.create(
-                user_id=doctor['user_id'],
-                title='New Review Received',
-                message=f"{patient_name} has left you a {score}-star review.",
-                notification_type='info',
-                link='/doctor-dashboard'
-            )
-        
         return jsonify({
             'message': 'Rating submitted successfully',
             'rating': Rating.to_dict(rating)
@@ -113,15 +102,19 @@ def get_doctor_ratings(doctor_id):
         if not doctor:
             return jsonify({'error': 'Doctor not found'}), 404
         
-        ratings = Rating.find_by_doctor_id(doctor_id)
+        after, limit = get_page_args()
+        ratings, next_cursor = Rating.find_page_by_doctor_id(doctor_id, after, limit)
         stats = Rating.calculate_average(doctor_id)
         
         return jsonify({
             'ratings': [Rating.to_dict(r) for r in ratings],
             'average': stats['average'],
-            'count': stats['count']
+            'count': stats['count'],
+            'nextCursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -155,11 +148,12 @@ def get_my_reviews():
     ratings = Rating.find_by_doctor_id(doctor['_id'])
     stats = Rating.calculate_average(doctor['_id'])
     
-    # Enrich with patient names
+    # Enrich with patient names (one batched lookup for all patients)
+    patients = Patient.find_many_by_user_ids([r.get('patient_id') for r in ratings])
     result = []
     for r in ratings:
         rating_dict = Rating.to_dict(r)
-        patient = Patient.find_by_user_id(str(r.get('patient_id', '')))
+        patient = patients.get(r.get('patient_id'))
         if patient:
             rating_dict['patientName'] = f"{patient.get('firstName', '')} {patient.get('lastName', '')}"
         else:
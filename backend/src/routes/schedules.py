@@ -3,10 +3,21 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from ..models.schedule import Schedule
 from ..models.doctor import Doctor
+from ..services.slot_search import find_earliest_slots
+from .auth import VALID_SPECIALTIES
 import json
+from datetime import datetime, timedelta
 
 schedules_bp = Blueprint('schedules', __name__)
 
+# Longest range served by the calendar endpoint
+MAX_CALENDAR_DAYS = 62
+
+# Defaults and bounds for the earliest-slot search
+EARLIEST_DEFAULT_DAYS = 7
+EARLIEST_DEFAULT_LIMIT = 10
+EARLIEST_MAX_LIMIT = 50
+
 
 def get_current_user():
     """Parse JWT identity and return user dict."""
@@ -105,6 +116,84 @@ def get_available_slots(doctor_id):
     })
 
 
+@schedules_bp.route('/doctor/<doctor_id>/calendar', methods=['GET'])
+def get_calendar(doctor_id):
+    """Get available time slots for every date in a range (public endpoint)."""
+    start_date = request.args.get('from')
+    end_date = request.args.get('to')
+    
+    if not start_date or not end_date:
+        return jsonify({'error': 'from and to parameters are required'}), 400
+    
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    if end < start:
+        return jsonify({'error': 'to must not be before from'}), 400
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        return jsonify({'error': f'Date range cannot exceed {MAX_CALENDAR_DAYS} days'}), 400
+    
+    # Verify doctor exists
+    doctor = Doctor.find_by_id(doctor_id)
+    if not doctor:
+        return jsonify({'error': 'Doctor not found'}), 404
+    
+    slots_by_date = Schedule.get_available_slots_range(doctor_id, start_date, end_date)
+    
+    return jsonify({
+        'doctorId': doctor_id,
+        'from': start_date,
+        'to': end_date,
+        'days': [{'date': date, 'slots': slots} for date, slots in slots_by_date.items()]
+    })
+
+
+@schedules_bp.route('/earliest', methods=['GET'])
+def get_earliest_slots():
+    """Get the earliest open slots across all verified doctors of a specialty (public endpoint)."""
+    specialty = request.args.get('specialty')
+    if specialty not in VALID_SPECIALTIES:
+        return jsonify({'error': f'Invalid specialty. Must be one of: {", ".join(VALID_SPECIALTIES)}'}), 400
+    
+    today = datetime.now().date()
+    try:
+        requested_start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+        # Past dates have no bookable slots
+        start = max(requested_start, today)
+        if request.args.get('to'):
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+        else:
+            end = start + timedelta(days=EARLIEST_DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    if end < requested_start:
+        return jsonify({'error': 'to must not be before from'}), 400
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        return jsonify({'error': f'Date range cannot exceed {MAX_CALENDAR_DAYS} days'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', EARLIEST_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, EARLIEST_MAX_LIMIT)
+    
+    start_date = start.strftime('%Y-%m-%d')
+    end_date = end.strftime('%Y-%m-%d')
+    
+    return jsonify({
+        'specialty': specialty,
+        'from': start_date,
+        'to': end_date,
+        'slots': find_earliest_slots(specialty, start_date, end_date, limit) if end >= start else []
+    })
+
+
 @schedules_bp.route('/blocked-dates', methods=['POST'])
 @jwt_required()
 def add_blocked_date():
@@ -4,6 +4,7 @@ from ..services.video_call_service import VideoCallService
 from ..models.patient import Patient
 from ..models.doctor import Doctor
 from ..models.appointment import Appointment
+from ..services import lifecycle
 import json
 import os
 from datetime import datetime
@@ -132,9 +133,14 @@ def create_call(appointment_id):
     # If doctor is joining, we can optionally mark appointment as "in_progress"
     # if it was confirmed
     if role == "doctor" and appointment.get("status") == "confirmed":
-        Appointment.update_status(appointment_id, "in_progress")
-        # We could also record call start time here
-        Appointment.update(appointment_id, {"call_started_at": datetime.utcnow()})
+        started = lifecycle.apply(
+            appointment_id,
+            "start_call",
+            actor=current_user,
+            updates={"call_started_at": datetime.utcnow()},
+        )
+        if started:
+            appointment = started
 
     return jsonify(
         {
@@ -0,0 +1,103 @@
+"""Bounded chatbot context: recent turns verbatim plus a rolling summary.
+
+Each turn sends the system prompt, the stored summary of older turns and the
+newest unsummarized messages that fit the history token budget. Once more
+than two windows of messages pile up behind the summary, the older ones are
+folded into it by the outbox worker, so summarizing never delays a reply.
+"""
+from flask import current_app
+from langchain_core.messages import HumanMessage, SystemMessage
+from ..models.chat_history import ChatHistory
+from ..models.outbox import Outbox
+from . import llm
+
+# Rough characters per token; budgets only need an estimate
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a patient and a medical assistant chatbot.
+Update the current summary with the new messages. Keep symptoms, their duration and severity,
+relevant history, doctors or specialties already recommended, and open questions.
+Drop greetings and small talk. Write plain prose of at most 150 words."""
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _window():
+    """Number of messages kept verbatim (two per turn)."""
+    return current_app.config.get('CHAT_CONTEXT_TURNS', 6) * 2
+
+
+def select_history(user_id):
+    """Get (summary, recent messages) to send with the next turn.
+
+    Recent messages are the newest unsummarized ones that fit
+    CHAT_HISTORY_TOKEN_BUDGET together with the summary.
+    """
+    header = ChatHistory.find_by_user_id(user_id)
+    if not header:
+        return '', []
+
+    summary = header.get('summary', '')
+    count = header.get('message_count', 0)
+    # Messages beyond two windows are waiting to be summarized; leave them out
+    start = max(header.get('summarized_through', 0), count - 2 * _window())
+    recent = ChatHistory.get_messages_range(user_id, start) if count > start else []
+
+    budget = current_app.config.get('CHAT_HISTORY_TOKEN_BUDGET', 3000)
+    used = estimate_tokens(summary) if summary else 0
+    kept = []
+    for msg in reversed(recent):
+        used += estimate_tokens(msg['content'])
+        if used > budget:
+            break
+        kept.append(msg)
+    kept.reverse()
+
+    # Never open with a reply whose question was cut off
+    while kept and kept[0]['role'] != 'user':
+        kept.pop(0)
+    return summary, kept
+
+
+def schedule_summary(user_id):
+    """Queue folding older messages into the summary once enough have piled up."""
+    header = ChatHistory.find_by_user_id(user_id)
+    if not header:
+        return False
+    window = _window()
+    count = header.get('message_count', 0)
+    if count - header.get('summarized_through', 0) <= 2 * window:
+        return False
+
+    through = count - window
+    if not ChatHistory.request_summary(user_id, through):
+        return False
+    Outbox.record('chat.summarize', {
+        'history_id': header['_id'],
+        'user_id': header['user_id'],
+        'through': through
+    })
+    return True
+
+
+def summarize_history(history_id, user_id, through):
+    """Fold the messages before position `through` into the stored summary."""
+    header = ChatHistory.find_by_user_id(user_id)
+    if not header or header['_id'] != history_id:
+        return False  # history was cleared
+    start = header.get('summarized_through', 0)
+    if start >= through:
+        return False
+
+    transcript = "\n".join(
+        f"{msg['role']}: {msg['content']}"
+        for msg in ChatHistory.get_messages_range(user_id, start, through)
+    )
+    response = llm.invoke('summary', [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"Current summary:\n{header.get('summary') or '(none)'}\n\nNew messages:\n{transcript}")
+    ], user_id=user_id)
+    summary = response.content.strip()[:current_app.config.get('CHAT_SUMMARY_MAX_CHARS', 2000)]
+    return ChatHistory.update_summary(history_id, summary, through)
@@ -1,14 +1,29 @@
-import os
+import hashlib
+import math
+import re
+import threading
+import time as time_module
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
 from flask import current_app
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from ..models.doctor import Doctor
 from ..models.chat_history import ChatHistory
+from ..models.chat_turn import ChatTurn, DONE
+from ..models.cache_version import CacheVersion, DOCTOR_DIRECTORY_CACHE
+from . import llm
+from .chat_context import select_history, schedule_summary
+from .doctor_retrieval import find_relevant_doctors
+from .triage import triage_reply, NEGATIONS
+from .symptom_terms import tokenize
 
+# Earlier patient messages added to the retrieval query for follow-ups
+RETRIEVAL_CONTEXT_MESSAGES = 2
 
-def get_doctors_context():
-    """Get formatted doctors information for the LLM context."""
-    doctors = Doctor.find_all()
+
+def get_doctors_context(query=None):
+    """Get formatted information on the verified doctors most relevant to `query`."""
+    doctors = find_relevant_doctors(query)
     if not doctors:
         return "No doctors available in the system."
     
@@ -23,10 +38,8 @@ def get_doctors_context():
     return "\n".join(doctors_info)
 
 
-def get_system_prompt():
-    """Get the system prompt for the chatbot."""
-    doctors_context = get_doctors_context()
-    
+def build_system_prompt(doctors_context):
+    """Render the chatbot system prompt around the doctors context."""
     return f"""You are a helpful medical assistant chatbot for a healthcare platform. Your role is to:
 
 1. Listen to patients describe their symptoms
@@ -34,7 +47,7 @@ def get_system_prompt():
 3. Provide helpful health information (but always remind them to consult a doctor)
 4. Be empathetic and supportive
 
-AVAILABLE DOCTORS:
+AVAILABLE DOCTORS (the best matches for this conversation):
 {doctors_context}
 
 GUIDELINES:
@@ -49,19 +62,9 @@ GUIDELINES:
 Remember: You are NOT a replacement for professional medical advice. Always encourage patients to book an appointment with the recommended doctor."""
 
 
-def create_chat_model():
-    """Create and configure the Gemini chat model."""
-    api_key = current_app.config.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_API_KEY')
-    
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY is not configured. Please set it in environment variables.")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=api_key,
-        temperature=0.7,
-        convert_system_message_to_human=True
-    )
+def get_system_prompt(query=None):
+    """Get the system prompt for the chatbot, listing doctors relevant to `query`."""
+    return build_system_prompt(get_doctors_context(query))
 
 
 def build_messages_from_history(history_messages):
@@ -77,35 +80,341 @@ def build_messages_from_history(history_messages):
     return messages
 
 
-def process_message(user_id, user_message):
-    """Process a user message and return AI response."""
-    # Get the chat model
-    llm = create_chat_model()
+def build_conversation(user_id, user_message):
+    """Build the LLM input: system prompt, bounded history and the new message."""
+    summary, recent = select_history(user_id)
+    earlier = [msg['content'] for msg in recent if msg['role'] == 'user'][-RETRIEVAL_CONTEXT_MESSAGES:]
+    system_prompt = get_system_prompt(' '.join(earlier + [user_message]))
+    if summary:
+        system_prompt += f"\n\nSUMMARY OF THE EARLIER CONVERSATION:\n{summary}"
     
-    # Get existing chat history
-    history_messages = ChatHistory.get_messages(user_id)
+    messages = [SystemMessage(content=system_prompt)]
+    messages.extend(build_messages_from_history(recent))
+    messages.append(HumanMessage(content=user_message))
+    return messages
+
+
+# Words the symptom tokenizer drops that change the right answer (durations,
+# ages, counts); messages containing them are never answered from the cache
+DETAIL_WORDS = frozenset([
+    'minute', 'minutes', 'hour', 'hours', 'day', 'days', 'week', 'weeks', 'month', 'months',
+    'year', 'years', 'old', 'age', 'aged', 'since', 'ago', 'yesterday', 'tonight',
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+    'eleven', 'twelve', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty',
+    'ninety', 'hundred', 'few', 'several', 'couple', 'once', 'twice',
+])
+
+
+def _uncacheable(message):
+    """Whether a message carries details the cache key would lose: negations, numbers, durations or ages."""
+    if any(char.isdigit() for char in message):
+        return True
+    return any(
+        word in NEGATIONS or word in DETAIL_WORDS or word.endswith("n't")
+        for word in re.findall(r"[a-z']+", message.lower())
+    )
+
+
+def _vector(tokens):
+    counts = Counter(tokens)
+    norm = math.sqrt(sum(n * n for n in counts.values()))
+    return {term: n / norm for term, n in counts.items()}
+
+
+class ResponseCache:
+    """Per-process cache of replies to first-turn messages.
+    
+    Messages are normalized with the symptom tokenizer, so case, inflection
+    and stop words do not matter; the exact key keeps word order. A miss
+    falls back to the most similar cached message (cosine similarity over
+    term counts) above a threshold. Messages containing a negation, a number,
+    a duration or an age are never cached or answered from the cache, since
+    the tokens alone lose those details ("fever but no chest pain" vs "chest
+    pain but no fever", "fever for 2 days" vs "fever for 3 weeks").
+    Entries are tied to the doctor directory version, expire after a TTL and
+    are evicted least recently used beyond `max_entries`.
+    """
+    
+    def __init__(self, max_entries=500, ttl_seconds=3600, min_similarity=0.85):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (version, normalized) -> (vector, reply, stored_at)
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+    
+    def _fresh(self, entry, now):
+        return now - entry[2] <= self.ttl_seconds
+    
+    def get(self, version, message):
+        if _uncacheable(message):
+            return None
+        tokens = tokenize(message)
+        key = (version, ' '.join(tokens))
+        now = time_module.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            
+            best_key, best_score = None, self.min_similarity
+            vector = _vector(tokens)
+            for other_key, (other_vector, _, stored_at) in list(self._entries.items()):
+                if other_key[0] != version or now - stored_at > self.ttl_seconds:
+                    del self._entries[other_key]
+                    continue
+                score = sum(weight * other_vector.get(term, 0) for term, weight in vector.items())
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                return self._entries[best_key][1]
+            self.misses += 1
+            return None
+    
+    def put(self, version, message, reply):
+        if _uncacheable(message):
+            return
+        tokens = tokenize(message)
+        if not tokens:
+            return
+        with self._lock:
+            self._entries[(version, ' '.join(tokens))] = (_vector(tokens), reply, time_module.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'similarHits': self.similar_hits,
+                'misses': self.misses,
+                'hitRate': round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0
+            }
+
+
+def get_response_cache():
+    """Get the first-turn response cache for the current app."""
+    cache = current_app.extensions.get('chatbot_response_cache')
+    if cache is None:
+        config = current_app.config
+        cache = ResponseCache(
+            max_entries=config.get('CHATBOT_RESPONSE_CACHE_SIZE', 500),
+            ttl_seconds=config.get('CHATBOT_RESPONSE_CACHE_TTL_SECONDS', 3600),
+            min_similarity=config.get('CHATBOT_RESPONSE_CACHE_SIMILARITY', 0.85)
+        )
+        current_app.extensions['chatbot_response_cache'] = cache
+    return cache
+
+
+def first_turn_key(user_id, user_message):
+    """Response cache key for a conversation's first message, or None if the cache does not apply."""
+    if not current_app.config.get('CHATBOT_RESPONSE_CACHE_ENABLED', True):
+        return None
+    header = ChatHistory.find_by_user_id(user_id)
+    if header and header.get('message_count'):
+        return None
+    return CacheVersion.get(DOCTOR_DIRECTORY_CACHE), user_message
+
+
+def quick_reply(user_id, user_message):
+    """Answer without the LLM when possible.
+    
+    Returns (reply, cache_key): reply comes from triage rules or the response
+    cache, or is None to ask the LLM, whose reply should then be cached under
+    cache_key if it is not None.
+    """
+    config = current_app.config
+    if config.get('CHATBOT_TRIAGE_ENABLED', True):
+        reply = triage_reply(user_message, max_words=config.get('CHATBOT_TRIAGE_MAX_WORDS', 12))
+        if reply is not None:
+            return reply, None
+    
+    cache_key = first_turn_key(user_id, user_message)
+    if cache_key is None:
+        return None, None
+    return get_response_cache().get(*cache_key), cache_key
+
+
+def save_turn(user_id, user_message, reply):
+    """Store a completed turn's two messages together and queue summarizing if the history has grown.
+
+    The history costs a header update and one bucket `$push`; the turn lock
+    adds its own acquire and complete writes (see begin_turn).
+    """
+    ChatHistory.add_messages(user_id, [('user', user_message), ('assistant', reply)])
+    schedule_summary(user_id)
+
+
+class TurnInProgress(Exception):
+    """Raised when another of the user's messages is still being answered."""
+
+
+def _message_hash(user_message):
+    return hashlib.sha256(' '.join(user_message.lower().split()).encode()).hexdigest()
+
+
+def begin_turn(user_id, user_message):
+    """Take the user's turn lock without waiting for a running turn.
+
+    Returns (token, None) to answer the message, or (None, reply) when an
+    identical message was answered within CHATBOT_DUPLICATE_WINDOW_SECONDS,
+    so double submits cost one LLM call and one turn. Raises TurnInProgress
+    at once while another turn is running, so no request thread is held
+    waiting for it; the client resends once the running reply arrives.
+    """
+    config = current_app.config
+    message_hash = _message_hash(user_message)
+    duplicate_window = timedelta(seconds=config.get('CHATBOT_DUPLICATE_WINDOW_SECONDS', 10))
+    turn = ChatTurn.get(user_id)
+    if (turn and turn.get('status') == DONE and turn.get('message_hash') == message_hash
+            and turn['completed_at'] >= datetime.utcnow() - duplicate_window):
+        return None, turn['reply']
+
+    token = ChatTurn.acquire(user_id, message_hash, config.get('CHATBOT_TURN_LOCK_SECONDS', 120))
+    if token:
+        return token, None
+    if turn and turn.get('message_hash') == message_hash:
+        raise TurnInProgress("This message is already being answered. The reply will appear shortly.")
+    raise TurnInProgress("Your previous message is still being answered. Please wait for the reply.")
+
+
+def _answer(user_id, user_message):
+    # Clear symptom statements and repeated first questions skip the LLM
+    reply, cache_key = quick_reply(user_id, user_message)
+    if reply is not None:
+        save_turn(user_id, user_message, reply)
+        return reply
     
     # Build the message list
-    messages = [SystemMessage(content=get_system_prompt())]
-    messages.extend(build_messages_from_history(history_messages))
-    messages.append(HumanMessage(content=user_message))
+    messages = build_conversation(user_id, user_message)
     
     # Get AI response
-    response = llm.invoke(messages)
+    response = llm.invoke('chat', messages, user_id=user_id)
     ai_response = response.content
     
     # Store messages in history
-    ChatHistory.add_message(user_id, 'user', user_message)
-    ChatHistory.add_message(user_id, 'assistant', ai_response)
+    save_turn(user_id, user_message, ai_response)
+    if cache_key:
+        get_response_cache().put(*cache_key, ai_response)
     
     return ai_response
 
 
+def process_message(user_id, user_message):
+    """Process a user message and return AI response.
+    
+    Turns of one user run one at a time (see begin_turn).
+    """
+    token, reply = begin_turn(user_id, user_message)
+    if token is None:
+        return reply
+    try:
+        reply = _answer(user_id, user_message)
+    except BaseException:
+        ChatTurn.release(user_id, token)
+        raise
+    ChatTurn.complete(user_id, token, reply)
+    return reply
+
+
+def _chunk_text(chunk):
+    """Text of a streamed chunk, whose content may be a string or content blocks."""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return ''.join(
+        block.get('text', '') if isinstance(block, dict) else str(block)
+        for block in chunk.content
+    )
+
+
+def _stream_answer(user_id, user_message):
+    reply, cache_key = quick_reply(user_id, user_message)
+    if reply is not None:
+        def answer():
+            yield reply
+            save_turn(user_id, user_message, reply)
+        return answer()
+    
+    messages = build_conversation(user_id, user_message)
+    upstream = llm.stream('chat', messages, user_id=user_id)
+    
+    def generate():
+        parts = []
+        try:
+            for chunk in upstream:
+                text = _chunk_text(chunk)
+                if text:
+                    parts.append(text)
+                    yield text
+        finally:
+            upstream.close()
+        
+        ai_response = ''.join(parts)
+        save_turn(user_id, user_message, ai_response)
+        if cache_key:
+            get_response_cache().put(*cache_key, ai_response)
+    
+    return generate()
+
+
+def stream_message(user_id, user_message):
+    """Start a streamed reply to a user message.
+
+    The turn lock is taken and the model and prompt are prepared before
+    returning, so TurnInProgress and configuration errors are raised to the
+    caller. Triage, cached and coalesced duplicate answers arrive as one chunk.
+    The returned generator yields text
+    chunks as the model produces them and stores both messages once the
+    reply is complete. Closing it early (client disconnect) closes the
+    upstream stream, stores nothing and frees the turn.
+    """
+    token, reply = begin_turn(user_id, user_message)
+    if token is None:
+        def coalesced():
+            yield reply
+        return coalesced()
+    try:
+        chunks = _stream_answer(user_id, user_message)
+    except BaseException:
+        ChatTurn.release(user_id, token)
+        raise
+    
+    def locked():
+        parts = []
+        completed = False
+        try:
+            for text in chunks:
+                parts.append(text)
+                yield text
+            completed = True
+        finally:
+            chunks.close()
+            if completed:
+                ChatTurn.complete(user_id, token, ''.join(parts))
+            else:
+                ChatTurn.release(user_id, token)
+    
+    return locked()
+
+
 def get_chat_history(user_id):
     """Get formatted chat history for a user."""
     return ChatHistory.get_messages(user_id)
 
 
+def get_chat_history_page(user_id, after=None, limit=None):
+    """Get a page of chat history for a user. Returns (messages, next_cursor)."""
+    return ChatHistory.get_messages_page(user_id, after, limit)
+
+
 def clear_chat_history(user_id):
     """Clear chat history for a user."""
     return ChatHistory.clear_history(user_id)
@@ -0,0 +1,165 @@
+"""Precomputed public doctor directory with cached schedule availability."""
+import threading
+import time as time_module
+from datetime import datetime
+from flask import current_app
+from ..database import get_db, SCHEDULES_COLLECTION
+from ..models.doctor import Doctor
+from ..models.cache_version import CacheVersion, DOCTOR_DIRECTORY_CACHE
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DAY_ABBREV = {
+    'monday': 'Mon', 'tuesday': 'Tue', 'wednesday': 'Wed',
+    'thursday': 'Thu', 'friday': 'Fri', 'saturday': 'Sat', 'sunday': 'Sun'
+}
+DEFAULT_AVAILABILITY = ["Mon 9:00 AM - 5:00 PM", "Tue 9:00 AM - 5:00 PM",
+                        "Wed 9:00 AM - 5:00 PM", "Thu 9:00 AM - 5:00 PM",
+                        "Fri 9:00 AM - 5:00 PM"]
+
+# Marker for a day whose start/end could not be parsed
+INVALID_HOURS = 'invalid'
+
+
+class CompiledSchedule:
+    """A doctor's weekly schedule parsed once into comparable times.
+
+    `days[weekday]` is None (not working), INVALID_HOURS, or a
+    (start, end, start_label) tuple where start/end are datetime.time.
+    """
+
+    __slots__ = ('days', 'blocked_dates', 'availability')
+
+    def __init__(self, days, blocked_dates, availability):
+        self.days = days
+        self.blocked_dates = blocked_dates
+        self.availability = availability
+
+
+def compile_schedule(schedule):
+    """Parse a schedule document into a CompiledSchedule."""
+    weekly = schedule.get('weekly_schedule', {}) or {}
+    days = []
+    availability = []
+
+    for day in WEEKDAYS:
+        day_schedule = weekly.get(day, {}) or {}
+        if not day_schedule.get('enabled', False):
+            days.append(None)
+            continue
+
+        start = day_schedule.get('start', '09:00')
+        end = day_schedule.get('end', '17:00')
+        try:
+            start_dt = datetime.strptime(start, '%H:%M')
+            end_dt = datetime.strptime(end, '%H:%M')
+        except (ValueError, TypeError):
+            days.append(INVALID_HOURS)
+            availability.append(f"{DAY_ABBREV[day]} {start} - {end}")
+            continue
+
+        days.append((start_dt.time(), end_dt.time(), start_dt.strftime('%I:%M %p')))
+        availability.append(
+            f"{DAY_ABBREV[day]} {start_dt.strftime('%I:%M %p').lstrip('0')} - "
+            f"{end_dt.strftime('%I:%M %p').lstrip('0')}"
+        )
+
+    return CompiledSchedule(
+        days=days,
+        blocked_dates=frozenset(schedule.get('blocked_dates', []) or []),
+        availability=availability or ["No availability set"]
+    )
+
+
+def availability_status(compiled, now):
+    """Return (is_available, status_message) for a compiled schedule at `now`."""
+    if compiled is None:
+        # No schedule set - assume available during business hours (9 AM - 5 PM)
+        if 9 <= now.hour < 17:
+            return True, "Available"
+        return False, "Outside business hours"
+
+    if now.strftime('%Y-%m-%d') in compiled.blocked_dates:
+        return False, "Not available today"
+
+    hours = compiled.days[now.weekday()]
+    if hours is None:
+        return False, "Not available today"
+    if hours == INVALID_HOURS:
+        return True, "Available"
+
+    start, end, start_label = hours
+    current_time = now.time()
+    if start <= current_time <= end:
+        return True, "Available now"
+    elif current_time < start:
+        return False, f"Available from {start_label}"
+    return False, "Closed for today"
+
+
+class DoctorDirectory:
+    """Per-process cache of the doctor list and their compiled schedules.
+
+    The cache is rebuilt when the shared DOCTOR_DIRECTORY_CACHE version
+    changes (bumped by Doctor and Schedule writes) or after a TTL, so
+    each hit costs one primary-key read instead of 2N+1 queries.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._version = None
+        self._built_at = 0
+        self._entries = []
+
+    def _build(self):
+        doctors = Doctor.find_all()
+        db = get_db()
+        schedules = {
+            schedule['doctor_id']: compile_schedule(schedule)
+            for schedule in db[SCHEDULES_COLLECTION].find(
+                {'doctor_id': {'$in': [doc['_id'] for doc in doctors]}}
+            )
+        }
+
+        entries = []
+        for doc in doctors:
+            compiled = schedules.get(doc['_id'])
+            doc_dict = Doctor.to_dict(doc)
+            doc_dict['availability'] = compiled.availability if compiled else DEFAULT_AVAILABILITY
+            entries.append((doc_dict, compiled))
+        return entries
+
+    def _current_entries(self):
+        version = CacheVersion.get(DOCTOR_DIRECTORY_CACHE)
+        expired = time_module.monotonic() - self._built_at > self.ttl_seconds
+        if version == self._version and not expired:
+            return self._entries
+
+        entries = self._build()
+        with self._lock:
+            self._entries = entries
+            self._version = version
+            self._built_at = time_module.monotonic()
+        return entries
+
+    def get_doctors(self, now=None):
+        """Get every doctor as an API dict with live availability flags."""
+        now = now or datetime.now()
+        result = []
+        for doc_dict, compiled in self._current_entries():
+            is_available, status_message = availability_status(compiled, now)
+            entry = dict(doc_dict)
+            entry['isAvailable'] = is_available
+            entry['availabilityStatus'] = status_message
+            result.append(entry)
+        return result
+
+
+def get_doctor_directory():
+    """Get the directory cache for the current app."""
+    directory = current_app.extensions.get('doctor_directory')
+    if directory is None:
+        directory = DoctorDirectory(current_app.config.get('DOCTOR_DIRECTORY_TTL_SECONDS', 300))
+        current_app.extensions['doctor_directory'] = directory
+    return directory
+
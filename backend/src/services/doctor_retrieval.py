@@ -0,0 +1,123 @@
+"""Offline TF-IDF retrieval of the doctors most relevant to a patient's message.
+
+Each verified doctor is indexed from their specialty, location, name and bio,
+plus the symptom vocabulary of their specialty, so "my chest hurts" finds
+cardiologists without any external embedding service. The chatbot prompt then
+lists only the top matches, keeping its size constant as doctors are added.
+"""
+import math
+import threading
+import time as time_module
+from collections import Counter
+from flask import current_app
+from ..models.doctor import Doctor
+from ..models.cache_version import CacheVersion, DOCTOR_DIRECTORY_CACHE
+from .symptom_terms import SPECIALTY_TERMS, tokenize
+
+# Specialty listed first when a message matches no doctor
+FALLBACK_SPECIALTY = 'General Practice'
+
+# Specialty names weigh more than the shared symptom vocabulary
+SPECIALTY_NAME_WEIGHT = 3
+
+
+def _doctor_terms(doctor):
+    specialty = doctor.get('specialty', '')
+    terms = tokenize(specialty) * SPECIALTY_NAME_WEIGHT
+    terms += tokenize(SPECIALTY_TERMS.get(specialty, ''))
+    terms += tokenize(' '.join([doctor.get('name', ''), doctor.get('location', ''), doctor.get('bio', '')]))
+    return terms
+
+
+def _normalized(weights):
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {term: w / norm for term, w in weights.items()} if norm else {}
+
+
+class DoctorIndex:
+    """TF-IDF vectors over a fixed set of doctors."""
+
+    def __init__(self, doctors):
+        self.doctors = doctors
+        term_counts = [Counter(_doctor_terms(doc)) for doc in doctors]
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+        total = len(doctors)
+        self.idf = {
+            term: math.log((1 + total) / (1 + df)) + 1
+            for term, df in document_frequency.items()
+        }
+        self.vectors = [
+            _normalized({term: (1 + math.log(n)) * self.idf[term] for term, n in counts.items()})
+            for counts in term_counts
+        ]
+
+    def search(self, query, k=5):
+        """Get up to k doctors ranked by similarity to `query`, then by rating.
+
+        With no matching terms, General Practice doctors come first.
+        """
+        counts = Counter(term for term in tokenize(query or '') if term in self.idf)
+        query_vector = _normalized({term: (1 + math.log(n)) * self.idf[term] for term, n in counts.items()})
+
+        scored = []
+        for doc, vector in zip(self.doctors, self.vectors):
+            score = sum(weight * vector.get(term, 0) for term, weight in query_vector.items())
+            scored.append((score, doc.get('specialty') == FALLBACK_SPECIALTY, doc.get('rating', 0) or 0, doc))
+        scored.sort(key=lambda item: item[:3], reverse=True)
+        return [doc for _, _, _, doc in scored[:k]]
+
+    def by_specialty(self, specialty, k=5):
+        """Get up to k doctors of a specialty, highest rated first."""
+        doctors = [doc for doc in self.doctors if doc.get('specialty') == specialty]
+        doctors.sort(key=lambda doc: doc.get('rating', 0) or 0, reverse=True)
+        return doctors[:k]
+
+
+class DoctorIndexCache:
+    """Per-process DoctorIndex over verified doctors.
+
+    Rebuilt when the shared DOCTOR_DIRECTORY_CACHE version changes (bumped by
+    every doctor write, including verification and rating updates) or after
+    a TTL, so a chat turn costs one primary-key read instead of a doctors scan.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._version = None
+        self._built_at = 0
+        self._index = None
+
+    def get(self):
+        version = CacheVersion.get(DOCTOR_DIRECTORY_CACHE)
+        expired = time_module.monotonic() - self._built_at > self.ttl_seconds
+        if version == self._version and not expired:
+            return self._index
+
+        index = DoctorIndex(Doctor.find_all(verified_only=True))
+        with self._lock:
+            self._index = index
+            self._version = version
+            self._built_at = time_module.monotonic()
+        return index
+
+
+def get_doctor_index():
+    """Get the doctor retrieval index for the current app."""
+    cache = current_app.extensions.get('doctor_index')
+    if cache is None:
+        cache = DoctorIndexCache(current_app.config.get('CHATBOT_DOCTOR_INDEX_TTL_SECONDS', 300))
+        current_app.extensions['doctor_index'] = cache
+    return cache.get()
+
+
+def find_relevant_doctors(query, k=None):
+    """Get the verified doctors most relevant to a patient's message."""
+    k = k or current_app.config.get('CHATBOT_DOCTOR_TOP_K', 5)
+    return get_doctor_index().search(query, k)
+
+
+def doctors_for_specialty(specialty, k=None):
+    """Get the highest rated verified doctors of a specialty."""
+    k = k or current_app.config.get('CHATBOT_DOCTOR_TOP_K', 5)
+    return get_doctor_index().by_specialty(specialty, k)
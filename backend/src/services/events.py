@@ -0,0 +1,251 @@
+"""Publish/subscribe broker for pushing real-time events to connected clients."""
+import json
+import queue
+import threading
+import time as time_module
+from collections import deque
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import current_app
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+EVENTS_COLLECTION = 'events'
+
+# Events waiting for a slow subscriber before new ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Recent events kept per channel so a reconnecting client can catch up
+CHANNEL_HISTORY_SIZE = 100
+
+
+def user_channel(user_id):
+    """Channel that receives every event addressed to a user."""
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """One connected client's view of a set of channels."""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._replay = deque()
+        self._replayed_ids = set()
+
+    def replay(self, events):
+        """Queue missed events to be returned before live ones."""
+        for event in events:
+            self._replay.append(event)
+            self._replayed_ids.add(event.get('id'))
+
+    def get(self, timeout=None):
+        """Wait for the next event; returns None on timeout."""
+        if self._replay:
+            return self._replay.popleft()
+        deadline = time_module.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = max(0, deadline - time_module.monotonic()) if deadline is not None else None
+            try:
+                event = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            # Skip live copies of events that were already replayed
+            if self._replayed_ids and event.get('id') in self._replayed_ids:
+                continue
+            return event
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Broker that delivers events to subscribers in the same process.
+
+    Enough for a single worker; multi-worker deployments need a backend
+    that relays events between processes (see MongoEventBroker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._history = {}
+        self._last_id = 0
+
+    def subscribe(self, channels, last_event_id=None):
+        """Subscribe to channels, replaying retained events after last_event_id."""
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            if last_event_id:
+                subscription.replay(self._missed_events(subscription.channels, last_event_id))
+        return subscription
+
+    def _missed_events(self, channels, last_event_id):
+        try:
+            after = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        missed = [
+            event for channel in channels
+            for event in self._history.get(channel, ())
+            if int(event['id']) > after
+        ]
+        return sorted(missed, key=lambda event: int(event['id']))
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, channel, event):
+        with self._lock:
+            # Nanosecond clock ids stay increasing across worker restarts
+            self._last_id = max(self._last_id + 1, time_module.time_ns())
+            event = {**event, 'id': str(self._last_id)}
+            history = self._history.get(channel)
+            if history is None:
+                history = self._history[channel] = deque(maxlen=CHANNEL_HISTORY_SIZE)
+            history.append(event)
+        self._deliver(channel, event)
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop the event rather than block the publisher
+                pass
+
+
+class MongoEventBroker(InProcessBroker):
+    """Broker that relays events between worker processes through a capped collection.
+
+    Publishing inserts into the collection; each process runs one relay
+    thread that tails it and hands events to its local subscribers.
+    """
+
+    def __init__(self, app, size_bytes=16 * 1024 * 1024):
+        super().__init__()
+        self.app = app
+        self.size_bytes = size_bytes
+        self._relay = None
+        self._relay_lock = threading.Lock()
+        self._events = None
+        self._events_lock = threading.Lock()
+
+    def _collection(self):
+        """Get the capped events collection, creating it on first use only."""
+        if self._events is not None:
+            return self._events
+        with self._events_lock:
+            if self._events is None:
+                db = self.app.extensions['mongo'].get_database()
+                if EVENTS_COLLECTION not in db.list_collection_names():
+                    try:
+                        db.create_collection(EVENTS_COLLECTION, capped=True, size=self.size_bytes)
+                    except CollectionInvalid:
+                        pass  # created by another worker
+                self._events = db[EVENTS_COLLECTION]
+        return self._events
+
+    def publish(self, channel, event):
+        self._collection().insert_one({
+            'channel': channel,
+            'event': event,
+            'created_at': datetime.utcnow()
+        })
+
+    def subscribe(self, channels, last_event_id=None):
+        """Subscribe to channels, replaying events after last_event_id from the capped collection."""
+        self._ensure_relay()
+        subscription = super().subscribe(channels)
+        if last_event_id:
+            subscription.replay(self._missed_events(subscription.channels, last_event_id))
+        return subscription
+
+    def _missed_events(self, channels, last_event_id):
+        try:
+            after = ObjectId(last_event_id)
+        except (InvalidId, TypeError):
+            return []
+        docs = self._collection().find(
+            {'_id': {'$gt': after}, 'channel': {'$in': channels}},
+            sort=[('$natural', 1)]
+        )
+        return [self._with_id(doc) for doc in docs]
+
+    @staticmethod
+    def _with_id(doc):
+        return {**doc['event'], 'id': str(doc['_id'])}
+
+    def _ensure_relay(self):
+        # Threads do not survive fork, so a worker starts its own relay on first use
+        with self._relay_lock:
+            if self._relay is None or not self._relay.is_alive():
+                self._relay = threading.Thread(target=self._run_relay, name='event-relay', daemon=True)
+                self._relay.start()
+
+    def _run_relay(self):
+        collection = self._collection()
+        last = collection.find_one(sort=[('$natural', -1)])
+        last_id = last['_id'] if last else None
+
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            try:
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        last_id = doc['_id']
+                        self._deliver(doc['channel'], self._with_id(doc))
+            except PyMongoError as e:
+                self.app.logger.warning(f"Event relay error: {e}")
+            time_module.sleep(1)
+
+
+def create_broker(app):
+    """Build the broker selected by EVENT_BROKER ('memory' or 'mongo')."""
+    backend = app.config.get('EVENT_BROKER', 'memory')
+    if backend == 'mongo':
+        return MongoEventBroker(app)
+    if backend == 'memory':
+        return InProcessBroker()
+    raise ValueError(f"Unknown EVENT_BROKER: {backend}")
+
+
+def init_events(app):
+    app.extensions['event_broker'] = create_broker(app)
+
+
+def get_broker():
+    return current_app.extensions['event_broker']
+
+
+def publish(channel, event_type, data):
+    """Publish an event; failures are logged and never break the caller's write."""
+    try:
+        get_broker().publish(channel, {'type': event_type, 'data': data})
+    except Exception as e:
+        current_app.logger.warning(f"Failed to publish {event_type} event: {e}")
+
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events frame."""
+    id_line = f"id: {event['id']}\n" if event.get('id') else ""
+    return f"event: {event['type']}\n{id_line}data: {json.dumps(event['data'], default=str)}\n\n"
@@ -0,0 +1,141 @@
+"""Appointment lifecycle: state transitions and the domain event bus.
+
+Routes change an appointment's status through `apply()`. Each transition is
+one find_one_and_update, and the resulting AppointmentEvent goes to the bus
+as soon as the transition succeeds, so its outbox rows are written even if
+the route fails afterwards. A failing subscriber is logged and never undoes
+or fails the transition.
+"""
+import threading
+from collections import Counter
+from flask import current_app, has_app_context
+from ..models.appointment import Appointment, AppointmentStatus
+from ..models.outbox import Outbox
+
+# Lifecycle actions and the status each one moves an appointment to
+ACTIONS = {
+    'confirm': AppointmentStatus.CONFIRMED,
+    'cancel': AppointmentStatus.CANCELLED,
+    'revoke': AppointmentStatus.REJECTED,
+    'reject': AppointmentStatus.REJECTED,
+    'start_call': AppointmentStatus.IN_PROGRESS,
+    'complete': AppointmentStatus.COMPLETED,
+    'reschedule': AppointmentStatus.PENDING,
+}
+
+
+class AppointmentEvent:
+    """Something that happened to an appointment.
+
+    `action` is 'request' for a new booking or one of ACTIONS. `previous` is
+    the document before the change (None for a booking), `appointment` the
+    document after it, and `data` holds action-specific details.
+    """
+
+    __slots__ = ('action', 'appointment', 'previous', 'actor', 'data')
+
+    def __init__(self, action, appointment, previous=None, actor=None, data=None):
+        self.action = action
+        self.appointment = appointment
+        self.previous = previous
+        self.actor = actor
+        self.data = data or {}
+
+
+class EventBus:
+    """In-process bus; subscribers receive lists of events."""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, fn):
+        self._subscribers.append(fn)
+        return fn
+
+    def emit(self, event):
+        self.dispatch([event])
+
+    def dispatch(self, events):
+        for subscriber in self._subscribers:
+            try:
+                subscriber(events)
+            except Exception as e:
+                if has_app_context():
+                    current_app.logger.error(f"Lifecycle subscriber {subscriber.__name__} failed: {e}")
+
+
+bus = EventBus()
+
+
+def apply(appointment_id, action, actor=None, updates=None, match=None, **data):
+    """Run a lifecycle action. Returns the updated appointment, or None if the
+    appointment does not exist, does not match `match`, or is not in a status
+    the action can start from. Raises SlotTakenError for a taken slot.
+    """
+    result = Appointment.transition(appointment_id, ACTIONS[action], updates, match)
+    if result is None:
+        return None
+    previous, appointment = result
+    bus.emit(AppointmentEvent(action, appointment, previous, actor, data))
+    return appointment
+
+
+def booked(appointment, actor=None):
+    """Announce a newly created appointment."""
+    bus.emit(AppointmentEvent('request', appointment, actor=actor))
+
+
+# Subscribers
+
+# Lifecycle metrics for this process: {action: count}
+transition_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+@bus.subscribe
+def count_transitions(events):
+    with _counts_lock:
+        transition_counts.update(event.action for event in events)
+
+
+def _outbox_entry(event):
+    appt = event.appointment
+    base = {
+        'appointment_id': appt['_id'],
+        'patient_id': appt['patient_id'],
+        'doctor_id': appt.get('doctor_id'),
+        'doctor_name': appt.get('doctor_name', 'Doctor'),
+        'date': appt.get('date', ''),
+        'time': appt.get('time', '')
+    }
+    if event.action == 'request':
+        return 'appointment.requested', base
+    if event.action in ('confirm', 'cancel'):
+        return 'appointment.status_changed', dict(base, status=appt['status'])
+    if event.action == 'revoke':
+        return 'appointment.revoked', base
+    if event.action == 'complete':
+        return 'appointment.completed', dict(base, doctor_name=event.data.get('doctor_name', base['doctor_name']))
+    if event.action == 'reject':
+        return 'appointment.rejected', dict(
+            base,
+            doctor_name=event.data.get('doctor_name', base['doctor_name']),
+            doctor_user_id=event.data.get('doctor_user_id'),
+            reason=appt.get('rejection_reason', '')
+        )
+    if event.action == 'reschedule':
+        return 'appointment.rescheduled', dict(
+            base,
+            old_date=event.previous.get('date', ''),
+            old_time=event.previous.get('time', '')
+        )
+    return None
+
+
+@bus.subscribe
+def record_side_effects(events):
+    """Hand notifications and activities to the outbox worker in one insert."""
+    entries = [entry for entry in map(_outbox_entry, events) if entry]
+    if entries:
+        Outbox.record_many(entries)
+
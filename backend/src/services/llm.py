@@ -0,0 +1,263 @@
+"""LLM providers and the per-process pool of reusable clients.
+
+Each ChatGoogleGenerativeAI owns an HTTP client, so building one per call
+pays for client construction and a fresh TLS handshake every time. The pool
+keeps one client per (provider, model, temperature) for the life of the
+worker and lets its keep-alive connections be reused across requests.
+
+Callers ask for a purpose ('chat', 'report' or 'summary'). The provider and
+model for each purpose come from Config (LLM_<PURPOSE>_PROVIDER and
+LLM_<PURPOSE>_MODEL, defaulting to LLM_PROVIDER and LLM_MODEL), so models
+can be swapped per route without code changes. invoke() and stream() run
+each call inside its provider's LLMGuard (see llm_guard), so a slow or
+failing upstream cannot tie up every worker thread. Client timeouts are
+sized so all attempts of a non-streaming call, retries included, fit in
+LLM_CALL_DEADLINE_SECONDS, which bounds how long a call holds its slot.
+"""
+import os
+import threading
+import time as time_module
+import httpx
+from flask import current_app
+from langchain_google_genai import ChatGoogleGenerativeAI
+from .local_llm import LocalChatModel
+from .llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable, LLMDeadlineExceeded
+from . import llm_usage
+from .llm_usage import CallRecord
+
+DEFAULT_PROVIDER = 'gemini'
+DEFAULT_MODEL = 'gemini-2.5-flash'
+
+# Temperature for each purpose
+PURPOSES = {
+    'chat': 0.7,
+    'report': 0.3,
+    'summary': 0.3,
+}
+
+PROVIDERS = {}
+
+
+def provider(name):
+    """Register a client factory: fn(pool, model, temperature) -> chat model."""
+    def register(fn):
+        PROVIDERS[name] = fn
+        return fn
+    return register
+
+
+@provider('gemini')
+def create_gemini(pool, model, temperature):
+    if not pool.api_key:
+        raise ValueError("GOOGLE_API_KEY is not configured. Please set it in environment variables.")
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=pool.api_key,
+        temperature=temperature,
+        timeout=pool.attempt_timeout_seconds(),
+        max_retries=pool.max_retries,
+        client_args={'limits': httpx.Limits(
+            max_connections=pool.max_connections,
+            max_keepalive_connections=pool.max_keepalive_connections
+        )},
+        convert_system_message_to_human=True
+    )
+
+
+@provider('local')
+def create_local(pool, model, temperature):
+    return LocalChatModel(
+        model=model,
+        latency_ms=pool.local_latency_ms,
+        token_delay_ms=pool.local_token_delay_ms
+    )
+
+
+class LLMClientPool:
+    """Thread-safe registry of chat model clients keyed by (provider, model, temperature)."""
+
+    def __init__(self, api_key, timeout_seconds=30, max_retries=2,
+                 max_connections=10, max_keepalive_connections=5,
+                 local_latency_ms=0, local_token_delay_ms=0, guard_settings=None,
+                 stream_deadline_seconds=60, call_deadline_seconds=30):
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.call_deadline_seconds = call_deadline_seconds
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.local_latency_ms = local_latency_ms
+        self.local_token_delay_ms = local_token_delay_ms
+        self.guard_settings = guard_settings or {}
+        self.stream_deadline_seconds = stream_deadline_seconds
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._guards = {}
+        self._pid = os.getpid()
+
+    def get(self, provider_name, model, temperature):
+        """Get the shared client for a provider, model and temperature, creating it once."""
+        key = (provider_name, model, temperature)
+        client = self._clients.get(key)
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            # Connections do not survive fork, so a forked worker starts empty
+            if self._pid != os.getpid():
+                self._clients = {}
+                self._pid = os.getpid()
+            client = self._clients.get(key)
+            if client is None:
+                if provider_name not in PROVIDERS:
+                    raise ValueError(f"Unknown LLM provider: {provider_name}")
+                client = PROVIDERS[provider_name](self, model, temperature)
+                self._clients[key] = client
+            return client
+
+    def attempt_timeout_seconds(self):
+        """Per-attempt timeout that keeps every attempt of a call within call_deadline_seconds."""
+        return min(self.timeout_seconds, self.call_deadline_seconds / (self.max_retries + 1))
+
+    def guard(self, provider_name):
+        """Get the concurrency and circuit breaker guard shared by a provider's calls."""
+        guard = self._guards.get(provider_name)
+        if guard is None:
+            with self._lock:
+                guard = self._guards.get(provider_name)
+                if guard is None:
+                    settings = dict(self.guard_settings)
+                    breaker = CircuitBreaker(**settings.pop('breaker', {}))
+                    guard = LLMGuard(provider_name, breaker=breaker, **settings)
+                    self._guards[provider_name] = guard
+        return guard
+
+    def guard_stats(self):
+        return [guard.stats() for guard in list(self._guards.values())]
+
+    def warm_up(self, keys):
+        """Build clients ahead of the first request; skips ones that cannot be built yet."""
+        for key in keys:
+            try:
+                self.get(*key)
+            except ValueError:
+                pass
+
+
+def create_pool(app):
+    config = app.config
+    return LLMClientPool(
+        api_key=config.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_API_KEY'),
+        timeout_seconds=config.get('LLM_TIMEOUT_SECONDS', 30),
+        max_retries=config.get('LLM_MAX_RETRIES', 2),
+        max_connections=config.get('LLM_MAX_CONNECTIONS', 10),
+        max_keepalive_connections=config.get('LLM_MAX_KEEPALIVE_CONNECTIONS', 5),
+        local_latency_ms=config.get('LLM_LOCAL_LATENCY_MS', 0),
+        local_token_delay_ms=config.get('LLM_LOCAL_TOKEN_DELAY_MS', 0),
+        guard_settings={
+            'max_concurrent': config.get('LLM_MAX_CONCURRENT_CALLS', 4),
+            'queue_timeout_seconds': config.get('LLM_QUEUE_TIMEOUT_SECONDS', 2),
+            'slow_call_seconds': config.get('LLM_SLOW_CALL_SECONDS', 20),
+            'breaker': {
+                'window': config.get('LLM_BREAKER_WINDOW', 20),
+                'min_calls': config.get('LLM_BREAKER_MIN_CALLS', 5),
+                'failure_ratio': config.get('LLM_BREAKER_FAILURE_RATIO', 0.5),
+                'cooldown_seconds': config.get('LLM_BREAKER_COOLDOWN_SECONDS', 30),
+            },
+        },
+        stream_deadline_seconds=config.get('LLM_STREAM_DEADLINE_SECONDS', 60),
+        call_deadline_seconds=config.get('LLM_CALL_DEADLINE_SECONDS', 30)
+    )
+
+
+def resolve(config, purpose):
+    """Get the (provider, model, temperature) configured for a purpose."""
+    prefix = f"LLM_{purpose.upper()}_"
+    return (
+        config.get(prefix + 'PROVIDER') or config.get('LLM_PROVIDER', DEFAULT_PROVIDER),
+        config.get(prefix + 'MODEL') or config.get('LLM_MODEL', DEFAULT_MODEL),
+        PURPOSES[purpose]
+    )
+
+
+def init_llm(app):
+    pool = create_pool(app)
+    app.extensions['llm_pool'] = pool
+    if app.config.get('LLM_WARM_UP', True):
+        pool.warm_up({resolve(app.config, purpose) for purpose in PURPOSES})
+
+
+def get_llm_pool():
+    return current_app.extensions['llm_pool']
+
+
+def get_chat_model(purpose='chat'):
+    """Get the pooled chat model client configured for a purpose."""
+    return get_llm_pool().get(*resolve(current_app.config, purpose))
+
+
+def invoke(purpose, messages, user_id=None):
+    """Call the model configured for a purpose, within its provider's guard.
+
+    Raises LLMUnavailable when the call is refused. The call is recorded for
+    usage accounting against the current route and `user_id`.
+    """
+    pool = get_llm_pool()
+    provider_name, model, temperature = resolve(current_app.config, purpose)
+    client = pool.get(provider_name, model, temperature)
+    record = CallRecord(purpose, provider_name, model, messages, user_id)
+    try:
+        with pool.guard(provider_name).slot():
+            response = client.invoke(messages)
+    except LLMUnavailable:
+        record.finish(llm_usage.REFUSED)
+        raise
+    except Exception:
+        record.finish(llm_usage.ERROR)
+        raise
+    record.add_output(response)
+    record.finish(llm_usage.OK)
+    return response
+
+
+def stream(purpose, messages, user_id=None):
+    """Stream a reply from the model configured for a purpose.
+
+    The returned generator takes a call slot when iteration starts and holds
+    it until the stream ends or is closed. A reply still streaming after
+    LLM_STREAM_DEADLINE_SECONDS is cut off with LLMDeadlineExceeded.
+    """
+    pool = get_llm_pool()
+    provider_name, model, temperature = resolve(current_app.config, purpose)
+    client = pool.get(provider_name, model, temperature)
+    guard = pool.guard(provider_name)
+
+    def generate():
+        record = CallRecord(purpose, provider_name, model, messages, user_id)
+        outcome = llm_usage.ERROR
+        try:
+            with guard.slot(stream=True) as timer:
+                started = time_module.monotonic()
+                upstream = client.stream(messages)
+                try:
+                    for chunk in upstream:
+                        timer.first_chunk()
+                        record.add_output(chunk)
+                        yield chunk
+                        if time_module.monotonic() - started > pool.stream_deadline_seconds:
+                            raise LLMDeadlineExceeded("The AI assistant took too long to reply. Please try again.")
+                finally:
+                    upstream.close()
+            outcome = llm_usage.OK
+        except GeneratorExit:
+            outcome = llm_usage.CANCELLED
+            raise
+        except LLMDeadlineExceeded:
+            outcome = llm_usage.TIMEOUT
+            raise
+        except LLMUnavailable:
+            outcome = llm_usage.REFUSED
+            raise
+        finally:
+            record.finish(outcome)
+
+    return generate()
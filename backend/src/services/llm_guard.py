@@ -0,0 +1,198 @@
+"""Bulkheads and circuit breakers that keep LLM brownouts away from the rest of the API.
+
+Every LLM call takes a slot from its provider's bounded semaphore, so a slow
+upstream can hold at most LLM_MAX_CONCURRENT_CALLS request threads per
+worker; callers that cannot get a slot within LLM_QUEUE_TIMEOUT_SECONDS are
+refused. A circuit breaker watches the latest calls and, once too many have
+failed or run past LLM_SLOW_CALL_SECONDS (for streams: waited that long for
+the first chunk), refuses calls outright for
+LLM_BREAKER_COOLDOWN_SECONDS before letting a single probe through.
+Refusals raise LLMUnavailable, which callers turn into a 503 or a fallback.
+"""
+import threading
+import time as time_module
+from collections import deque
+from contextlib import contextmanager
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LLMUnavailable(Exception):
+    """Raised when an LLM call is refused or runs past its deadline."""
+
+
+class LLMDeadlineExceeded(LLMUnavailable):
+    """Raised when a streamed reply runs past its deadline."""
+
+
+class CircuitBreaker:
+    """Trips when the share of failed or slow calls in a rolling window gets too high."""
+
+    def __init__(self, window=20, min_calls=5, failure_ratio=0.5, cooldown_seconds=30):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.opened_at = 0
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == OPEN:
+                if time_module.monotonic() - self.opened_at < self.cooldown_seconds:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def cancel(self):
+        """Give back a call allowed by allow() that never reached the upstream."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, failed):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_ratio * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time_module.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+
+
+class SlotTimer:
+    """Timing of one call holding a slot; streams mark when their first chunk arrives."""
+
+    def __init__(self, stream=False):
+        self.stream = stream
+        self.started = time_module.monotonic()
+        self.first_chunk_at = None
+
+    def first_chunk(self):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time_module.monotonic()
+
+    def latency(self):
+        """Seconds the upstream took: to the first chunk for streams, else the whole call."""
+        end = self.first_chunk_at if self.stream and self.first_chunk_at is not None else time_module.monotonic()
+        return end - self.started
+
+
+class LLMGuard:
+    """Concurrency cap, queue timeout and circuit breaker for one provider."""
+
+    def __init__(self, name, max_concurrent=4, queue_timeout_seconds=2,
+                 slow_call_seconds=20, breaker=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.short_circuited = 0
+
+    def _count(self, attribute, delta=1):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + delta)
+            if attribute == 'waiting':
+                self.max_waiting = max(self.max_waiting, self.waiting)
+
+    @contextmanager
+    def slot(self, stream=False):
+        """Hold a call slot for the duration of one LLM call; yields a SlotTimer.
+
+        Raises LLMUnavailable when the breaker is open or no slot frees up
+        in time. Exceptions raised inside the block and calls slower than
+        slow_call_seconds count as failures for the breaker. A stream
+        (`stream=True`) is judged on its time to first chunk, so long replies
+        and slow readers are not held against the upstream. A stream the
+        caller closes early, or one cut off by its deadline after chunks
+        arrived, is never a failure.
+        """
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise LLMUnavailable(f"The {self.name} AI service is temporarily unavailable. Please try again shortly.")
+
+        self._count('waiting')
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout_seconds)
+        finally:
+            self._count('waiting', -1)
+        if not acquired:
+            self._count('rejected')
+            self.breaker.cancel()
+            raise LLMUnavailable("The AI assistant is busy. Please try again shortly.")
+
+        self._count('in_flight')
+        timer = SlotTimer(stream)
+        failed = True
+        cancelled = False
+        try:
+            yield timer
+            failed = False
+        except GeneratorExit:
+            # The caller stopped reading a stream early; not an upstream failure
+            failed = False
+            cancelled = True
+            raise
+        except LLMDeadlineExceeded:
+            # A stream that was producing chunks was only cut off for length
+            failed = timer.first_chunk_at is None
+            raise
+        finally:
+            slow = not cancelled and timer.latency() > self.slow_call_seconds
+            self._count('in_flight', -1)
+            self._count('calls')
+            if failed:
+                self._count('failures')
+            if slow:
+                self._count('slow_calls')
+            self._slots.release()
+            self.breaker.record(failed or slow)
+
+    def stats(self):
+        return {
+            'provider': self.name,
+            'state': self.breaker.state,
+            'trips': self.breaker.trips,
+            'maxConcurrent': self.max_concurrent,
+            'inFlight': self.in_flight,
+            'queueDepth': self.waiting,
+            'maxQueueDepth': self.max_waiting,
+            'calls': self.calls,
+            'failures': self.failures,
+            'slowCalls': self.slow_calls,
+            'rejected': self.rejected,
+            'shortCircuited': self.short_circuited,
+        }
@@ -0,0 +1,97 @@
+"""Per-call LLM accounting: prompt and completion size, latency and outcome.
+
+llm.invoke() and llm.stream() open a CallRecord for every call and finish it
+once the reply is complete, refused or abandoned. Records are attributed to
+the Flask endpoint that made the call ('background' for the outbox worker)
+and to the user it was made for, and stored in the rolling llm_calls
+collection for the admin usage report.
+"""
+import time as time_module
+from flask import current_app, has_request_context, request
+from ..models.llm_call import LLMCall
+
+# Rough characters per token, used when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+OK = 'ok'
+ERROR = 'error'
+REFUSED = 'refused'
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        block.get('text', '') if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+
+def estimate_tokens(chars):
+    return chars // CHARS_PER_TOKEN + 1 if chars else 0
+
+
+def _usage(message):
+    """Provider-reported (input, output) tokens of a message or chunk, if any."""
+    usage = getattr(message, 'usage_metadata', None)
+    if not isinstance(usage, dict):
+        return None
+    return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+
+
+class CallRecord:
+    """Measurements of one LLM call, stored by finish()."""
+
+    def __init__(self, purpose, provider, model, messages, user_id=None):
+        self.started = time_module.monotonic()
+        self.first_token_at = None
+        self.purpose = purpose
+        self.provider = provider
+        self.model = model
+        self.user_id = user_id
+        self.route = request.endpoint if has_request_context() else 'background'
+        self.prompt_chars = sum(len(_text(message.content)) for message in messages)
+        self.completion_chars = 0
+        self.reported = None
+
+    def add_output(self, message):
+        """Account for a reply, or one streamed chunk of it."""
+        if self.first_token_at is None:
+            self.first_token_at = time_module.monotonic()
+        self.completion_chars += len(_text(message.content))
+        usage = _usage(message)
+        if usage:
+            # Streams report usage on one chunk or cumulatively; keep the largest
+            self.reported = tuple(max(a, b) for a, b in zip(self.reported or (0, 0), usage))
+
+    def finish(self, outcome):
+        if not current_app.config.get('LLM_USAGE_TRACKING_ENABLED', True):
+            return None
+        ended = time_module.monotonic()
+        prompt_tokens, completion_tokens = self.reported or (
+            estimate_tokens(self.prompt_chars), estimate_tokens(self.completion_chars)
+        )
+        call = {
+            'purpose': self.purpose,
+            'provider': self.provider,
+            'model': self.model,
+            'route': self.route,
+            'user_id': str(self.user_id) if self.user_id is not None else None,
+            'outcome': outcome,
+            'prompt_chars': self.prompt_chars,
+            'completion_chars': self.completion_chars,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokens_reported': self.reported is not None,
+            'latency_ms': round((ended - self.started) * 1000, 1),
+            'first_token_ms': (round((self.first_token_at - self.started) * 1000, 1)
+                               if self.first_token_at is not None else None),
+        }
+        try:
+            return LLMCall.record(call)
+        except Exception as e:
+            # Accounting must never fail the call it measures
+            current_app.logger.warning(f"Failed to record LLM call: {e}")
+            return None
@@ -0,0 +1,67 @@
+"""Offline chat model that returns deterministic templated replies.
+
+Used with LLM_PROVIDER=local to benchmark or demo the chatbot and report
+paths without an API key or network access. Latency is simulated: a fixed
+delay before the first token plus a delay per streamed word.
+"""
+import time as time_module
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Doctors quoted in a chatbot reply
+REPLY_DOCTORS = 3
+
+
+def _last(messages, message_type):
+    for message in reversed(messages):
+        if isinstance(message, message_type):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ''
+
+
+def local_reply(messages):
+    """Deterministic reply for a conversation, shaped like what each caller expects."""
+    system = _last(messages, SystemMessage)
+    question = _last(messages, HumanMessage)
+
+    if 'medical report assistant' in system:
+        diagnosis = next(
+            (line.split(':', 1)[1].strip() for line in question.splitlines() if line.startswith('Diagnosis:')),
+            'the consultation'
+        )
+        return (f"This prescription was issued for {diagnosis}. Please take the listed medications "
+                "as directed and contact your doctor if your symptoms change.")
+
+    if 'running summary' in system:
+        return f"Summary of the conversation so far ({len(question.split())} words of transcript)."
+
+    doctors = [line for line in system.splitlines() if line.startswith('- Dr. ')][:REPLY_DOCTORS]
+    reply = f"Thank you for describing your symptoms: \"{question.strip()}\"."
+    if doctors:
+        reply += " Based on what you shared, these doctors may be able to help:\n" + "\n".join(doctors)
+    return reply + "\nThis is not a diagnosis; please book an appointment to consult a doctor."
+
+
+class LocalChatModel(BaseChatModel):
+    """LangChain chat model backed by local_reply()."""
+
+    model: str = 'local'
+    latency_ms: int = 0
+    token_delay_ms: int = 0
+
+    @property
+    def _llm_type(self):
+        return 'local'
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time_module.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=local_reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time_module.sleep(self.latency_ms / 1000)
+        words = local_reply(messages).split(' ')
+        for i, word in enumerate(words):
+            if i:
+                time_module.sleep(self.token_delay_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
@@ -0,0 +1,333 @@
+"""Outbox worker: applies notifications, activities and denormalized fields
+recorded by requests as outbox events.
+
+Events are delivered at least once. Every handler is idempotent: inserts use
+Outbox.effect_id so a redelivered event cannot create duplicates, and updates
+recompute values instead of incrementing them.
+"""
+import os
+import threading
+import click
+from flask import current_app
+from ..models.outbox import Outbox, new_event
+from ..models.notification import Notification
+from ..models.activity import Activity
+from ..models.doctor import Doctor
+from ..models.patient import Patient
+from ..models.rating import Rating
+from .chat_context import summarize_history
+
+HANDLERS = {}
+
+
+def handles(event_type):
+    """Register a handler for an outbox event type."""
+    def register(fn):
+        HANDLERS[event_type] = fn
+        return fn
+    return register
+
+
+def _patient_name(patient_user_id, default):
+    patient = Patient.find_by_user_id(str(patient_user_id))
+    if not patient:
+        return default
+    return f"{patient.get('firstName', '')} {patient.get('lastName', '')}".strip() or default
+
+
+def _doctor_user_id(doctor_id):
+    doctor = Doctor.find_by_id(doctor_id) if doctor_id else None
+    return doctor.get('user_id') if doctor else None
+
+
+@handles('appointment.requested')
+def appointment_requested(event, p):
+    doctor_user_id = _doctor_user_id(p['doctor_id'])
+    if doctor_user_id:
+        patient_name = _patient_name(p['patient_id'], 'A patient')
+        Notification.create(
+            user_id=doctor_user_id,
+            title='New Appointment Request',
+            message=f"{patient_name} has requested an appointment on {p['date']} at {p['time']}",
+            notification_type='appointment',
+            link='/doctor-dashboard',
+            reference_id=f"appointment:{p['appointment_id']}",
+            notification_id=Outbox.effect_id(event, 'notify-doctor')
+        )
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='appointment',
+        title='Appointment Booked',
+        description=f"Requested appointment with {p['doctor_name']} on {p['date']} at {p['time']}",
+        icon='CalendarIcon',
+        color='bg-primary',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+
+
+@handles('appointment.status_changed')
+def appointment_status_changed(event, p):
+    # Mark the appointment request notification as read for the doctor
+    doctor_user_id = _doctor_user_id(p['doctor_id'])
+    if doctor_user_id:
+        Notification.mark_read_by_reference(doctor_user_id, f"appointment:{p['appointment_id']}")
+
+    when = f"{p['doctor_name']} on {p['date']} at {p['time']}"
+    if p['status'] == 'confirmed':
+        Notification.create(
+            user_id=p['patient_id'],
+            title='Appointment Confirmed',
+            message=f'Your appointment with {when} has been confirmed.',
+            notification_type='success',
+            link='/patient-dashboard',
+            notification_id=Outbox.effect_id(event, 'notify-patient')
+        )
+        Activity.create(
+            user_id=p['patient_id'],
+            activity_type='appointment',
+            title='Appointment Confirmed',
+            description=f'Your appointment with {when} has been confirmed.',
+            icon='CheckCircleIcon',
+            color='bg-success',
+            activity_id=Outbox.effect_id(event, 'activity')
+        )
+    elif p['status'] == 'cancelled':
+        Notification.create(
+            user_id=p['patient_id'],
+            title='Appointment Cancelled',
+            message=f'Your appointment with {when} has been cancelled.',
+            notification_type='warning',
+            link='/patient-dashboard',
+            notification_id=Outbox.effect_id(event, 'notify-patient')
+        )
+        Activity.create(
+            user_id=p['patient_id'],
+            activity_type='appointment',
+            title='Appointment Cancelled',
+            description=f'Your appointment with {when} was cancelled.',
+            icon='XCircleIcon',
+            color='bg-warning',
+            activity_id=Outbox.effect_id(event, 'activity')
+        )
+
+
+@handles('appointment.revoked')
+def appointment_revoked(event, p):
+    doctor_user_id = _doctor_user_id(p['doctor_id'])
+    if doctor_user_id:
+        patient_name = _patient_name(p['patient_id'], 'A patient')
+        Notification.create(
+            user_id=doctor_user_id,
+            title='Appointment Cancelled by Patient',
+            message=f"{patient_name} has cancelled their appointment on {p['date']} at {p['time']}.",
+            notification_type='warning',
+            link='/doctor-dashboard',
+            notification_id=Outbox.effect_id(event, 'notify-doctor')
+        )
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='appointment',
+        title='Appointment Cancelled',
+        description=f"You cancelled your appointment with {p['doctor_name']} on {p['date']} at {p['time']}.",
+        icon='XCircleIcon',
+        color='bg-warning',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+
+
+@handles('appointment.completed')
+def appointment_completed(event, p):
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='report',
+        title='Consultation Completed',
+        description=f"Your consultation with {p['doctor_name']} has been completed. Medical record created.",
+        icon='ClipboardDocumentCheckIcon',
+        color='bg-success',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+
+
+@handles('appointment.rejected')
+def appointment_rejected(event, p):
+    message = (f"Your appointment with {p['doctor_name']} on {p['date']} at {p['time']} "
+               f"was rejected. Reason: {p['reason']}")
+    Notification.create(
+        user_id=p['patient_id'],
+        title='Appointment Rejected',
+        message=message,
+        notification_type='warning',
+        link='/patient-dashboard',
+        notification_id=Outbox.effect_id(event, 'notify-patient')
+    )
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='appointment',
+        title='Appointment Rejected',
+        description=message,
+        icon='XCircleIcon',
+        color='bg-error',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+    # Mark the appointment request notification as read for the doctor
+    if p.get('doctor_user_id'):
+        Notification.mark_read_by_reference(p['doctor_user_id'], f"appointment:{p['appointment_id']}")
+
+
+@handles('appointment.rescheduled')
+def appointment_rescheduled(event, p):
+    doctor_user_id = _doctor_user_id(p['doctor_id'])
+    if doctor_user_id:
+        patient_name = _patient_name(p['patient_id'], 'Patient')
+        Notification.create(
+            user_id=doctor_user_id,
+            title='Appointment Rescheduled',
+            message=(f"{patient_name} has rescheduled their appointment from {p['old_date']} "
+                     f"{p['old_time']} to {p['date']} at {p['time']}"),
+            notification_type='info',
+            link='/doctor-dashboard',
+            reference_id=f"appointment:{p['appointment_id']}",
+            notification_id=Outbox.effect_id(event, 'notify-doctor')
+        )
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='appointment',
+        title='Appointment Rescheduled',
+        description=f"Your appointment with {p['doctor_name']} has been rescheduled to {p['date']} at {p['time']}",
+        icon='CalendarIcon',
+        color='bg-primary',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+
+
+@handles('prescription.created')
+def prescription_created(event, p):
+    Notification.create(
+        user_id=p['patient_id'],
+        title='New Prescription',
+        message=f"Dr. {p['doctor_name']} has created a new prescription for you.",
+        notification_type='prescription',
+        link='/patient-dashboard/prescriptions',
+        notification_id=Outbox.effect_id(event, 'notify-patient')
+    )
+    Activity.create(
+        user_id=p['patient_id'],
+        activity_type='prescription',
+        title='New Prescription',
+        description=f"Dr. {p['doctor_name']} prescribed {p['medication_count']} medication(s).",
+        icon='ClipboardDocumentListIcon',
+        color='bg-accent',
+        activity_id=Outbox.effect_id(event, 'activity')
+    )
+
+
+@handles('rating.created')
+def rating_created(event, p):
+    # Recomputed from the ratings, so replaying the event is harmless
+    rating_stats = Rating.calculate_average(p['doctor_id'])
+    Doctor.update(p['doctor_id'], {
+        'rating': rating_stats['average'],
+        'rating_count': rating_stats['count']
+    })
+
+    doctor_user_id = _doctor_user_id(p['doctor_id'])
+    if doctor_user_id:
+        patient_name = _patient_name(p['patient_id'], 'A patient')
+        Notification.create(
+            user_id=doctor_user_id,
+            title='New Review Received',
+            message=f"{patient_name} has left you a {p['score']}-star review.",
+            notification_type='info',
+            link='/doctor-dashboard',
+            notification_id=Outbox.effect_id(event, 'notify-doctor')
+        )
+
+
+@handles('chat.summarize')
+def chat_summarize(event, p):
+    # No-op when a summary covering these messages already exists
+    summarize_history(p['history_id'], p['user_id'], p['through'])
+
+
+def dispatch(event):
+    handler = HANDLERS.get(event['type'])
+    if handler is None:
+        raise LookupError(f"No handler for outbox event '{event['type']}'")
+    handler(event, event['payload'])
+
+
+def process_outbox(limit=None):
+    """Apply due outbox events. Returns the number of events processed."""
+    config = current_app.config
+    limit = limit or config.get('OUTBOX_BATCH_SIZE', 50)
+    processed = 0
+    while processed < limit:
+        event = Outbox.claim(config.get('OUTBOX_LEASE_SECONDS', 60))
+        if event is None:
+            break
+        try:
+            dispatch(event)
+        except Exception as e:
+            current_app.logger.warning(f"Outbox event {event['_id']} ({event['type']}) failed: {e}")
+            Outbox.fail(event, e, config.get('OUTBOX_MAX_ATTEMPTS', 8))
+        else:
+            Outbox.complete(event['_id'])
+        processed += 1
+    return processed
+
+
+def run_worker(app, stop=None):
+    """Process events until `stop` is set, sleeping between empty polls."""
+    interval = app.config.get('OUTBOX_POLL_INTERVAL_SECONDS', 2)
+    while not (stop and stop.is_set()):
+        with app.app_context():
+            try:
+                processed = process_outbox()
+            except Exception as e:
+                app.logger.error(f"Outbox worker error: {e}")
+                processed = 0
+        if not processed:
+            new_event.wait(interval)
+            new_event.clear()
+
+
+class OutboxWorkerThread:
+    """Runs the outbox worker on a daemon thread inside a web worker process."""
+
+    def __init__(self, app):
+        self.app = app
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # Threads do not survive fork, so each process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=run_worker, args=(self.app,), name='outbox-worker', daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+
+
+@click.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Process due events and exit.')
+def outbox_worker_command(once):
+    """Apply outbox events (notifications, activities, denormalized fields)."""
+    if once:
+        click.echo(f"Processed {process_outbox()} event(s)")
+        return
+    click.echo("Outbox worker running (Ctrl+C to stop)")
+    run_worker(current_app._get_current_object())
+
+
+def init_outbox(app):
+    """Register the worker CLI and, unless disabled, an in-process worker thread."""
+    app.cli.add_command(outbox_worker_command)
+    if app.config.get('OUTBOX_WORKER_THREAD', True):
+        worker = OutboxWorkerThread(app)
+        app.extensions['outbox_worker'] = worker
+        app.before_request(worker.ensure_started)
@@ -1,38 +1,22 @@
 """Report generation service using LangChain and ReportLab."""
-import os
 import io
 from datetime import datetime
-from flask import current_app
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
-
-
-def get_llm():
-    """Create and configure the Gemini chat model."""
-    api_key = current_app.config.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_API_KEY')
-    
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY is not configured.")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=api_key,
-        temperature=0.3,
-        convert_system_message_to_human=True
-    )
+from . import llm
 
 
 def generate_ai_summary(prescription_data: dict, patient_name: str, doctor_name: str) -> str:
-    """Use LangChain to generate an AI-enhanced summary of the prescription."""
+    """Use LangChain to generate an AI-enhanced summary of the prescription.
+    
+    Falls back to a template summary when the model fails or is unavailable.
+    """
     try:
-        llm = get_llm()
-        
         medications_text = "\n".join([
             f"- {med['name']}: {med['dosage']}, {med.get('frequency', 'as directed')}, for {med.get('duration', 'as prescribed')}"
             for med in prescription_data.get('medications', [])
@@ -59,7 +43,7 @@ Generate a brief professional summary for this prescription report.
             HumanMessage(content=user_prompt)
         ]
         
-        response = llm.invoke(messages)
+        response = llm.invoke('report', messages, user_id=prescription_data.get('patientId'))
         return response.content
         
     except Exception as e:
@@ -0,0 +1,68 @@
+"""Earliest open appointment slots across every doctor of a specialty."""
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from ..database import get_db, DOCTORS_COLLECTION
+from ..models.schedule import Schedule, DEFAULT_SLOTS, slot_minutes
+
+
+def _date_range(start_date, end_date):
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+
+def _doctor_slots(doctor, schedule, dates, booked):
+    """Lazily yield (date, minutes, doctor_id, time) for one doctor in time order."""
+    doctor_id = str(doctor['_id'])
+    blocked_dates = Schedule.blocked_date_set(schedule) if schedule else None
+    for date_str in dates:
+        booked_times = booked.get(date_str, ())
+        if schedule:
+            slots = Schedule.open_slots_for_date(schedule, date_str, booked_times, blocked_dates)
+        else:
+            slots = [slot for slot in Schedule._filter_past_slots(list(DEFAULT_SLOTS), date_str)
+                     if slot not in booked_times]
+        for slot in slots:
+            yield date_str, slot_minutes(slot), doctor_id, slot
+
+
+def find_earliest_slots(specialty, start_date, end_date, limit=10):
+    """Get the `limit` earliest open slots across verified doctors of a specialty.
+
+    Uses three queries whatever the number of doctors (doctors, schedules,
+    booked appointments) and a k-way merge of per-doctor slot generators, so
+    only as many slots as requested are ever generated past each doctor's head.
+    """
+    db = get_db()
+    doctors = list(db[DOCTORS_COLLECTION].find(
+        {'verified': True, 'specialty': specialty},
+        {'name': 1, 'specialty': 1, 'location': 1, 'image': 1}
+    ))
+    if not doctors:
+        return []
+
+    doctor_ids = [doc['_id'] for doc in doctors]
+    schedules = Schedule.find_many_by_doctor_ids(doctor_ids)
+    booked = Schedule.find_booked_times_many(doctor_ids, start_date, end_date)
+    dates = _date_range(start_date, end_date)
+
+    generators = [
+        _doctor_slots(doc, schedules.get(doc['_id']), dates, booked.get(doc['_id'], {}))
+        for doc in doctors
+    ]
+    by_id = {str(doc['_id']): doc for doc in doctors}
+
+    results = []
+    for date_str, _, doctor_id, slot in islice(heapq.merge(*generators), limit):
+        doctor = by_id[doctor_id]
+        results.append({
+            'doctorId': doctor_id,
+            'doctorName': doctor.get('name', ''),
+            'specialty': doctor.get('specialty', ''),
+            'location': doctor.get('location', ''),
+            'image': doctor.get('image', ''),
+            'date': date_str,
+            'time': slot
+        })
+    return results
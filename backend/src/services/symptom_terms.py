@@ -0,0 +1,104 @@
+"""Symptom vocabulary for each specialty and the tokenizer shared by offline matchers."""
+import re
+
+# Symptom, organ and condition terms patients use, per specialty in VALID_SPECIALTIES
+SPECIALTY_TERMS = {
+    'General Practice': (
+        'fever cold flu cough sore throat runny nose tired fatigue tiredness weakness '
+        'checkup general unwell body ache chills infection vaccination'
+    ),
+    'Cardiology': (
+        'chest pain heart palpitations palpitation racing heartbeat irregular pulse '
+        'blood pressure hypertension shortness breath breathless angina cholesterol '
+        'fainting swollen ankles'
+    ),
+    'Dermatology': (
+        'skin rash itch itchy itching acne pimple eczema psoriasis mole hives '
+        'hair loss dandruff nail blister spots dry skin sunburn wart'
+    ),
+    'Neurology': (
+        'headache migraine dizziness dizzy vertigo seizure numbness tingling '
+        'tremor memory loss confusion stroke nerve weakness fainting balance'
+    ),
+    'Orthopedics': (
+        'bone joint fracture broken sprain back pain knee shoulder hip neck '
+        'spine ankle wrist muscle injury sports stiffness'
+    ),
+    'Pediatrics': (
+        'child children baby infant toddler kid son daughter newborn growth '
+        'vaccination teething'
+    ),
+    'Psychiatry': (
+        'anxiety anxious depression depressed stress panic insomnia sleep '
+        'mood suicidal sad hopeless mental health addiction'
+    ),
+    'Ophthalmology': (
+        'eye eyes vision blurry blurred sight red eye itchy eyes glasses '
+        'cataract glaucoma watery eyes'
+    ),
+    'Gynecology': (
+        'period periods menstrual pregnancy pregnant vaginal pelvic pain '
+        'menopause ovary uterus contraception fertility breast'
+    ),
+    'Urology': (
+        'urine urination urinary bladder kidney stone prostate burning '
+        'frequent urination blood urine incontinence'
+    ),
+    'Oncology': (
+        'cancer tumor tumour lump mass chemotherapy unexplained weight loss '
+        'biopsy'
+    ),
+    'Endocrinology': (
+        'diabetes blood sugar thyroid hormone weight gain thirst insulin '
+        'metabolism goiter'
+    ),
+    'Gastroenterology': (
+        'stomach abdominal abdomen belly nausea vomiting diarrhea diarrhoea '
+        'constipation bloating heartburn acid reflux indigestion liver gut bowel'
+    ),
+    'Pulmonology': (
+        'breathing breath lung lungs asthma wheezing wheeze persistent cough '
+        'shortness breath bronchitis pneumonia phlegm'
+    ),
+    'Nephrology': (
+        'kidney kidneys renal dialysis swelling protein urine creatinine '
+        'swollen legs'
+    ),
+    'Rheumatology': (
+        'arthritis joint pain swollen joints stiffness lupus gout inflammation '
+        'autoimmune'
+    ),
+    'Emergency Medicine': (
+        'emergency severe bleeding unconscious accident trauma burn choking '
+        'overdose poisoning severe chest pain'
+    ),
+}
+
+STOP_WORDS = frozenset(
+    'a an and are as at be been but by can do does for from had has have having '
+    'he her his i im in is it its ive me my of on or our she so some that the '
+    'their them there they this to very was we were what when which who with '
+    'you your also feel feeling lot since days day weeks week about really'.split()
+)
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def normalize(word):
+    """Crude stemmer so 'headaches'/'headache' and 'rashes'/'rash' match."""
+    if len(word) > 5 and word.endswith('ing'):
+        word = word[:-3]
+    elif len(word) > 4 and word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif len(word) > 4 and word.endswith('ed'):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    if len(word) > 3 and word.endswith('e'):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercase word tokens without stop words, normalized."""
+    return [normalize(word) for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
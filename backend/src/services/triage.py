@@ -0,0 +1,162 @@
+"""Rule-based triage that answers plain symptom statements without the LLM.
+
+Short messages such as "chest pain" or "skin rash" map to one specialty with
+high confidence; those get an immediate reply listing doctors of that
+specialty. Anything ambiguous (several specialties, negations, past or
+family history, questions, long descriptions) is escalated to the LLM. Emergency phrases in all but
+long messages get emergency advice straight away.
+"""
+import re
+from .doctor_retrieval import doctors_for_specialty, FALLBACK_SPECIALTY
+
+EMERGENCY_SPECIALTY = 'Emergency Medicine'
+
+EMERGENCY_PHRASES = [
+    "can't breathe", 'cant breathe', 'cannot breathe', 'not breathing', 'stopped breathing',
+    'severe chest pain', 'crushing chest pain', 'chest pain spreading', 'heart attack',
+    'stroke', 'face drooping', 'slurred speech', 'unconscious', 'passed out', 'unresponsive',
+    'seizure', 'heavy bleeding', "bleeding won't stop", 'bleeding wont stop', 'coughing blood',
+    'vomiting blood', 'overdose', 'poisoning', 'suicidal', 'kill myself', 'want to die',
+    'choking', 'anaphylaxis', 'throat closing',
+]
+
+# High-confidence symptom phrases for each specialty (keys are VALID_SPECIALTIES)
+SYMPTOM_PHRASES = {
+    'General Practice': ['fever', 'cold', 'flu', 'sore throat', 'runny nose', 'general checkup', 'checkup'],
+    'Cardiology': ['chest pain', 'chest tightness', 'palpitation', 'racing heart', 'irregular heartbeat',
+                   'high blood pressure', 'hypertension'],
+    'Dermatology': ['skin rash', 'rash', 'acne', 'eczema', 'psoriasis', 'itchy skin', 'hives', 'hair loss',
+                    'mole', 'dandruff'],
+    'Neurology': ['headache', 'migraine', 'dizziness', 'vertigo', 'numbness', 'tingling', 'tremor'],
+    'Orthopedics': ['back pain', 'knee pain', 'shoulder pain', 'neck pain', 'hip pain', 'broken bone',
+                    'fracture', 'sprain', 'sprained ankle'],
+    'Psychiatry': ['anxiety', 'depression', 'panic attack', 'insomnia', "can't sleep", 'cant sleep'],
+    'Ophthalmology': ['blurry vision', 'blurred vision', 'eye pain', 'red eye', 'itchy eyes', 'watery eyes'],
+    'Gynecology': ['irregular period', 'period pain', 'menstrual cramps', 'missed period', 'pregnancy'],
+    'Urology': ['burning urination', 'painful urination', 'frequent urination', 'blood in urine'],
+    'Oncology': ['lump', 'tumor', 'tumour'],
+    'Endocrinology': ['diabetes', 'high blood sugar', 'thyroid'],
+    'Gastroenterology': ['stomach ache', 'stomach pain', 'abdominal pain', 'diarrhea', 'diarrhoea',
+                         'constipation', 'heartburn', 'acid reflux', 'nausea', 'bloating'],
+    'Pulmonology': ['asthma', 'wheezing', 'persistent cough', 'shortness of breath'],
+    'Nephrology': ['kidney pain', 'kidney disease'],
+    'Rheumatology': ['arthritis', 'joint pain', 'swollen joints', 'gout'],
+}
+
+NEGATIONS = frozenset(['no', 'not', 'without', 'never', "don't", 'dont', "haven't", 'havent', 'denies'])
+
+# Words before a match checked for a negation ("no chest pain")
+NEGATION_WINDOW = 3
+
+# Cues that a message describes past or family history rather than a current
+# symptom ("I had a stroke last year", "heart attack history in family")
+HISTORY_PATTERN = re.compile(
+    r"\b(?:had|history|previous(?:ly)?|in\s+the\s+past|used\s+to|ago|family|"
+    r"last\s+(?:year|month|week|time)|(?:mother|father|mom|dad|brother|sister|grand\w*)'?s)\b",
+    re.IGNORECASE
+)
+
+
+def _compile(phrases):
+    # Longest phrases first so "severe chest pain" wins over "chest pain"; allow plurals
+    alternatives = sorted(set(phrases), key=len, reverse=True)
+    pattern = '|'.join(re.escape(phrase).replace(r'\ ', r'\s+') + r'(?:e?s)?' for phrase in alternatives)
+    return re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)
+
+
+EMERGENCY_PATTERN = _compile(EMERGENCY_PHRASES)
+SYMPTOM_PATTERN = _compile([phrase for phrases in SYMPTOM_PHRASES.values() for phrase in phrases])
+PHRASE_SPECIALTY = {
+    phrase: specialty for specialty, phrases in SYMPTOM_PHRASES.items() for phrase in phrases
+}
+
+
+class TriageResult:
+    """Outcome of a triage that can be answered without the LLM."""
+
+    __slots__ = ('specialty', 'symptom', 'emergency')
+
+    def __init__(self, specialty, symptom, emergency=False):
+        self.specialty = specialty
+        self.symptom = symptom
+        self.emergency = emergency
+
+
+def _negated(text, start):
+    preceding = re.findall(r"[a-z']+", text[:start].lower())[-NEGATION_WINDOW:]
+    return any(word in NEGATIONS for word in preceding)
+
+
+def _phrase_key(match):
+    phrase = ' '.join(match.group(0).lower().split())
+    if phrase in PHRASE_SPECIALTY:
+        return phrase
+    for suffix in ('es', 's'):
+        if phrase.endswith(suffix) and phrase[:-len(suffix)] in PHRASE_SPECIALTY:
+            return phrase[:-len(suffix)]
+    return None
+
+
+def triage(message, max_words=12):
+    """Classify a message; returns a TriageResult, or None to escalate to the LLM."""
+    if HISTORY_PATTERN.search(message):
+        return None
+    words = len(message.split())
+    for match in EMERGENCY_PATTERN.finditer(message):
+        if not _negated(message, match.start()) and words <= 2 * max_words:
+            return TriageResult(EMERGENCY_SPECIALTY, match.group(0).lower(), emergency=True)
+
+    if words > max_words or '?' in message:
+        return None
+
+    specialties = set()
+    symptom = None
+    for match in SYMPTOM_PATTERN.finditer(message):
+        phrase = _phrase_key(match)
+        if phrase is None or _negated(message, match.start()):
+            return None
+        specialties.add(PHRASE_SPECIALTY[phrase])
+        symptom = symptom or phrase
+    if len(specialties) != 1:
+        return None
+    return TriageResult(specialties.pop(), symptom)
+
+
+def _doctor_lines(doctors):
+    return "\n".join(
+        f"- Dr. {doc['name']}: {doc['specialty']} specialist, located at {doc.get('location', '')}, "
+        f"rating: {doc.get('rating', 0)}/5"
+        for doc in doctors
+    )
+
+
+def triage_reply(message, k=3, max_words=12):
+    """Answer a message from triage rules, or return None to escalate to the LLM."""
+    result = triage(message, max_words)
+    if result is None:
+        return None
+
+    if result.emergency:
+        doctors = doctors_for_specialty(EMERGENCY_SPECIALTY, k)
+        reply = ("This may be a medical emergency. Please call your local emergency number or go to the "
+                 "nearest hospital right away. Do not wait for an online appointment.")
+        if doctors:
+            reply += f"\n\nEmergency medicine doctors on our platform:\n{_doctor_lines(doctors)}"
+        return reply
+
+    specialty = result.specialty
+    doctors = doctors_for_specialty(specialty, k)
+    if not doctors and specialty != FALLBACK_SPECIALTY:
+        specialty = FALLBACK_SPECIALTY
+        doctors = doctors_for_specialty(specialty, k)
+    if not doctors:
+        return None
+
+    if specialty == result.specialty:
+        intro = f"For {result.symptom}, a {specialty} specialist is the right doctor to see."
+    else:
+        intro = (f"For {result.symptom}, a {result.specialty} specialist would be ideal, but none is "
+                 f"available right now. A {specialty} doctor can assess you and refer you.")
+    return (f"{intro} Here are doctors you can book:\n{_doctor_lines(doctors)}\n\n"
+            "If your symptoms are severe or getting worse, please seek care immediately. "
+            "This is not a diagnosis; please consult a doctor.")
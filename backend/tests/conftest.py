@@ -9,6 +9,12 @@ class TestConfig(Config):
     MONGO_URI = 'mongodb://localhost:27017/test_db'
     JWT_SECRET_KEY = 'test-secret-key'
     MONGO_DB_NAME = 'test_db'
+    # Tests drive the outbox explicitly with process_outbox()
+    OUTBOX_WORKER_THREAD = False
+    # Tests patch the LLM client class, so clients must not be pooled before that
+    LLM_WARM_UP = False
+    # Tests never reach Gemini; a dummy key keeps them independent of the environment
+    GOOGLE_API_KEY = 'test-google-api-key'
 
 @pytest.fixture
 def app():
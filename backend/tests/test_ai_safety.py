@@ -12,7 +12,7 @@ def test_system_prompt_contains_disclaimer(mock_find_all, app):
         assert "Disclaimer: You are an AI assistant" in prompt or "consult a doctor" in prompt
         assert "Do not provide definitive medical diagnoses" in prompt or "medical advice" in prompt or "book an appointment" in prompt
 
-@patch('src.services.chatbot_service.ChatGoogleGenerativeAI')
+@patch('src.services.llm.ChatGoogleGenerativeAI')
 @patch('src.services.chatbot_service.ChatHistory')
 def test_process_message_with_disclaimer_response(MockChatHistory, MockChatModel, app):
     """Test that the chatbot service correctly returns a response containing a disclaimer."""
@@ -24,10 +24,12 @@ def test_process_message_with_disclaimer_response(MockChatHistory, MockChatModel
     
     # Mock ChatHistory to avoid DB calls
     MockChatHistory.get_messages.return_value = []
+    MockChatHistory.find_by_user_id.return_value = None
     MockChatHistory.add_message.return_value = None
     
     # Mock Doctor.find_all if get_system_prompt is called inside process_message
-    with patch('src.services.chatbot_service.Doctor.find_all') as mock_find_all:
+    with patch('src.services.chatbot_service.Doctor.find_all') as mock_find_all, \
+            patch('src.services.chat_context.ChatHistory', MockChatHistory):
         mock_find_all.return_value = []
         with app.app_context():
             response = process_message('user1', 'Hello')
@@ -1,5 +1,6 @@
 import pytest
 from datetime import datetime
+from bson import ObjectId
 from src.models.user import User
 from src.models.appointment import Appointment
 from src.models.schedule import Schedule
@@ -57,3 +58,248 @@ def test_schedule_slots(app):
     assert "10:30 AM" in slots
     assert "11:00 AM" not in slots
     assert len(slots) == 4
+
+def test_ensure_indexes_is_idempotent(app):
+    """Test that declared indexes are created once and then reported as existing."""
+    from src.indexes import ensure_indexes
+    from src.database import get_db, USERS_COLLECTION
+
+    report = ensure_indexes()
+    assert 'email_1' in report[USERS_COLLECTION]['created']
+    assert get_db()[USERS_COLLECTION].index_information()['email_1']['unique'] is True
+
+    report = ensure_indexes()
+    assert report[USERS_COLLECTION]['created'] == []
+    assert 'email_1' in report[USERS_COLLECTION]['existing']
+
+def test_ensure_indexes_dry_run_reports_extra(app):
+    """Test that a dry run creates nothing and reports undeclared indexes."""
+    from src.indexes import ensure_indexes
+    from src.database import get_db, USERS_COLLECTION
+
+    get_db()[USERS_COLLECTION].create_index('legacy_field')
+    report = ensure_indexes(dry_run=True)
+    assert 'email_1' in report[USERS_COLLECTION]['created']
+    assert 'legacy_field_1' in report[USERS_COLLECTION]['extra']
+    assert 'email_1' not in get_db()[USERS_COLLECTION].index_information()
+
+def test_batch_loader_resolves_and_memoizes(app):
+    """Test that batched patient lookups use one query per request and are memoized."""
+    from src.models.patient import Patient
+    from src.database import get_db, PATIENTS_COLLECTION
+
+    p1 = Patient.create("507f1f77bcf86cd799439021", "a@test.com", "Ann", "A")
+    p2 = Patient.create("507f1f77bcf86cd799439022", "b@test.com", "Bob", "B")
+    missing_id = "507f1f77bcf86cd799439023"
+
+    found = Patient.find_many_by_user_ids([p1['user_id'], str(p2['user_id']), p1['user_id'], missing_id])
+    assert found[p1['user_id']]['firstName'] == "Ann"
+    assert found[p2['user_id']]['firstName'] == "Bob"
+    assert found[ObjectId(missing_id)] is None
+
+    # Memoized: a second lookup in the same request does not hit the collection
+    get_db()[PATIENTS_COLLECTION].delete_many({})
+    again = Patient.find_many_by_user_ids([p1['user_id']])
+    assert again[p1['user_id']]['firstName'] == "Ann"
+
+def test_keyset_pagination_walks_all_pages(app):
+    """Test that cursor pages cover every appointment once, including created_at ties."""
+    from src.database import get_db, APPOINTMENTS_COLLECTION
+    patient_id = ObjectId("507f1f77bcf86cd799439011")
+    same_time = datetime(2025, 1, 1, 9, 0)
+    docs = [{'patient_id': patient_id, 'created_at': same_time if i < 3 else datetime(2025, 1, 1, 10, i)}
+            for i in range(7)]
+    get_db()[APPOINTMENTS_COLLECTION].insert_many(docs)
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = Appointment.find_page_by_patient_id(patient_id, after=cursor, limit=3)
+        seen.extend(doc['_id'] for doc in page)
+        if cursor is None:
+            break
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+    with pytest.raises(ValueError):
+        Appointment.find_page_by_patient_id(patient_id, after='not-a-cursor', limit=3)
+
+def test_chat_history_pages_from_newest(app):
+    """Test that chat history pages go from newest to oldest without overlap."""
+    from src.models.chat_history import ChatHistory
+    user_id = "507f1f77bcf86cd799439011"
+    for i in range(5):
+        ChatHistory.add_message(user_id, 'user', f"m{i}")
+
+    page, cursor = ChatHistory.get_messages_page(user_id, limit=3)
+    assert [m['content'] for m in page] == ['m2', 'm3', 'm4']
+    page, cursor = ChatHistory.get_messages_page(user_id, after=cursor, limit=3)
+    assert [m['content'] for m in page] == ['m0', 'm1']
+    assert cursor is None
+
+def test_chat_history_buckets_and_legacy_migration(app, db):
+    """Test chat messages are split into bounded buckets and legacy arrays are migrated."""
+    from src.models.chat_history import ChatHistory, BUCKET_SIZE
+    user_id = "507f1f77bcf86cd799439013"
+    for i in range(BUCKET_SIZE + 5):
+        ChatHistory.add_message(user_id, 'user', f"m{i}")
+
+    assert db.chat_message_buckets.count_documents({}) == 2
+    assert len(ChatHistory.get_messages(user_id)) == BUCKET_SIZE + 5
+    page, cursor = ChatHistory.get_messages_page(user_id, limit=10)
+    assert [m['content'] for m in page] == [f"m{i}" for i in range(45, 55)]
+    assert 'position' not in page[0]
+
+    legacy_user = ObjectId()
+    db.chat_history.insert_one({'user_id': legacy_user, 'messages': [
+        {'role': 'user', 'content': 'old question', 'timestamp': ''},
+        {'role': 'assistant', 'content': 'old answer', 'timestamp': ''}
+    ]})
+    ChatHistory.add_message(legacy_user, 'user', 'new question')
+    assert [m['content'] for m in ChatHistory.get_messages(legacy_user)] == [
+        'old question', 'old answer', 'new question'
+    ]
+    assert 'messages' not in db.chat_history.find_one({'user_id': legacy_user})
+
+
+def test_chat_history_adds_turn_in_one_push(app, db):
+    """Test a user/assistant pair is stored with one bucket write, split only at a bucket boundary."""
+    from src.models.chat_history import ChatHistory, BUCKET_SIZE
+    user_id = "507f1f77bcf86cd799439014"
+    ChatHistory.add_messages(user_id, [('user', f"m{i}") for i in range(BUCKET_SIZE - 1)])
+    assert db.chat_message_buckets.count_documents({}) == 1
+
+    ChatHistory.add_messages(user_id, [('user', 'question'), ('assistant', 'answer')])
+    buckets = list(db.chat_message_buckets.find({}).sort('seq', 1))
+    assert [len(bucket['messages']) for bucket in buckets] == [BUCKET_SIZE, 1]
+    assert [m['content'] for m in ChatHistory.get_messages(user_id)[-2:]] == ['question', 'answer']
+    assert ChatHistory.find_by_user_id(user_id)['message_count'] == BUCKET_SIZE + 1
+
+def test_schedule_slots_range(app):
+    """Test multi-day slot generation with blocked dates and booked slots."""
+    doctor_id = "507f1f77bcf86cd799439012"
+    Schedule.create_or_update(doctor_id, {
+        "monday": {"start": "09:00", "end": "10:00", "enabled": True},
+        "tuesday": {"start": "09:00", "end": "10:00", "enabled": True}
+    }, blocked_dates=["2025-01-07"])
+    Appointment.create("507f1f77bcf86cd799439011", doctor_id, "Dr. Smith", "2025-01-13", "9:00 AM")
+    cancelled = Appointment.create("507f1f77bcf86cd799439011", doctor_id, "Dr. Smith", "2025-01-06", "9:30 AM")
+    Appointment.update_status(str(cancelled['_id']), 'cancelled')
+
+    slots = Schedule.get_available_slots_range(doctor_id, "2025-01-06", "2025-01-13")
+    assert len(slots) == 8
+    assert slots["2025-01-06"] == ["9:00 AM", "9:30 AM"]
+    assert slots["2025-01-07"] == []  # blocked
+    assert slots["2025-01-08"] == []  # not enabled
+    assert slots["2025-01-13"] == ["9:30 AM"]
+    assert Schedule.get_available_slots(doctor_id, "2025-01-13") == ["9:30 AM"]
+
+
+def test_message_read_pointer(app):
+    """Test unread counts follow the per-participant read pointer."""
+    from src.models.message import Message
+    appointment_id = "507f1f77bcf86cd799439041"
+    first = Message.create(appointment_id, "507f1f77bcf86cd799439011", "patient", "Hello")
+    second = Message.create(appointment_id, "507f1f77bcf86cd799439011", "patient", "Are you there?")
+    Message.create(appointment_id, "507f1f77bcf86cd799439012", "doctor", "Yes")
+
+    assert Message.get_unread_count(appointment_id, "doctor") == 2
+    assert Message.get_unread_count(appointment_id, "patient") == 1
+
+    Message.mark_as_read(appointment_id, "doctor", Message.find_by_id(second['_id']))
+    assert Message.get_unread_count(appointment_id, "doctor") == 0
+
+    # The pointer never moves backwards
+    markers = Message.get_read_markers(appointment_id)
+    Message.mark_as_read(appointment_id, "doctor", Message.find_by_id(first['_id']))
+    assert Message.get_read_markers(appointment_id) == markers
+    Message.create(appointment_id, "507f1f77bcf86cd799439011", "patient", "Hello?")
+    assert Message.get_unread_count(appointment_id, "doctor") == 1
+
+    messages = Message.find_by_appointment(appointment_id)
+    markers = Message.mark_delivered_as_read(appointment_id, "doctor", messages, markers)
+    assert Message.get_unread_count(appointment_id, "doctor") == 0
+    assert Message.to_dict(Message.find_by_id(second['_id']), markers)['read'] is True
+
+
+def test_message_legacy_read_flag_without_pointer(app, db):
+    """Test legacy per-message read flags are honoured when a thread has no pointer."""
+    from src.models.message import Message, MESSAGES_COLLECTION
+    appointment_id = "507f1f77bcf86cd799439043"
+    legacy = Message.create(appointment_id, "507f1f77bcf86cd799439011", "patient", "Old")
+    Message.create(appointment_id, "507f1f77bcf86cd799439011", "patient", "New")
+    db[MESSAGES_COLLECTION].update_one({'_id': legacy['_id']}, {'$set': {'read': True}})
+
+    markers = Message.get_read_markers(appointment_id)
+    read_flags = [Message.to_dict(m, markers)['read'] for m in Message.find_by_appointment(appointment_id)]
+    assert read_flags == [True, False]
+    assert Message.get_unread_counts([appointment_id], "doctor")[appointment_id] == read_flags.count(False)
+
+
+def test_message_unread_counts_bulk(app):
+    """Test unread counts for many appointments come from one aggregation."""
+    from src.models.message import Message
+    busy, quiet, read = ObjectId(), ObjectId(), ObjectId()
+    for _ in range(3):
+        Message.create(busy, "507f1f77bcf86cd799439011", "patient", "Hi")
+    Message.create(busy, "507f1f77bcf86cd799439012", "doctor", "Hello")
+    Message.create(read, "507f1f77bcf86cd799439011", "patient", "Hi")
+    Message.mark_as_read(read, "doctor")
+
+    counts = Message.get_unread_counts([busy, str(quiet), read], "doctor")
+    assert counts == {str(busy): 3, str(quiet): 0, str(read): 0}
+    assert counts[str(busy)] == Message.get_unread_count(busy, "doctor")
+    assert Message.get_unread_counts([], "doctor") == {}
+
+
+def test_notification_unread_counter(app, db):
+    """Test the materialized unread counter tracks every write path and can be repaired."""
+    from src.models.notification import Notification
+    user_id = ObjectId()
+
+    # A user with notifications from before counters existed is seeded on first use
+    db.notifications.insert_one({'user_id': user_id, 'title': 'Old', 'message': '', 'type': 'info',
+                                 'read': False, 'created_at': datetime.utcnow()})
+    first = Notification.create(user_id, "A", "a", reference_id="appointment:1")
+    Notification.create(user_id, "B", "b", reference_id="appointment:1")
+    third = Notification.create(user_id, "C", "c")
+    assert Notification.get_unread_count(user_id) == 4
+
+    Notification.mark_as_read(first['_id'])
+    Notification.mark_as_read(first['_id'])  # already read: no double decrement
+    assert Notification.get_unread_count(user_id) == 3
+
+    Notification.delete_by_reference(user_id, "appointment:1")
+    assert Notification.get_unread_count(user_id) == 2
+
+    Notification.delete(third['_id'])
+    assert Notification.get_unread_count(user_id) == 1
+
+    Notification.mark_all_as_read(user_id)
+    assert Notification.get_unread_count(user_id) == 0
+
+    # Drift is reconciled by the repair job
+    db.notification_counters.update_one({'_id': user_id}, {'$set': {'unread': 7}})
+    assert Notification.repair_unread_counters() == 1
+    assert Notification.get_unread_count(user_id) == 0
+
+def test_ensure_indexes_detects_partial_filter_conflict(app):
+    """Test that an index with the same keys but a different partial filter is a conflict."""
+    from src.indexes import ensure_indexes, ensure_required_indexes
+    from src.database import get_db, APPOINTMENTS_COLLECTION
+
+    # Required indexes are built when the app starts
+    assert 'unique_active_slot' in get_db()[APPOINTMENTS_COLLECTION].index_information()
+    get_db()[APPOINTMENTS_COLLECTION].drop_index('unique_active_slot')
+    get_db()[APPOINTMENTS_COLLECTION].create_index(
+        [('doctor_id', 1), ('date', 1), ('time', 1)],
+        name='unique_active_slot',
+        unique=True,
+        partialFilterExpression={'status': 'pending'}
+    )
+    report = ensure_indexes(dry_run=True)
+    conflicts = [c['name'] for c in report[APPOINTMENTS_COLLECTION]['conflicts']]
+    assert 'unique_active_slot' in conflicts
+    assert 'unique_active_slot' not in report[APPOINTMENTS_COLLECTION]['existing']
+    with pytest.raises(RuntimeError, match="does not match"):
+        ensure_required_indexes()
@@ -15,3 +15,34 @@ def test_endpoint_latency(client):
     # This is a unit test on a mock app, so it measures overhead of Flask + Mock DB, not real DB.
     # But still useful validation of code path speed.
     assert latency < 500 # 500ms limit for unit test execution of login path
+
+
+def test_mongo_client_is_reused_across_requests(client, app):
+    """Test that requests share one pooled client instead of connecting per request."""
+    from src.database import get_mongo
+    manager = get_mongo()
+
+    client.post('/api/auth/login', json={'email': 'a@test.com', 'password': 'wrong'})
+    first_client = manager.client
+    client.post('/api/auth/login', json={'email': 'b@test.com', 'password': 'wrong'})
+    assert manager.client is first_client
+    assert manager.pool_stats()['connected'] is True
+
+
+def test_mongo_client_recreated_after_fork(app):
+    """Test that a forked worker does not reuse the parent's client."""
+    from src.database import get_mongo
+    manager = get_mongo()
+    parent_client = manager.client
+
+    with patch('src.database.os.getpid', return_value=manager._pid + 1):
+        assert manager.client is not parent_client
+
+
+def test_pool_listener_counts_clears_after_reset():
+    """Test that resetting the pool listener keeps its event callbacks intact."""
+    from src.database import PoolStatsListener
+    listener = PoolStatsListener()
+    listener.reset()
+    listener.pool_cleared(None)
+    assert listener.to_dict()['poolCleared'] == 1
@@ -93,3 +93,189 @@ def test_appointment_booking_flow(client, app):
     data = json.loads(response.data)
     assert data['status'] == 'pending'
     assert data['doctorName'] == "Test Doctor"
+
+def test_appointments_cursor_pagination(client):
+    """Test that ?limit returns a page envelope and ?after continues it."""
+    client.post('/api/auth/register', json={
+        "email": "pager@test.com", "password": "password123", "role": "patient",
+        "firstName": "Page", "lastName": "R"
+    })
+    res = client.post('/api/auth/login', json={"email": "pager@test.com", "password": "password123"})
+    headers = {'Authorization': f"Bearer {res.get_json()['access_token']}"}
+
+    for hour in range(9, 12):
+        client.post('/api/appointments', headers=headers, json={
+            "doctorId": "507f1f77bcf86cd799439012", "doctorName": "Dr. X",
+            "date": "2025-12-31", "time": f"{hour}:00 AM"
+        })
+
+    # Unpaginated clients keep receiving a plain list
+    assert len(client.get('/api/appointments', headers=headers).get_json()) == 3
+
+    first = client.get('/api/appointments?limit=2', headers=headers).get_json()
+    assert len(first['items']) == 2
+    assert first['nextCursor']
+
+    second = client.get(f"/api/appointments?limit=2&after={first['nextCursor']}", headers=headers).get_json()
+    assert len(second['items']) == 1
+    assert second['nextCursor'] is None
+
+    res = client.get('/api/appointments?limit=2&after=garbage', headers=headers)
+    assert res.status_code == 400
+
+def test_double_booking_returns_alternatives(client):
+    """Test that a taken slot is rejected with 409 and the next free slots."""
+    from src.indexes import ensure_indexes
+    ensure_indexes()
+
+    client.post('/api/auth/register', json={
+        "email": "booker@test.com", "password": "password123", "role": "patient",
+        "firstName": "Book", "lastName": "Er"
+    })
+    res = client.post('/api/auth/login', json={"email": "booker@test.com", "password": "password123"})
+    headers = {'Authorization': f"Bearer {res.get_json()['access_token']}"}
+
+    booking = {"doctorId": "507f1f77bcf86cd799439012", "doctorName": "Dr. X",
+               "date": "2030-01-07", "time": "9:00 AM"}
+    first = client.post('/api/appointments', headers=headers, json=booking)
+    assert first.status_code == 201
+
+    res = client.post('/api/appointments', headers=headers, json=booking)
+    assert res.status_code == 409
+    assert res.get_json()['alternatives'][0] == {"date": "2030-01-07", "time": "9:30 AM"}
+
+    # Rescheduling into a taken slot is rejected the same way
+    other = client.post('/api/appointments', headers=headers, json=dict(booking, time="10:00 AM")).get_json()
+    res = client.patch(f"/api/appointments/{other['id']}/reschedule", headers=headers,
+                       json={"date": "2030-01-07", "time": "9:00 AM"})
+    assert res.status_code == 409
+
+    # Cancelling frees the slot
+    client.patch(f"/api/appointments/{first.get_json()['id']}/status", headers=headers, json={"status": "cancelled"})
+    res = client.patch(f"/api/appointments/{other['id']}/reschedule", headers=headers,
+                       json={"date": "2030-01-07", "time": "9:00 AM"})
+    assert res.status_code == 200
+
+def test_earliest_slots_never_returns_past_dates(client):
+    """Test a past `from` is clamped to today and a range entirely in the past has no slots."""
+    from datetime import datetime
+    from src.models.doctor import Doctor
+
+    Doctor.create("507f1f77bcf86cd799439025", "Dr. Now", "Cardiology", "Pune", [], 4.0, "", verified=True)
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    body = client.get('/api/schedules/earliest?specialty=Cardiology&from=2020-01-01&limit=50').get_json()
+    assert body['from'] == today
+    assert body['slots'] and all(slot['date'] >= today for slot in body['slots'])
+
+    body = client.get('/api/schedules/earliest?specialty=Cardiology&from=2020-01-01&to=2020-01-07').get_json()
+    assert body['slots'] == []
+
+def test_event_stream_delivers_notifications(client):
+    """Test the SSE stream accepts a query-string token and pushes notifications."""
+    from src.models.notification import Notification
+
+    client.post('/api/auth/register', json={
+        "email": "stream@test.com", "password": "password123", "role": "patient",
+        "firstName": "Stre", "lastName": "Am"
+    })
+    res = client.post('/api/auth/login', json={"email": "stream@test.com", "password": "password123"})
+    body = res.get_json()
+    token = body['access_token']
+    user_id = body['id']
+
+    assert client.get('/api/events/stream').status_code == 401
+
+    response = client.get(f'/api/events/stream?jwt={token}', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 2000\n: connected\n\n"
+
+    Notification.create(user_id, "Reminder", "See you tomorrow")
+    frame = next(chunks).decode()
+    assert frame.startswith("event: notification\n")
+    assert '"title": "Reminder"' in frame
+    response.close()
+
+    # A reconnect with Last-Event-ID replays what was missed, and the stream ends at its max lifetime
+    last_event_id = frame.split("id: ")[1].split("\n")[0]
+    Notification.create(user_id, "Missed", "While offline")
+    client.application.config['EVENT_STREAM_MAX_SECONDS'] = 0.2
+    response = client.get(f'/api/events/stream?jwt={token}', headers={'Last-Event-ID': last_event_id})
+    body = response.get_data(as_text=True)
+    assert '"title": "Missed"' in body
+    assert '"title": "Reminder"' not in body
+
+
+def test_chatbot_stream_saves_reply_and_cancels_on_disconnect(client):
+    """Test streamed chatbot replies are forwarded as SSE and saved only when complete."""
+    from unittest.mock import patch, MagicMock
+    from src.models.chat_history import ChatHistory
+
+    client.post('/api/auth/register', json={
+        "email": "chatstream@test.com", "password": "password123", "role": "patient",
+        "firstName": "Chat", "lastName": "Stream"
+    })
+    res = client.post('/api/auth/login', json={"email": "chatstream@test.com", "password": "password123"})
+    body = res.get_json()
+    headers = {'Authorization': f"Bearer {body['access_token']}"}
+    closed = []
+
+    def fake_stream(messages):
+        try:
+            for text in ["See a ", "neurologist."]:
+                yield MagicMock(content=text)
+        finally:
+            closed.append(True)
+
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        MockLLM.return_value.stream.side_effect = fake_stream
+
+        response = client.post('/api/chatbot/message/stream', json={"message": "Migraines"}, headers=headers)
+        frames = response.get_data(as_text=True).split("\n\n")
+        assert frames[0] == 'event: token\ndata: {"text": "See a "}'
+        assert frames[2].startswith("event: done\n")
+        assert '"response": "See a neurologist."' in frames[2]
+        assert [m['content'] for m in ChatHistory.get_messages(body['id'])] == ["Migraines", "See a neurologist."]
+
+        # A client that goes away mid-reply cancels the model call and saves nothing
+        response = client.post('/api/chatbot/message/stream', json={"message": "Again"},
+                               headers=headers, buffered=False)
+        chunks = iter(response.response)
+        assert b"See a " in next(chunks)
+        response.close()
+        assert closed == [True, True]
+        assert len(ChatHistory.get_messages(body['id'])) == 2
+
+
+def test_llm_usage_is_recorded_per_route_and_user(client, app):
+    """Test each LLM call is accounted for and reported to admins."""
+    from flask_jwt_extended import create_access_token
+
+    app.config['LLM_PROVIDER'] = 'local'
+    app.config['CHATBOT_TRIAGE_ENABLED'] = False
+    client.post('/api/auth/register', json={
+        "email": "usage@test.com", "password": "password123", "role": "patient",
+        "firstName": "Use", "lastName": "Age"
+    })
+    body = client.post('/api/auth/login', json={"email": "usage@test.com", "password": "password123"}).get_json()
+    headers = {'Authorization': f"Bearer {body['access_token']}"}
+
+    assert client.post('/api/chatbot/message', json={"message": "I feel odd lately"}, headers=headers).status_code == 200
+    response = client.post('/api/chatbot/message/stream', json={"message": "And tired after meals"}, headers=headers)
+    assert "event: done" in response.get_data(as_text=True)
+
+    admin = create_access_token(identity=json.dumps({'id': '507f1f77bcf86cd7994390d1', 'role': 'admin'}))
+    res = client.get('/api/admin/llm/usage?hours=1', headers={'Authorization': f'Bearer {admin}'})
+    assert res.status_code == 200
+    usage = res.get_json()
+    routes = {row['key']: row for row in usage['byRoute']}
+    assert routes['chatbot.send_message']['calls'] == 1
+    assert routes['chatbot.stream_reply']['calls'] == 1
+    assert routes['chatbot.stream_reply']['avgFirstTokenMs'] is not None
+    assert usage['topUsers'][0]['key'] == body['id']
+    assert usage['topUsers'][0]['calls'] == 2 and usage['topUsers'][0]['failed'] == 0
+    assert usage['topUsers'][0]['promptTokens'] > usage['topUsers'][0]['completionTokens'] > 0
+
+    assert client.get('/api/admin/llm/usage', headers=headers).status_code == 403
+    assert client.get('/api/admin/llm/usage?hours=x', headers={'Authorization': f'Bearer {admin}'}).status_code == 400
@@ -1,4 +1,6 @@
 import pytest
+import time
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 from src.services.chatbot_service import process_message
 from src.models.chat_history import ChatHistory
@@ -14,7 +16,7 @@ def test_process_message(app):
     mock_llm_response.content = ai_response_text
     
     # Patch the ChatGoogleGenerativeAI creation to return a mock
-    with patch('src.services.chatbot_service.ChatGoogleGenerativeAI') as MockLLM:
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
         mock_instance = MockLLM.return_value
         mock_instance.invoke.return_value = mock_llm_response
         
@@ -34,3 +36,441 @@ def test_process_message(app):
         assert history[0]['content'] == user_message
         assert history[1]['role'] == 'assistant'
         assert history[1]['content'] == ai_response_text
+
+
+def test_doctor_directory_availability_and_invalidation(app):
+    """Test that the directory uses compiled schedules and refreshes after schedule writes."""
+    from datetime import datetime
+    from src.models.doctor import Doctor
+    from src.models.schedule import Schedule
+    from src.services.doctor_directory import get_doctor_directory
+
+    doctor = Doctor.create("507f1f77bcf86cd799439012", "Dr. Who", "Cardiology", "Mumbai", [], 4.5, "")
+    directory = get_doctor_directory()
+    monday_10am = datetime(2025, 1, 6, 10, 0)
+
+    entry = directory.get_doctors(now=monday_10am)[0]
+    assert entry['isAvailable'] is True
+    assert entry['availabilityStatus'] == "Available"
+    assert entry['availability'][0] == "Mon 9:00 AM - 5:00 PM"
+
+    Schedule.create_or_update(doctor['_id'], {
+        "monday": {"start": "11:00", "end": "13:00", "enabled": True}
+    }, blocked_dates=["2025-01-13"])
+
+    entry = directory.get_doctors(now=monday_10am)[0]
+    assert entry['isAvailable'] is False
+    assert entry['availabilityStatus'] == "Available from 11:00 AM"
+    assert entry['availability'] == ["Mon 11:00 AM - 1:00 PM"]
+
+    blocked_monday = datetime(2025, 1, 13, 12, 0)
+    assert directory.get_doctors(now=blocked_monday)[0]['availabilityStatus'] == "Not available today"
+
+
+def test_find_earliest_slots_across_specialty(app):
+    """Test the earliest-slot search merges doctors in time order and skips booked slots."""
+    from src.models.doctor import Doctor
+    from src.models.schedule import Schedule
+    from src.models.appointment import Appointment
+    from src.services.slot_search import find_earliest_slots
+
+    early = Doctor.create("507f1f77bcf86cd799439021", "Dr. Early", "Cardiology", "Pune", [], 4.0, "", verified=True)
+    late = Doctor.create("507f1f77bcf86cd799439022", "Dr. Late", "Cardiology", "Pune", [], 4.0, "", verified=True)
+    Doctor.create("507f1f77bcf86cd799439023", "Dr. Pending", "Cardiology", "Pune", [], 4.0, "")
+    Doctor.create("507f1f77bcf86cd799439024", "Dr. Skin", "Dermatology", "Pune", [], 4.0, "", verified=True)
+
+    # 2030-01-07 is a Monday
+    Schedule.create_or_update(str(early['_id']), {"monday": {"start": "08:00", "end": "09:00", "enabled": True}})
+    Schedule.create_or_update(str(late['_id']), {"monday": {"start": "08:30", "end": "10:00", "enabled": True}})
+    Appointment.create("507f1f77bcf86cd799439011", str(early['_id']), "Dr. Early", "2030-01-07", "8:00 AM")
+
+    slots = find_earliest_slots("Cardiology", "2030-01-07", "2030-01-13", limit=3)
+    assert [(s['doctorName'], s['date'], s['time']) for s in slots] == [
+        ("Dr. Early", "2030-01-07", "8:30 AM"),
+        ("Dr. Late", "2030-01-07", "8:30 AM"),
+        ("Dr. Late", "2030-01-07", "9:00 AM"),
+    ]
+    assert find_earliest_slots("Neurology", "2030-01-07", "2030-01-13") == []
+
+
+def test_notification_and_message_events_are_pushed(app):
+    """Test that model writes publish to the subscribed users' channels."""
+    from src.services.events import get_broker, user_channel
+    from src.models.notification import Notification
+    from src.models.message import Message
+    from src.models.appointment import Appointment
+    from src.models.doctor import Doctor
+
+    doctor = Doctor.create("507f1f77bcf86cd799439031", "Dr. Push", "Cardiology", "Pune", [], 4.0, "")
+    appointment = Appointment.create("507f1f77bcf86cd799439032", str(doctor['_id']), "Dr. Push", "2030-01-07", "9:00 AM")
+
+    doctor_sub = get_broker().subscribe([user_channel("507f1f77bcf86cd799439031")])
+    patient_sub = get_broker().subscribe([user_channel("507f1f77bcf86cd799439032")])
+
+    Notification.create("507f1f77bcf86cd799439031", "Hi", "Hello doctor")
+    event = doctor_sub.get(timeout=1)
+    assert event['type'] == 'notification'
+    assert event['data']['title'] == "Hi"
+    assert patient_sub.get(timeout=0.01) is None
+
+    Message.create(str(appointment['_id']), "507f1f77bcf86cd799439032", "patient", "Ping")
+    assert doctor_sub.get(timeout=1)['data']['content'] == "Ping"
+    assert patient_sub.get(timeout=1)['type'] == 'message'
+
+    doctor_sub.close()
+    patient_sub.close()
+    assert get_broker().subscriber_count() == 0
+
+
+def test_outbox_applies_side_effects_once(app, db):
+    """Test outbox events fan out into notifications/activities, survive redelivery and retry."""
+    from src.models.outbox import Outbox
+    from src.models.doctor import Doctor
+    from src.models.notification import Notification
+    from src.services.outbox import process_outbox
+
+    doctor = Doctor.create("507f1f77bcf86cd799439051", "Dr. Out", "Cardiology", "Pune", [], 4.0, "")
+    event = Outbox.record('appointment.requested', {
+        'appointment_id': "507f1f77bcf86cd799439053",
+        'patient_id': "507f1f77bcf86cd799439052",
+        'doctor_id': doctor['_id'],
+        'doctor_name': "Dr. Out", 'date': "2030-01-07", 'time': "9:00 AM"
+    })
+    assert Notification.get_unread_count("507f1f77bcf86cd799439051") == 0
+
+    assert process_outbox() == 1
+    assert Notification.get_unread_count("507f1f77bcf86cd799439051") == 1
+    assert db.activities.count_documents({}) == 1
+
+    # A redelivered event (e.g. worker died before completing) creates no duplicates
+    db.outbox.update_one({'_id': event['_id']}, {'$set': {'status': 'pending'}})
+    assert process_outbox() == 1
+    assert db.notifications.count_documents({}) == 1
+    assert db.activities.count_documents({}) == 1
+    assert Notification.get_unread_count("507f1f77bcf86cd799439051") == 1
+
+    # Failing events are retried later, then parked as dead
+    broken = Outbox.record('no.such.event', {})
+    assert process_outbox() == 1
+    assert db.outbox.find_one({'_id': broken['_id']})['status'] == 'pending'
+    db.outbox.update_one({'_id': broken['_id']}, {'$set': {'available_at': datetime.min, 'attempts': 8}})
+    process_outbox()
+    assert db.outbox.find_one({'_id': broken['_id']})['status'] == 'dead'
+
+
+def test_appointment_lifecycle_transitions_and_events(app, db):
+    """Test lifecycle actions validate transitions and record side effects as they happen."""
+    from src.models.appointment import Appointment
+    from src.services import lifecycle
+
+    appointment = Appointment.create(
+        "507f1f77bcf86cd799439061", "507f1f77bcf86cd799439062", "Dr. Flow",
+        "2030-02-04", "10:00 AM", "Checkup"
+    )
+    appt_id = str(appointment['_id'])
+    completed_before = lifecycle.transition_counts['complete']
+
+    # Side effects are recorded right after the transition, even if the request later fails
+    with app.test_request_context():
+        assert lifecycle.apply(appt_id, 'confirm')['status'] == 'confirmed'
+        assert db.outbox.count_documents({'type': 'appointment.status_changed'}) == 1
+        assert lifecycle.apply(appt_id, 'start_call')['status'] == 'in_progress'
+
+    # A failing subscriber is logged and does not fail the transition
+    other = Appointment.create("507f1f77bcf86cd799439061", "507f1f77bcf86cd799439062", "Dr. Flow",
+                               "2030-02-04", "11:00 AM")
+    with patch('src.services.lifecycle.Outbox.record_many', side_effect=RuntimeError("db down")):
+        assert lifecycle.apply(str(other['_id']), 'cancel')['status'] == 'cancelled'
+    assert db.outbox.count_documents({}) == 1
+
+    done = lifecycle.apply(appt_id, 'complete', doctor_name="Dr. Flow")
+    assert done['status'] == 'completed'
+    assert db.outbox.count_documents({'type': 'appointment.completed'}) == 1
+    assert lifecycle.transition_counts['complete'] == completed_before + 1
+
+    # Completed is terminal, and a failed transition emits nothing
+    assert lifecycle.apply(appt_id, 'cancel') is None
+    assert lifecycle.apply(appt_id, 'reschedule', updates={'date': "2030-02-05"}) is None
+    assert Appointment.find_by_id(appt_id)['date'] == "2030-02-04"
+    assert db.outbox.count_documents({}) == 2
+
+
+def test_doctor_index_cached_until_doctors_change(app):
+    """Test the chatbot prompt lists verified doctors and the index is rebuilt only on doctor writes."""
+    from src.models.doctor import Doctor
+    from src.services.chatbot_service import get_system_prompt
+
+    doctor = Doctor.create("507f1f77bcf86cd799439071", "Prompt Doc", "Neurology", "Goa", [], 4.5, "")
+    assert "Prompt Doc" not in get_system_prompt()
+
+    Doctor.verify(str(doctor['_id']))
+    assert "Dr. Prompt Doc: Neurology specialist" in get_system_prompt()
+
+    with patch('src.services.doctor_retrieval.DoctorIndex') as build:
+        get_system_prompt("migraines")
+        build.assert_not_called()
+
+    # Rating updates land through Doctor.update and invalidate the index
+    Doctor.update(str(doctor['_id']), {'rating': 3.9})
+    assert "rating: 3.9/5" in get_system_prompt()
+
+
+def test_relevant_doctors_are_retrieved_offline(app):
+    """Test TF-IDF retrieval ranks doctors by symptoms and keeps the prompt to the top k."""
+    from src.models.doctor import Doctor
+    from src.services.doctor_retrieval import find_relevant_doctors
+    from src.services.chatbot_service import get_system_prompt
+
+    for i, specialty in enumerate(["Cardiology", "Dermatology", "Neurology", "General Practice",
+                                   "Gastroenterology", "Pulmonology", "Orthopedics"]):
+        Doctor.create(f"507f1f77bcf86cd7994391{i:02d}", f"Doc {specialty}", specialty, "Delhi", [], 4.0, "",
+                      verified=True)
+
+    assert find_relevant_doctors("I get palpitations and chest pain", k=1)[0]['specialty'] == "Cardiology"
+    assert find_relevant_doctors("itchy rashes on my arms", k=1)[0]['specialty'] == "Dermatology"
+    assert find_relevant_doctors("terrible headaches and dizziness", k=1)[0]['specialty'] == "Neurology"
+    assert find_relevant_doctors("hello there", k=1)[0]['specialty'] == "General Practice"
+
+    app.config['CHATBOT_DOCTOR_TOP_K'] = 2
+    prompt = get_system_prompt("stomach ache and nausea")
+    assert prompt.count("- Dr. ") == 2
+    assert "Gastroenterology specialist" in prompt
+
+
+def test_llm_clients_are_pooled_per_model_and_temperature(app):
+    """Test LLM clients are built once per model/temperature and reused."""
+    from src.services.llm import get_chat_model
+
+    with patch('src.services.llm.ChatGoogleGenerativeAI', side_effect=lambda **kwargs: MagicMock(**kwargs)) as MockLLM:
+        chat = get_chat_model('chat')
+        assert get_chat_model('chat') is chat
+        report = get_chat_model('report')
+        assert report is not chat
+        assert get_chat_model('summary') is report  # same model and temperature
+        assert MockLLM.call_count == 2
+        # Every attempt of a call fits within the whole-call deadline
+        kwargs = MockLLM.call_args.kwargs
+        assert kwargs['timeout'] * (kwargs['max_retries'] + 1) <= app.config['LLM_CALL_DEADLINE_SECONDS']
+        assert kwargs['timeout'] <= app.config['LLM_TIMEOUT_SECONDS']
+
+
+def test_local_llm_provider_runs_offline(app, client):
+    """Test the local provider serves chatbot and report paths without a key, per purpose."""
+    from src.services.llm import get_chat_model
+    from src.services.local_llm import LocalChatModel
+    from src.services.report_service import generate_ai_summary
+
+    app.config['LLM_CHAT_PROVIDER'] = 'local'
+    app.config['LLM_CHAT_MODEL'] = 'bench'
+    assert isinstance(get_chat_model('chat'), LocalChatModel)
+    assert get_chat_model('chat').model == 'bench'
+    app.extensions['llm_pool'].api_key = 'dummy-key'
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        get_chat_model('report')
+        MockLLM.assert_called_once()
+
+    app.config['LLM_PROVIDER'] = 'local'
+    app.extensions['llm_pool'].api_key = None
+    app.config['CHATBOT_RESPONSE_CACHE_ENABLED'] = False
+    reply = process_message("507f1f77bcf86cd7994390b1", "my tummy feels strange")
+    assert reply == process_message("507f1f77bcf86cd7994390b2", "my tummy feels strange")
+    assert '"my tummy feels strange"' in reply and "not a diagnosis" in reply
+    summary = generate_ai_summary({'diagnosis': 'Migraine', 'medications': []}, "Pat", "Dr. Who")
+    assert summary.startswith("This prescription was issued for Migraine.")
+
+
+def test_chat_context_window_and_rolling_summary(app, db):
+    """Test only recent turns are sent verbatim and older ones are folded into a summary."""
+    from src.services.chatbot_service import build_conversation
+    from src.services.chat_context import schedule_summary
+    from src.services.outbox import process_outbox
+
+    user_id = "507f1f77bcf86cd799439081"
+    window = app.config['CHAT_CONTEXT_TURNS'] * 2
+    for i in range(window + 2):
+        ChatHistory.add_message(user_id, 'user' if i % 2 == 0 else 'assistant', f"turn {i}")
+    assert schedule_summary(user_id) is False
+
+    with patch('src.services.chatbot_service.get_system_prompt', return_value="SYSTEM"):
+        for i in range(window + 2, 2 * window + 2):
+            ChatHistory.add_message(user_id, 'user' if i % 2 == 0 else 'assistant', f"turn {i}")
+        assert len(build_conversation(user_id, "now")) == 2 * window + 2
+
+        assert schedule_summary(user_id) is True
+        assert schedule_summary(user_id) is False  # already queued
+
+        with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+            MockLLM.return_value.invoke.return_value = MagicMock(content="Patient reported headaches.")
+            assert process_outbox() == 1
+            transcript = MockLLM.return_value.invoke.call_args.args[0][1].content
+            assert "user: turn 0" in transcript and f"turn {window + 1}" in transcript
+
+        messages = build_conversation(user_id, "now")
+    assert "SUMMARY OF THE EARLIER CONVERSATION:\nPatient reported headaches." in messages[0].content
+    assert [m.content for m in messages[1:-1]] == [f"turn {i}" for i in range(window + 2, 2 * window + 2)]
+
+    # The history token budget trims the oldest verbatim turns first
+    app.config['CHAT_HISTORY_TOKEN_BUDGET'] = 12
+    with patch('src.services.chatbot_service.get_system_prompt', return_value="SYSTEM"):
+        messages = build_conversation(user_id, "now")
+    assert [m.content for m in messages[1:-1]] == [f"turn {2 * window}", f"turn {2 * window + 1}"]
+
+
+def test_triage_answers_clear_symptoms_without_llm(app):
+    """Test plain symptom statements and emergencies skip the LLM; ambiguous ones escalate."""
+    from src.models.doctor import Doctor
+    from src.routes.auth import VALID_SPECIALTIES
+    from src.services.triage import triage, SYMPTOM_PHRASES
+
+    assert set(SYMPTOM_PHRASES) <= set(VALID_SPECIALTIES)
+    assert triage("chest pain").specialty == "Cardiology"
+    assert triage("Itchy rashes on my arm").specialty == "Dermatology"
+    assert triage("I can't breathe").emergency
+    for ambiguous in ["no chest pain", "is a rash serious?", "knee pain and a rash", "hello",
+                      "I had a stroke last year and now have a headache", "heart attack history in family"]:
+        assert triage(ambiguous) is None
+
+    Doctor.create("507f1f77bcf86cd799439091", "Skin Doc", "Dermatology", "Pune", [], 4.8, "", verified=True)
+    user_id = "507f1f77bcf86cd799439092"
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        reply = process_message(user_id, "I have a skin rash")
+        emergency = process_message(user_id, "my dad is unconscious")
+        MockLLM.assert_not_called()
+    assert "Dr. Skin Doc: Dermatology specialist" in reply
+    assert "emergency" in emergency
+    assert len(ChatHistory.get_messages(user_id)) == 4
+
+
+def test_first_turn_replies_are_cached_by_similarity(app):
+    """Test repeated first-turn questions reuse a cached reply and still land in history."""
+    from src.models.doctor import Doctor
+    from src.services.chatbot_service import get_response_cache
+
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        MockLLM.return_value.invoke.return_value = MagicMock(content="See a GP.")
+        question = "I have a severe headache, fever, nausea and chills"
+        assert process_message("507f1f77bcf86cd7994390a1", question) == "See a GP."
+        assert process_message("507f1f77bcf86cd7994390a2", "Fever and chills with a severe headache and nausea") == "See a GP."
+        assert process_message("507f1f77bcf86cd7994390a3", "Severe headaches, fever, nausea and chills") == "See a GP."
+        assert MockLLM.return_value.invoke.call_count == 1
+        assert [m['content'] for m in ChatHistory.get_messages("507f1f77bcf86cd7994390a3")] == [
+            "Severe headaches, fever, nausea and chills", "See a GP."
+        ]
+
+        # Follow-up turns and a changed doctor directory go to the LLM
+        process_message("507f1f77bcf86cd7994390a1", question + " since yesterday")
+        Doctor.create("507f1f77bcf86cd7994390a4", "New Doc", "Neurology", "Goa", [], 4.0, "")
+        process_message("507f1f77bcf86cd7994390a5", question)
+        assert MockLLM.return_value.invoke.call_count == 3
+
+    stats = get_response_cache().stats()
+    assert stats['hits'] == 1 and stats['similarHits'] == 1 and stats['misses'] == 2
+
+
+def test_response_cache_skips_negated_messages():
+    """Test negated or duration-bearing messages are neither cached nor served."""
+    from src.services.chatbot_service import ResponseCache
+
+    cache = ResponseCache()
+    cache.put(1, "I have a fever but no chest pain", "Fever reply")
+    assert cache.stats()['size'] == 0
+    cache.put(1, "I have a fever and a rash", "Rash reply")
+    assert cache.get(1, "I have chest pain but no fever") is None
+    cache.put(1, "I have had a fever for 2 days", "Short fever reply")
+    assert cache.get(1, "I have had a fever for 3 weeks") is None
+    assert cache.get(1, "I have had a fever for three weeks") is None
+    assert cache.get(1, "I have a fever and a rash") == "Rash reply"
+
+
+def test_llm_guard_caps_concurrency_and_trips_breaker(app):
+    """Test LLM calls are refused when slots run out or the upstream keeps failing."""
+    from src.services.llm import get_llm_pool
+    from src.services.llm_guard import LLMUnavailable
+    from src.services.report_service import generate_ai_summary
+
+    pool = get_llm_pool()
+    pool.guard_settings = {'max_concurrent': 1, 'queue_timeout_seconds': 0,
+                           'breaker': {'min_calls': 3, 'failure_ratio': 0.5, 'cooldown_seconds': 60}}
+    guard = pool.guard('gemini')
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        MockLLM.return_value.invoke.side_effect = RuntimeError("upstream timeout")
+        with guard.slot():
+            with pytest.raises(LLMUnavailable, match="busy"):
+                process_message("507f1f77bcf86cd7994390c1", "tell me about my odd symptoms today")
+        # The held slot counts as a success, so two failures of three trip the breaker
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                process_message("507f1f77bcf86cd7994390c1", "tell me about my odd symptoms today")
+
+        # Open breaker: chat fast-fails and reports use the template summary
+        with pytest.raises(LLMUnavailable, match="temporarily unavailable"):
+            process_message("507f1f77bcf86cd7994390c1", "tell me about my odd symptoms today")
+        summary = generate_ai_summary({'diagnosis': 'Flu', 'medications': []}, "Pat", "Dr. Who")
+        assert summary.startswith("This prescription was issued for Flu.")
+        assert MockLLM.return_value.invoke.call_count == 2
+
+    stats = guard.stats()
+    assert stats['state'] == 'open' and stats['trips'] == 1
+    assert stats['rejected'] == 1 and stats['shortCircuited'] == 2 and stats['failures'] == 2
+    assert stats['inFlight'] == 0 and stats['queueDepth'] == 0
+
+
+def test_llm_guard_judges_streams_by_first_chunk():
+    """Test long or cancelled streams are not breaker failures; a late first chunk is."""
+    from src.services.llm_guard import LLMGuard, CircuitBreaker
+
+    guard = LLMGuard('test', slow_call_seconds=0.05,
+                     breaker=CircuitBreaker(min_calls=1, failure_ratio=0.3, cooldown_seconds=60))
+
+    def reply(first_chunk_delay, total):
+        with guard.slot(stream=True) as timer:
+            time.sleep(first_chunk_delay)
+            timer.first_chunk()
+            time.sleep(total - first_chunk_delay)
+            yield "chunk"
+
+    list(reply(0, 0.1))
+    cancelled = reply(0.1, 0.1)
+    next(cancelled)
+    cancelled.close()
+    assert guard.stats()['slowCalls'] == 0 and guard.breaker.state == 'closed'
+
+    list(reply(0.1, 0.1))
+    assert guard.stats()['slowCalls'] == 1 and guard.breaker.state == 'open'
+
+
+def test_chatbot_turns_are_serialized_and_duplicates_coalesced(app):
+    """Test one turn per user runs at a time and a resubmitted message reuses the reply."""
+    from src.models.chat_turn import ChatTurn
+    from src.services.chatbot_service import TurnInProgress, stream_message, _message_hash
+
+    user_id = "507f1f77bcf86cd7994390e1"
+    app.config['CHATBOT_TRIAGE_ENABLED'] = False
+    with patch('src.services.llm.ChatGoogleGenerativeAI') as MockLLM:
+        MockLLM.return_value.invoke.return_value = MagicMock(content="Please see a GP.")
+        assert process_message(user_id, "I feel unwell lately") == "Please see a GP."
+        assert process_message(user_id, "I  feel unwell LATELY") == "Please see a GP."
+        assert MockLLM.return_value.invoke.call_count == 1
+        assert len(ChatHistory.get_messages(user_id)) == 2
+
+        # A turn running in another worker blocks a different message
+        token = ChatTurn.acquire(user_id, 'other-message')
+        with pytest.raises(TurnInProgress):
+            process_message(user_id, "What about my diet?")
+        with pytest.raises(TurnInProgress):
+            stream_message(user_id, "What about my diet?")
+        ChatTurn.release(user_id, token)
+
+        # An identical message while its twin is running is refused at once, without waiting
+        token = ChatTurn.acquire(user_id, _message_hash("What about my diet?"))
+        with pytest.raises(TurnInProgress, match="already being answered"):
+            process_message(user_id, "what about my  diet?")
+        ChatTurn.release(user_id, token)
+
+        # A failed turn frees the lock for the next message
+        MockLLM.return_value.invoke.side_effect = RuntimeError("upstream error")
+        with pytest.raises(RuntimeError):
+            process_message(user_id, "What about my diet?")
+        MockLLM.return_value.invoke.side_effect = None
+        assert process_message(user_id, "What about my diet?") == "Please see a GP."
+        assert len(ChatHistory.get_messages(user_id)) == 4